@@ -0,0 +1,30 @@
+"""Adiciona coluna de versao em usuarios e carteiras
+
+Revision ID: 3f1c2a7d9e40
+Revises: 98ad8fe8c4be
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a7d9e40'
+down_revision: Union[str, Sequence[str], None] = '98ad8fe8c4be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('usuarios', sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('carteiras', sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('carteiras', 'versao')
+    op.drop_column('usuarios', 'versao')
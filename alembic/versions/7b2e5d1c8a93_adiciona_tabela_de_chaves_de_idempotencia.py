@@ -0,0 +1,37 @@
+"""Adiciona tabela de chaves de idempotencia
+
+Revision ID: 7b2e5d1c8a93
+Revises: 3f1c2a7d9e40
+Create Date: 2026-10-18 16:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e5d1c8a93'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a7d9e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chaves_idempotencia',
+    sa.Column('chave', sa.String(length=255), nullable=False),
+    sa.Column('hash_requisicao', sa.String(length=64), nullable=False),
+    sa.Column('resposta', sa.JSON(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('expira_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('chave')
+    )
+    op.create_index(op.f('ix_chaves_idempotencia_expira_em'), 'chaves_idempotencia', ['expira_em'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chaves_idempotencia_expira_em'), table_name='chaves_idempotencia')
+    op.drop_table('chaves_idempotencia')
@@ -0,0 +1,31 @@
+"""Adiciona indices de paginacao por cursor em transacoes
+
+Revision ID: 98ad8fe8c4be
+Revises: 526f846f73ed
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '98ad8fe8c4be'
+down_revision: Union[str, Sequence[str], None] = '526f846f73ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transacoes_timestamp_id', 'transacoes', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_transacoes_origem_timestamp_id', 'transacoes', ['carteira_origem_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_transacoes_destino_timestamp_id', 'transacoes', ['carteira_destino_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transacoes_destino_timestamp_id', table_name='transacoes')
+    op.drop_index('ix_transacoes_origem_timestamp_id', table_name='transacoes')
+    op.drop_index('ix_transacoes_timestamp_id', table_name='transacoes')
@@ -0,0 +1,49 @@
+"""Adiciona autorizacoes de cartao e o uso do limite
+
+Revision ID: a3d7f1c9e2b6
+Revises: f2a6c8e4b1d9
+Create Date: 2026-10-18 23:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7f1c9e2b6'
+down_revision: Union[str, Sequence[str], None] = 'f2a6c8e4b1d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cartoes_uso',
+    sa.Column('cartao_id', sa.Integer(), nullable=False),
+    sa.Column('reservado_unidades', sa.BigInteger(), nullable=False),
+    sa.Column('utilizado_unidades', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['cartao_id'], ['cartoes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cartao_id')
+    )
+    op.create_table('autorizacoes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cartao_id', sa.Integer(), nullable=False),
+    sa.Column('valor_unidades', sa.BigInteger(), nullable=False),
+    sa.Column('capturado_unidades', sa.BigInteger(), nullable=True),
+    sa.Column('moeda', sa.String(length=3), nullable=False),
+    sa.Column('estado', sa.String(length=10), nullable=False),
+    sa.Column('criada_em', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('encerrada_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cartao_id'], ['cartoes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_autorizacoes_cartao_id'), 'autorizacoes', ['cartao_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_autorizacoes_cartao_id'), table_name='autorizacoes')
+    op.drop_table('autorizacoes')
+    op.drop_table('cartoes_uso')
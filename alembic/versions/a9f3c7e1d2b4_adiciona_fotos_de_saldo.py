@@ -0,0 +1,46 @@
+"""Adiciona fotos de saldo (saldos_historicos) e contador de movimentos das carteiras
+
+Revision ID: a9f3c7e1d2b4
+Revises: e1d5b3a9c2f7
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9f3c7e1d2b4'
+down_revision: Union[str, Sequence[str], None] = 'e1d5b3a9c2f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('carteiras', sa.Column('movimentos', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('saldos_historicos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('carteira_id', sa.Integer(), nullable=False),
+    sa.Column('saldo_unidades', sa.BigInteger(), nullable=False),
+    sa.Column('ate_transacao_id', sa.Integer(), nullable=False),
+    sa.Column('momento', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['carteira_id'], ['carteiras.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_saldos_historicos_carteira_momento', 'saldos_historicos', ['carteira_id', 'momento'], unique=False)
+
+    # Foto inicial com o saldo atual de cada carteira: consultas a partir de agora não precisam do histórico anterior
+    op.execute(
+        "INSERT INTO saldos_historicos (carteira_id, saldo_unidades, ate_transacao_id) "
+        "SELECT id, saldo_unidades, (SELECT coalesce(max(id), 0) FROM transacoes) FROM carteiras"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_saldos_historicos_carteira_momento', table_name='saldos_historicos')
+    op.drop_table('saldos_historicos')
+    op.drop_column('carteiras', 'movimentos')
@@ -0,0 +1,38 @@
+"""Adiciona resumos por carteira e periodo
+
+Revision ID: b5e8d2a4f1c6
+Revises: a9f3c7e1d2b4
+Create Date: 2026-10-18 21:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8d2a4f1c6'
+down_revision: Union[str, Sequence[str], None] = 'a9f3c7e1d2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # O histórico existente é somado depois, com `python -m app.services.resumos`
+    op.create_table('resumos_carteiras',
+    sa.Column('carteira_id', sa.Integer(), nullable=False),
+    sa.Column('granularidade', sa.String(length=5), nullable=False),
+    sa.Column('periodo', sa.Date(), nullable=False),
+    sa.Column('entradas_unidades', sa.BigInteger(), nullable=False),
+    sa.Column('saidas_unidades', sa.BigInteger(), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['carteira_id'], ['carteiras.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('carteira_id', 'granularidade', 'periodo')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('resumos_carteiras')
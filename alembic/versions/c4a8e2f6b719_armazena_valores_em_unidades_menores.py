@@ -0,0 +1,69 @@
+"""Armazena valores monetarios em unidades menores (BIGINT)
+
+Revision ID: c4a8e2f6b719
+Revises: 7b2e5d1c8a93
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e2f6b719'
+down_revision: Union[str, Sequence[str], None] = '7b2e5d1c8a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Cópia dos expoentes de app/core/dinheiro.py no momento da migração (moedas que não usam 2 casas)
+EXPOENTES = {
+    **dict.fromkeys(
+        ("BIF", "CLP", "DJF", "GNF", "ISK", "JPY", "KMF", "KRW", "PYG", "RWF", "UGX", "VND", "VUV", "XAF", "XOF", "XPF"),
+        0,
+    ),
+    **dict.fromkeys(("BHD", "IQD", "JOD", "KWD", "LYD", "OMR", "TND"), 3),
+}
+
+# (tabela, coluna decimal, coluna em unidades)
+COLUNAS = [
+    ('carteiras', 'saldo_atual', 'saldo_unidades'),
+    ('cartoes', 'limite', 'limite_unidades'),
+    ('transacoes', 'valor', 'valor_unidades'),
+]
+
+
+def _fator(coluna_moeda: str) -> str:
+    """ Expressão SQL com 10^expoente da moeda de cada linha. """
+    casos = " ".join(f"WHEN '{moeda}' THEN {10 ** expoente}" for moeda, expoente in EXPOENTES.items())
+    return f"(CASE upper({coluna_moeda}) {casos} ELSE 100 END)"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Cartões e transações passam a guardar a moeda (a da carteira / da carteira de origem)
+    op.add_column('cartoes', sa.Column('moeda', sa.String(length=3), nullable=True))
+    op.execute("UPDATE cartoes SET moeda = c.moeda FROM carteiras c WHERE c.id = cartoes.carteira_id")
+    op.alter_column('cartoes', 'moeda', nullable=False)
+    op.add_column('transacoes', sa.Column('moeda', sa.String(length=3), nullable=True))
+    op.execute("UPDATE transacoes SET moeda = c.moeda FROM carteiras c WHERE c.id = transacoes.carteira_origem_id")
+    op.alter_column('transacoes', 'moeda', nullable=False)
+
+    for tabela, decimal, unidades in COLUNAS:
+        op.add_column(tabela, sa.Column(unidades, sa.BigInteger(), nullable=True))
+        op.execute(f"UPDATE {tabela} SET {unidades} = round({decimal} * {_fator('moeda')})")
+        op.alter_column(tabela, unidades, nullable=False)
+        op.drop_column(tabela, decimal)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tabela, decimal, unidades in reversed(COLUNAS):
+        op.add_column(tabela, sa.Column(decimal, sa.Numeric(precision=10, scale=2), nullable=True))
+        op.execute(f"UPDATE {tabela} SET {decimal} = {unidades}::numeric / {_fator('moeda')}")
+        op.alter_column(tabela, decimal, nullable=False)
+        op.drop_column(tabela, unidades)
+
+    op.drop_column('transacoes', 'moeda')
+    op.drop_column('cartoes', 'moeda')
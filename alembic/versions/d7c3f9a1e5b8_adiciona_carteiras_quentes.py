@@ -0,0 +1,57 @@
+"""Adiciona carteiras quentes (saldo em fatias)
+
+Revision ID: d7c3f9a1e5b8
+Revises: b5e8d2a4f1c6
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7c3f9a1e5b8'
+down_revision: Union[str, Sequence[str], None] = 'b5e8d2a4f1c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('carteiras', sa.Column('fatias', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('saldos_fatias',
+    sa.Column('carteira_id', sa.Integer(), nullable=False),
+    sa.Column('fatia', sa.Integer(), nullable=False),
+    sa.Column('saldo_unidades', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['carteira_id'], ['carteiras.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('carteira_id', 'fatia')
+    )
+    # Os resumos também ganham fatias: as linhas existentes ficam na fatia 0
+    op.add_column('resumos_carteiras', sa.Column('fatia', sa.Integer(), server_default='0', nullable=False))
+    op.drop_constraint('resumos_carteiras_pkey', 'resumos_carteiras', type_='primary')
+    op.create_primary_key(
+        'resumos_carteiras_pkey', 'resumos_carteiras', ['carteira_id', 'granularidade', 'periodo', 'fatia']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fatias de saldo e de resumo voltam para as linhas principais antes de sumirem
+    op.execute(
+        "UPDATE carteiras SET saldo_unidades = saldo_unidades + f.total "
+        "FROM (SELECT carteira_id, sum(saldo_unidades) AS total FROM saldos_fatias GROUP BY carteira_id) f "
+        "WHERE carteiras.id = f.carteira_id"
+    )
+    op.execute(
+        "INSERT INTO resumos_carteiras (carteira_id, granularidade, periodo, fatia, entradas_unidades, saidas_unidades, quantidade) "
+        "SELECT carteira_id, granularidade, periodo, -1, sum(entradas_unidades), sum(saidas_unidades), sum(quantidade) "
+        "FROM resumos_carteiras GROUP BY carteira_id, granularidade, periodo"
+    )
+    op.execute("DELETE FROM resumos_carteiras WHERE fatia <> -1")
+    op.drop_constraint('resumos_carteiras_pkey', 'resumos_carteiras', type_='primary')
+    op.drop_column('resumos_carteiras', 'fatia')
+    op.create_primary_key('resumos_carteiras_pkey', 'resumos_carteiras', ['carteira_id', 'granularidade', 'periodo'])
+    op.drop_table('saldos_fatias')
+    op.drop_column('carteiras', 'fatias')
@@ -0,0 +1,130 @@
+"""Particiona transacoes por mes (intervalo de timestamp)
+
+Revision ID: e1d5b3a9c2f7
+Revises: c4a8e2f6b719
+Create Date: 2026-10-18 19:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1d5b3a9c2f7'
+down_revision: Union[str, Sequence[str], None] = 'c4a8e2f6b719'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Meses futuros criados já na migração; depois disso, `python -m app.database.particoes`
+MESES_A_FRENTE = 3
+
+COLUNAS = "id, valor_unidades, moeda, \"timestamp\", carteira_origem_id, carteira_destino_id"
+
+INDICES = [
+    ('ix_transacoes_timestamp_id', ['"timestamp"', 'id']),
+    ('ix_transacoes_origem_timestamp_id', ['carteira_origem_id', '"timestamp"', 'id']),
+    ('ix_transacoes_destino_timestamp_id', ['carteira_destino_id', '"timestamp"', 'id']),
+]
+
+
+def _criar_indices(tabela: str) -> None:
+    for nome, colunas in INDICES:
+        op.execute(f"CREATE INDEX {nome} ON {tabela} ({', '.join(colunas)})")
+
+
+def _postgresql() -> bool:
+    # Particionamento declarativo só existe no PostgreSQL; nos outros bancos a tabela continua simples
+    return op.get_context().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _postgresql():
+        return
+    # A tabela atual vira a fonte da cópia; a sequência dos ids continua a mesma
+    op.execute("ALTER TABLE transacoes RENAME TO transacoes_antiga")
+    op.execute("ALTER TABLE transacoes_antiga RENAME CONSTRAINT transacoes_pkey TO transacoes_antiga_pkey")
+    op.execute("ALTER SEQUENCE transacoes_id_seq OWNED BY NONE")
+    op.drop_index('ix_transacoes_id', table_name='transacoes_antiga')
+    for nome, _ in INDICES:
+        op.drop_index(nome, table_name='transacoes_antiga')
+
+    # A chave de partição precisa fazer parte da chave primária (e não pode ser nula)
+    op.execute(
+        """
+        CREATE TABLE transacoes (
+            id integer NOT NULL DEFAULT nextval('transacoes_id_seq'),
+            valor_unidades bigint NOT NULL,
+            moeda varchar(3) NOT NULL,
+            "timestamp" timestamp without time zone NOT NULL DEFAULT now(),
+            carteira_origem_id integer NOT NULL REFERENCES carteiras (id),
+            carteira_destino_id integer NOT NULL REFERENCES carteiras (id),
+            CONSTRAINT transacoes_pkey PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+        """
+    )
+    _criar_indices('transacoes')
+
+    # Uma partição por mês, do mês da transação mais antiga até MESES_A_FRENTE meses adiante.
+    # Calculado no próprio banco: a migração também funciona em modo offline (--sql)
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            mes date;
+            ultimo date := (date_trunc('month', now()) + interval '{MESES_A_FRENTE} months')::date;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min("timestamp"), now()))::date INTO mes FROM transacoes_antiga;
+            WHILE mes <= ultimo LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF transacoes FOR VALUES FROM (%L) TO (%L)',
+                    'transacoes_' || to_char(mes, 'YYYY_MM'), mes, (mes + interval '1 month')::date
+                );
+                mes := (mes + interval '1 month')::date;
+            END LOOP;
+        END
+        $$
+        """
+    )
+    op.execute("CREATE TABLE transacoes_padrao PARTITION OF transacoes DEFAULT")
+
+    op.execute(
+        f"INSERT INTO transacoes ({COLUNAS}) "
+        f"SELECT id, valor_unidades, moeda, coalesce(\"timestamp\", now()), carteira_origem_id, carteira_destino_id "
+        f"FROM transacoes_antiga"
+    )
+    op.drop_table('transacoes_antiga')
+    op.execute("ALTER SEQUENCE transacoes_id_seq OWNED BY transacoes.id")
+    op.execute("ANALYZE transacoes")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not _postgresql():
+        return
+    op.execute("ALTER TABLE transacoes RENAME TO transacoes_particionada")
+    op.execute("ALTER TABLE transacoes_particionada RENAME CONSTRAINT transacoes_pkey TO transacoes_particionada_pkey")
+    op.execute("ALTER SEQUENCE transacoes_id_seq OWNED BY NONE")
+    for nome, _ in INDICES:
+        op.execute(f"DROP INDEX {nome}")
+
+    op.execute(
+        """
+        CREATE TABLE transacoes (
+            id integer NOT NULL DEFAULT nextval('transacoes_id_seq'),
+            "timestamp" timestamp without time zone DEFAULT now(),
+            carteira_origem_id integer NOT NULL REFERENCES carteiras (id),
+            carteira_destino_id integer NOT NULL REFERENCES carteiras (id),
+            moeda varchar(3) NOT NULL,
+            valor_unidades bigint NOT NULL,
+            CONSTRAINT transacoes_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(f"INSERT INTO transacoes ({COLUNAS}) SELECT {COLUNAS} FROM transacoes_particionada")
+    # Remove a tabela particionada junto com todas as partições
+    op.execute("DROP TABLE transacoes_particionada")
+    op.execute("ALTER SEQUENCE transacoes_id_seq OWNED BY transacoes.id")
+    op.create_index(op.f('ix_transacoes_id'), 'transacoes', ['id'], unique=False)
+    _criar_indices('transacoes')
@@ -0,0 +1,45 @@
+"""Adiciona a fila de transferencias assincronas
+
+Revision ID: f2a6c8e4b1d9
+Revises: d7c3f9a1e5b8
+Create Date: 2026-10-18 23:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6c8e4b1d9'
+down_revision: Union[str, Sequence[str], None] = 'd7c3f9a1e5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transferencias_agendadas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('carteira_origem_id', sa.Integer(), nullable=False),
+    sa.Column('carteira_destino_id', sa.Integer(), nullable=False),
+    sa.Column('valor_unidades', sa.BigInteger(), nullable=False),
+    sa.Column('moeda', sa.String(length=3), nullable=False),
+    sa.Column('estado', sa.String(length=10), nullable=False),
+    sa.Column('motivo', sa.String(length=40), nullable=True),
+    sa.Column('transacao_id', sa.Integer(), nullable=True),
+    sa.Column('criada_em', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('processada_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_transferencias_agendadas_pendentes', 'transferencias_agendadas', ['id'],
+        unique=False, postgresql_where=sa.text("estado = 'pendente'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transferencias_agendadas_pendentes', table_name='transferencias_agendadas')
+    op.drop_table('transferencias_agendadas')
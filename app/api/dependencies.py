@@ -1,13 +1,35 @@
-from sqlalchemy.orm import Session
-from app.database.session import SessionLocal
+from fastapi import Depends, Request
 
-def get_db():
+from app.database import replicas, session
+
+async def get_db():
     """
-    Função de dependência que cria e gerencia uma sessão de banco de dados por requisição.
+    Função de dependência que cria e gerencia uma sessão assíncrona de banco de dados por requisição.
     Garante que a sessão seja sempre fechada após o uso.
+    A conexão só sai do pool no primeiro comando: respostas servidas pelo cache (ou 304) não a usam.
+    """
+    async with session.SessionLocal() as db:
+        yield db
+
+def get_sessionmaker():
+    """
+    Função de dependência que fornece a fábrica de sessões.
+    Para respostas em streaming: a sessão de `get_db` é fechada antes do corpo ser enviado.
     """
-    db = SessionLocal()
+    return session.SessionLocal
+
+async def get_db_leitura(request: Request, fabrica_primaria=Depends(get_sessionmaker)):
+    """
+    Como `get_db`, para handlers somente leitura: a sessão vem de uma réplica (DATABASE_REPLICA_URLS)
+    quando há uma disponível e em dia com as escritas do cliente; senão, do primário.
+    Nunca use para escrever.
+    """
+    db = await replicas.sessao_de_leitura(request, fabrica_primaria)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
+
+async def get_sessionmaker_leitura(request: Request, fabrica_primaria=Depends(get_sessionmaker)):
+    """ Como `get_sessionmaker`, com a escolha de réplica de `get_db_leitura`. """
+    return await replicas.fabrica_de_leitura(request, fabrica_primaria)
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+
+def gerar_etag(*partes) -> str:
+    """ ETag forte a partir das versões que compõem a representação (nunca do corpo serializado). """
+    return '"' + hashlib.sha256(repr(partes).encode()).hexdigest()[:32] + '"'
+
+
+def _etags(valor: str) -> set[str]:
+    return {etag.strip() for etag in valor.split(",")}
+
+
+def nao_modificado(request: Request, etag: str) -> Optional[Response]:
+    """ Resposta 304 se o If-None-Match do cliente já contém a versão atual (comparação fraca, RFC 9110). """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return None
+    etags = {e.removeprefix("W/") for e in _etags(if_none_match)}
+    if "*" in etags or etag in etags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
+def exigir_if_match(request: Request, etag: str) -> None:
+    """ Recusa com 412 uma escrita cujo If-Match não corresponde à versão atual (comparação forte). """
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return
+    etags = _etags(if_match)
+    if "*" not in etags and etag not in etags:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="O recurso foi alterado desde a versão informada em If-Match.",
+        )
+
+
+def versao_concorrente() -> HTTPException:
+    """ Erro para um UPDATE que perdeu a corrida para outra escrita (StaleDataError do version_id_col). """
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="O recurso foi alterado por outra requisição durante a atualização.",
+    )
@@ -0,0 +1,32 @@
+from fastapi import HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas
+from app.services.importacao import Entidade, importar, linhas_da_requisicao, registros_csv, registros_ndjson
+
+FORMATOS = {
+    "application/x-ndjson": registros_ndjson,
+    "application/jsonl": registros_ndjson,
+    "text/csv": registros_csv,
+}
+
+async def importar_da_requisicao(request: Request, db: AsyncSession, entidade: Entidade) -> schemas.ImportacaoRead:
+    """ Lê o corpo da requisição (NDJSON ou CSV, pelo Content-Type) em streaming e importa os registros. """
+    content_type = request.headers.get("content-type", "application/x-ndjson").split(";")[0].strip()
+    leitor = FORMATOS.get(content_type)
+    if leitor is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Formato não suportado: use {', '.join(FORMATOS)}.",
+        )
+
+    resultado = await importar(db, entidade, leitor(linhas_da_requisicao(request.stream())))
+    return schemas.ImportacaoRead(
+        inseridos=len(resultado.criados),
+        rejeitados=len(resultado.erros),
+        criados=[schemas.ImportacaoCriado(linha=linha, id=id) for linha, id in resultado.criados],
+        erros=[
+            schemas.ImportacaoErro(linha=linha, motivo=motivo, detail=detail)
+            for linha, motivo, detail in sorted(resultado.erros)
+        ],
+    )
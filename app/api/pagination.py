@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime
+from functools import partial
+from typing import Literal, Optional
+
+from fastapi import HTTPException, Query, status
+from fastapi_pagination.api import create_page, resolve_params
+from pydantic import BaseModel
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.serializacao import itens_de_linhas, resposta_json
+from app.core.cache import cache, chave_contagem
+from app.core.config import settings
+
+EstrategiaContagem = Literal["exact", "estimated", "none"]
+
+
+def codificar_cursor(timestamp: datetime, id: int) -> str:
+    """ Gera um cursor opaco (base64 url-safe) para a posição (timestamp, id). """
+    bruto = json.dumps([timestamp.isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> tuple[datetime, int]:
+    """ Decodifica um cursor gerado por `codificar_cursor`; cursores inválidos resultam em 400. """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, id = json.loads(bruto)
+        return datetime.fromisoformat(timestamp), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
+
+
+def estrategia_contagem(
+    count: Optional[EstrategiaContagem] = Query(
+        None,
+        description="Total da página: exact (COUNT), estimated (estatísticas do banco) ou none (só has_next).",
+    ),
+) -> Optional[str]:
+    """ Dependência das listagens paginadas: a estratégia de contagem pedida pelo cliente, se houver. """
+    return count
+
+
+async def _contagem_exata(db: AsyncSession, query: Select) -> int:
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+
+async def _contagem_estimada(db: AsyncSession, query: Select) -> int:
+    """ Linhas previstas pelo planner do PostgreSQL (EXPLAIN, sem executar a consulta). """
+    # Parâmetros ligados, como na própria consulta: nenhum valor do cliente é interpolado no SQL
+    compilado = query.order_by(None).compile(dialect=db.bind.dialect, compile_kwargs={"render_postcompile": True})
+    parametros = compilado.params
+    if compilado.positional:
+        parametros = tuple(parametros[nome] for nome in compilado.positiontup)
+    conexao = await db.connection()
+    plano = (await conexao.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compilado), parametros)).scalar()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]["Plan"]["Plan Rows"])
+
+
+async def _contar(db: AsyncSession, query: Select, estrategia: str, chave: Optional[str]) -> tuple[Optional[int], bool]:
+    """
+    (total, exato) conforme a estratégia. Sem estatísticas do planner (ex.: SQLite) a estimativa vira COUNT.
+    Sem `chave`, a contagem exata não passa pelo cache.
+    """
+    if estrategia == "none":
+        return None, False
+    if estrategia == "estimated" and db.bind.dialect.name == "postgresql":
+        return await _contagem_estimada(db, query), False
+    if chave is None:
+        return await _contagem_exata(db, query), True
+    return await cache.obter_ou_carregar(chave, partial(_contagem_exata, db, query)), True
+
+
+async def paginar(
+    db: AsyncSession,
+    query: Select,
+    recurso: str,
+    contagem: Optional[str] = None,
+    filtro=None,
+    schema_linhas: Optional[type[BaseModel]] = None,
+    contagem_em_cache: bool = True,
+):
+    """
+    Pagina `query` por página/tamanho na `Pagina` do response_model da rota.
+    - Busca uma linha além do tamanho da página: `has_next` sai exato sem depender do total.
+    - O total segue `contagem` (ou CONTAGEM_POR_RECURSO/CONTAGEM_PADRAO). Contagens exatas ficam
+      no cache por (`recurso`, `filtro`) e são invalidadas pelas escritas que inserem ou removem linhas;
+      `filtro` deve ser o único critério da query além do recurso; com outros critérios (ex.: intervalo
+      de datas), passe `contagem_em_cache=False`.
+    - Na última página o total é conhecido sem COUNT.
+    Com `schema_linhas`, a query é um `colunas(...)` e os itens são validados a partir das linhas.
+    Com SERIALIZACAO_RAPIDA, a página é serializada direto pelo TypeAdapter.
+    """
+    params = resolve_params()
+    limite = params.size
+    deslocamento = params.size * (params.page - 1)
+    estrategia = contagem or settings.CONTAGEM_POR_RECURSO.get(recurso, settings.CONTAGEM_PADRAO)
+
+    statement = query.limit(limite + 1).offset(deslocamento)
+    linhas = (await db.execute(statement)).all() if schema_linhas else (await db.scalars(statement)).all()
+    has_next = len(linhas) > limite
+    linhas = linhas[:limite]
+    items = itens_de_linhas(schema_linhas, linhas) if schema_linhas else linhas
+
+    vistos = deslocamento + len(linhas)
+    if not has_next and (linhas or deslocamento == 0):
+        total, exato = vistos, True
+    else:
+        # Contagem lida de uma réplica pode estar atrasada em relação às invalidações: não vai ao cache
+        em_cache = contagem_em_cache and not db.info.get("replica")
+        chave = chave_contagem(recurso, filtro) if em_cache else None
+        total, exato = await _contar(db, query, estrategia, chave)
+        if total is not None:
+            # Estimativas (e contagens em cache de outro processo) nunca ficam abaixo do que a página já mostrou
+            total = max(total, vistos + has_next)
+
+    pagina = create_page(items, total=total, params=params, total_exact=exato, has_next=has_next)
+    if not settings.SERIALIZACAO_RAPIDA:
+        return pagina
+    return resposta_json(type(pagina), pagina)
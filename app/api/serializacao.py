@@ -0,0 +1,63 @@
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Select, select
+
+from app.core import dinheiro
+
+
+@lru_cache(maxsize=None)
+def adaptador(tipo) -> TypeAdapter:
+    """ TypeAdapter por tipo (ex.: Page[TransacaoRead]), montado uma única vez por processo. """
+    return TypeAdapter(tipo)
+
+
+def resposta_json(tipo, valor) -> Response:
+    """
+    Serializa `valor` direto para bytes JSON com o serializador compilado do pydantic-core,
+    sem a segunda validação do response_model nem o jsonable_encoder do FastAPI.
+    """
+    return Response(content=adaptador(tipo).dump_json(valor), media_type="application/json")
+
+
+def colunas(modelo, schema: type[BaseModel]) -> Select:
+    """
+    SELECT apenas das colunas do schema de leitura: as linhas viram tuplas nomeadas e são
+    validadas direto no schema, sem instanciar objetos ORM nem passar pelo identity map.
+    Serve para schemas planos (sem relacionamentos). Campos monetários vêm da coluna
+    "<campo>_unidades" junto com "moeda" e são convertidos em `itens_de_linhas`.
+    """
+    tabela = modelo.__table__
+    selecionadas = {}
+    for campo in schema.model_fields:
+        if campo in tabela.c:
+            selecionadas[campo] = tabela.c[campo]
+        else:
+            selecionadas[campo + dinheiro.SUFIXO_UNIDADES] = tabela.c[campo + dinheiro.SUFIXO_UNIDADES]
+            selecionadas["moeda"] = tabela.c.moeda
+    return select(*selecionadas.values())
+
+
+def itens_de_linhas(schema: type[BaseModel], linhas) -> list:
+    """
+    Valida linhas de `colunas(...)` no schema com o TypeAdapter em cache. Converter a linha em
+    dict antes é bem mais barato que a validação por atributos (from_attributes) do Row.
+    """
+    return adaptador(list[schema]).validate_python([dinheiro.converter_linha(linha._asdict()) for linha in linhas])
+
+
+
+def preparar_serializadores(rotas) -> None:
+    """
+    Monta de antemão os TypeAdapter que `resposta_json` e `itens_de_linhas` montariam na primeira
+    requisição de cada rota: o do response_model e, nas páginas genéricas (ex.: Pagina[CarteiraRead]),
+    o da lista de itens.
+    """
+    for rota in rotas:
+        modelo = getattr(rota, "response_model", None)
+        if modelo is None:
+            continue
+        adaptador(modelo)
+        for argumento in getattr(modelo, "__pydantic_generic_metadata__", {}).get("args", ()):
+            adaptador(list[argumento])
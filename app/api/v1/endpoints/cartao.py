@@ -1,24 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate as sqlalchemy_paginate
 
 from sqlalchemy import select
 
 from app import models, schemas
-from app.api.dependencies import get_db
+from app.api.dependencies import get_db, get_db_leitura
+from app.api.importacao import importar_da_requisicao
+from app.api.pagination import estrategia_contagem, paginar
+from app.api.serializacao import colunas
+from app.core import dinheiro
+from app.core.cache import cache, chave, chaves_contagem
+from app.services import autorizacoes
+from app.services.autorizacoes import AutorizacaoRecusada
+from app.services.importacao import Entidade
 
 router = APIRouter()
 
+def _colunas_do_cartao(dados: dict, carteira) -> dict:
+    """ Limite do schema (Decimal) -> coluna em unidades menores da moeda da carteira, para o INSERT em massa. """
+    dados["moeda"] = carteira.moeda
+    dados["limite_unidades"] = dinheiro.para_unidades(dados.pop("limite"), carteira.moeda)
+    return dados
+
+IMPORTACAO = Entidade(
+    models.Cartao,
+    schemas.CartaoCreate,
+    chaves_unicas=("numero",),
+    referencia=("carteira_id", models.Carteira),
+    converter=_colunas_do_cartao,
+)
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.CartaoRead)
-async def create_cartao(cartao: schemas.CartaoCreate, db: Session = Depends(get_db)):
+async def create_cartao(cartao: schemas.CartaoCreate, db: AsyncSession = Depends(get_db)):
     """
     Cria um novo cartão para uma carteira.
     - Aprimoramento: Verifica se a carteira (dona do cartão) existe antes de criar.
     """
     statement = select(models.Carteira).where(models.Carteira.id == cartao.carteira_id)
-    db_carteira = db.execute(statement).scalar_one_or_none()
+    db_carteira = (await db.execute(statement)).scalar_one_or_none()
 
     if not db_carteira:
         raise HTTPException(
@@ -26,65 +46,173 @@ async def create_cartao(cartao: schemas.CartaoCreate, db: Session = Depends(get_
             detail=f"Carteira com id {cartao.carteira_id} não encontrada."
         )
 
-    db_cartao = models.Cartao(**cartao.model_dump())
+    try:
+        # O limite é gravado em unidades menores da moeda da carteira
+        db_cartao = models.Cartao(moeda=db_carteira.moeda, **cartao.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
     db.add(db_cartao)
-    db.commit()
-    db.refresh(db_cartao)
+    await db.commit()
+    # A leitura da carteira lista os seus cartões
+    cache.invalidar(chave("carteira", cartao.carteira_id), *chaves_contagem("cartoes", cartao.carteira_id))
+    await db.refresh(db_cartao)
     return db_cartao
 
-@router.get("/", response_model=Page[schemas.CartaoRead])
-async def read_cartoes(db: Session = Depends(get_db), carteira_id: Optional[int] = None):
+@router.post("/bulk", response_model=schemas.ImportacaoRead)
+async def bulk_create_cartoes(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Importa cartões em massa a partir de um corpo NDJSON (`application/x-ndjson`) ou CSV (`text/csv`).
+    - Validação em lotes com o mesmo schema do POST unitário e INSERT multi-linha por lote.
+    - Números repetidos e carteiras inexistentes são reportados por linha sem abortar a importação.
+    """
+    return await importar_da_requisicao(request, db, IMPORTACAO)
+
+@router.get("/", response_model=schemas.Pagina[schemas.CartaoRead])
+async def read_cartoes(
+    db: AsyncSession = Depends(get_db_leitura),
+    carteira_id: Optional[int] = None,
+    contagem: Optional[str] = Depends(estrategia_contagem),
+):
     """
     Retorna uma lista paginada de cartões.
     - Aprimoramento: Permite filtrar os cartões por `carteira_id` via query parameter.
+    - Aprimoramento: Lê só as colunas do schema (sem objetos ORM) e serializa a página direto em JSON.
+    - Aprimoramento: Total exato (em cache por `carteira_id`), estimado ou omitido conforme `count`.
     """
-    query = select(models.Cartao)
+    query = colunas(models.Cartao, schemas.CartaoRead)
     if carteira_id:
         query = query.where(models.Cartao.carteira_id == carteira_id)
-    
-    return sqlalchemy_paginate(db, query)
+
+    return await paginar(db, query, "cartoes", contagem, carteira_id or None, schemas.CartaoRead)
 
 @router.get("/{cartao_id}", response_model=schemas.CartaoRead)
-async def read_cartao(cartao_id: int, db: Session = Depends(get_db)):
+async def read_cartao(cartao_id: int, db: AsyncSession = Depends(get_db)):
     """
     Retorna os dados de um cartão específico pelo seu ID.
+    - Aprimoramento: Cache de leitura, invalidado por escritas.
     """
-    statement = select(models.Cartao).where(models.Cartao.id == cartao_id)
-    db_cartao = db.execute(statement).scalar_one_or_none()
+    async def carregar():
+        statement = select(models.Cartao).where(models.Cartao.id == cartao_id)
+        db_cartao = (await db.execute(statement)).scalar_one_or_none()
+        return schemas.CartaoRead.model_validate(db_cartao) if db_cartao else None
 
-    if db_cartao is None:
+    cartao = await cache.obter_ou_carregar(chave("cartao", cartao_id), carregar)
+    if cartao is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cartão não encontrado")
-    return db_cartao
+    return cartao
 
 @router.put("/{cartao_id}", response_model=schemas.CartaoRead)
-async def update_cartao(cartao_id: int, cartao: schemas.CartaoUpdate, db: Session = Depends(get_db)):
+async def update_cartao(cartao_id: int, cartao: schemas.CartaoUpdate, db: AsyncSession = Depends(get_db)):
     """
     Atualiza informações de um cartão.
     """
     statement = select(models.Cartao).where(models.Cartao.id == cartao_id)
-    db_cartao = db.execute(statement).scalar_one_or_none()
+    db_cartao = (await db.execute(statement)).scalar_one_or_none()
 
     if db_cartao is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cartão não encontrado")
 
     update_data = cartao.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_cartao, key, value)
+    try:
+        for key, value in update_data.items():
+            setattr(db_cartao, key, value)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
     db.add(db_cartao)
-    db.commit()
-    db.refresh(db_cartao)
+    await db.commit()
+    cache.invalidar(chave("cartao", cartao_id))
+    await db.refresh(db_cartao)
     return db_cartao
 
 @router.delete("/{cartao_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_cartao(cartao_id: int, db: Session = Depends(get_db)):
+async def delete_cartao(cartao_id: int, db: AsyncSession = Depends(get_db)):
     """
     Deleta um cartão.
     """
     statement = select(models.Cartao).where(models.Cartao.id == cartao_id)
-    db_cartao = db.execute(statement).scalar_one_or_none()
+    db_cartao = (await db.execute(statement)).scalar_one_or_none()
 
     if db_cartao:
-        db.delete(db_cartao)
-        db.commit()
-    return None
\ No newline at end of file
+        await db.delete(db_cartao)
+        await db.commit()
+        cache.invalidar(
+            chave("cartao", cartao_id), chave("moeda_cartao", cartao_id), chave("carteira", db_cartao.carteira_id),
+            *chaves_contagem("cartoes", db_cartao.carteira_id),
+        )
+    return None
+
+def _autorizacao(db_autorizacao: models.Autorizacao) -> schemas.AutorizacaoRead:
+    moeda = db_autorizacao.moeda
+    capturado = db_autorizacao.capturado_unidades
+    return schemas.AutorizacaoRead(
+        id=db_autorizacao.id,
+        cartao_id=db_autorizacao.cartao_id,
+        estado=db_autorizacao.estado,
+        valor=dinheiro.para_decimal(db_autorizacao.valor_unidades, moeda),
+        capturado=dinheiro.para_decimal(capturado, moeda) if capturado is not None else None,
+        moeda=moeda,
+        criada_em=db_autorizacao.criada_em,
+        encerrada_em=db_autorizacao.encerrada_em,
+    )
+
+@router.post(
+    "/{cartao_id}/autorizacoes", status_code=status.HTTP_201_CREATED, response_model=schemas.AutorizacaoRead
+)
+async def autorizar_compra(
+    cartao_id: int,
+    autorizacao: schemas.AutorizacaoCreate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Autoriza uma compra: reserva o valor no limite disponível do cartão (201) ou recusa (402).
+    - Aprimoramento: A decisão é um único UPDATE condicional na linha de uso do cartão, sem leitura
+      prévia: autorizações simultâneas nunca excedem o limite.
+    - A reserva fica em aberto até a captura (POST .../captura) ou a liberação (POST .../liberacao).
+    """
+    try:
+        db_autorizacao = await autorizacoes.autorizar(db, cartao_id, autorizacao.valor)
+    except AutorizacaoRecusada as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    response.headers["Location"] = str(
+        request.url_for("read_autorizacao", cartao_id=cartao_id, autorizacao_id=db_autorizacao.id)
+    )
+    return _autorizacao(db_autorizacao)
+
+@router.get("/{cartao_id}/autorizacoes/{autorizacao_id}", response_model=schemas.AutorizacaoRead)
+async def read_autorizacao(cartao_id: int, autorizacao_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Retorna uma autorização do cartão.
+    """
+    db_autorizacao = await db.get(models.Autorizacao, autorizacao_id)
+    if db_autorizacao is None or db_autorizacao.cartao_id != cartao_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Autorização não encontrada")
+    return _autorizacao(db_autorizacao)
+
+@router.post("/{cartao_id}/autorizacoes/{autorizacao_id}/captura", response_model=schemas.AutorizacaoRead)
+async def capturar_autorizacao(
+    cartao_id: int,
+    autorizacao_id: int,
+    captura: Optional[schemas.AutorizacaoCaptura] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Captura uma autorização reservada: o valor (padrão: toda a reserva) passa a utilizado e o
+    restante volta ao disponível. Uma autorização só é capturada ou liberada uma vez (409).
+    """
+    try:
+        return _autorizacao(await autorizacoes.capturar(db, cartao_id, autorizacao_id, captura.valor if captura else None))
+    except AutorizacaoRecusada as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@router.post("/{cartao_id}/autorizacoes/{autorizacao_id}/liberacao", response_model=schemas.AutorizacaoRead)
+async def liberar_autorizacao(cartao_id: int, autorizacao_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Libera (cancela) uma autorização reservada, devolvendo o valor ao disponível do cartão.
+    """
+    try:
+        return _autorizacao(await autorizacoes.liberar(db, cartao_id, autorizacao_id))
+    except AutorizacaoRecusada as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
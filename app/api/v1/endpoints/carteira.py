@@ -1,90 +1,309 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Optional
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate as sqlalchemy_paginate
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Literal, Optional
 
 from sqlalchemy import select
 
 from app import models, schemas
-from app.api.dependencies import get_db
+from app.api.dependencies import get_db, get_db_leitura
+from app.api.etag import exigir_if_match, gerar_etag, nao_modificado, versao_concorrente
+from app.api.importacao import importar_da_requisicao
+from app.api.pagination import estrategia_contagem, paginar
+from app.core import dinheiro
+from app.core.cache import cache, chave, chaves_contagem
+from app.core.config import settings
+from app.services import fatias, resumos, saldos
+from app.services.importacao import Entidade
 
 router = APIRouter()
 
+def _colunas_da_carteira(dados: dict, usuario) -> dict:
+    """ Saldo do schema (Decimal) -> coluna em unidades menores, para o INSERT em massa. """
+    dados["saldo_unidades"] = dinheiro.para_unidades(dados.pop("saldo_atual"), dados["moeda"])
+    return dados
+
+async def _fotos_iniciais(db: AsyncSession, carteiras: list[tuple[int, dict]]) -> None:
+    """ Saldo inicial das carteiras importadas, base das consultas de saldo passado. """
+    await saldos.registrar_fotos(db, [saldos.foto(id, dados["saldo_unidades"], 0) for id, dados in carteiras])
+
+IMPORTACAO = Entidade(
+    models.Carteira,
+    schemas.CarteiraCreate,
+    referencia=("usuario_id", models.Usuario),
+    converter=_colunas_da_carteira,
+    apos_inserir=_fotos_iniciais,
+)
+
+async def get_carteira(db: AsyncSession, carteira_id: int):
+    """ Busca uma carteira pelo ID já com os cartões carregados (evita lazy load em contexto assíncrono). """
+    statement = (
+        select(models.Carteira)
+        .where(models.Carteira.id == carteira_id)
+        .options(selectinload(models.Carteira.cartoes))
+    )
+    return (await db.execute(statement)).scalar_one_or_none()
+
+def etag_carteira(db_carteira: models.Carteira) -> str:
+    """
+    A representação inclui os cartões (id e número, imutáveis): basta a versão e a lista de ids.
+    O saldo entra à parte: créditos em carteiras quentes não passam pela linha (nem pela versão).
+    """
+    return gerar_etag(
+        db_carteira.id, db_carteira.versao, db_carteira.saldo_total_unidades, [c.id for c in db_carteira.cartoes]
+    )
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.CarteiraRead)
-async def create_carteira(carteira: schemas.CarteiraCreate, db: Session = Depends(get_db)):
+async def create_carteira(carteira: schemas.CarteiraCreate, db: AsyncSession = Depends(get_db)):
     """
     Cria uma nova carteira para um usuário.
     - Aprimoramento: Verifica se o usuário (dono da carteira) existe antes de criar.
     """
     statement = select(models.Usuario).where(models.Usuario.id == carteira.usuario_id)
-    db_usuario = db.execute(statement).scalar_one_or_none()
+    db_usuario = (await db.execute(statement)).scalar_one_or_none()
 
     if not db_usuario:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Usuário com id {carteira.usuario_id} não encontrado."
         )
-    
+
     db_carteira = models.Carteira(**carteira.model_dump())
     db.add(db_carteira)
-    db.commit()
-    db.refresh(db_carteira)
-    return db_carteira
+    await db.flush()
+    # Saldo inicial: base das consultas de saldo passado (nenhuma transação anterior)
+    await saldos.fotografar(db, db_carteira.id, db_carteira.saldo_unidades, ate_transacao_id=0)
+    await db.commit()
+    # A leitura do usuário lista as suas carteiras
+    cache.invalidar(chave("usuario", carteira.usuario_id), *chaves_contagem("carteiras", carteira.usuario_id))
+    return await get_carteira(db, db_carteira.id)
+
+@router.post("/bulk", response_model=schemas.ImportacaoRead)
+async def bulk_create_carteiras(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Importa carteiras em massa a partir de um corpo NDJSON (`application/x-ndjson`) ou CSV (`text/csv`).
+    - Validação em lotes com o mesmo schema do POST unitário e INSERT multi-linha por lote.
+    - Carteiras de usuários inexistentes são reportadas por linha sem abortar a importação.
+    """
+    return await importar_da_requisicao(request, db, IMPORTACAO)
 
-@router.get("/", response_model=Page[schemas.CarteiraRead])
-async def read_carteiras(db: Session = Depends(get_db), usuario_id: Optional[int] = None):
+@router.get("/", response_model=schemas.Pagina[schemas.CarteiraRead])
+async def read_carteiras(
+    db: AsyncSession = Depends(get_db_leitura),
+    usuario_id: Optional[int] = None,
+    contagem: Optional[str] = Depends(estrategia_contagem),
+):
     """
     Retorna uma lista paginada de carteiras.
     - Aprimoramento: Permite filtrar as carteiras por `usuario_id` via query parameter.
+    - Aprimoramento: Total exato (em cache por `usuario_id`), estimado ou omitido conforme `count`.
     """
-    query = select(models.Carteira)
+    query = select(models.Carteira).options(selectinload(models.Carteira.cartoes))
     if usuario_id:
         query = query.where(models.Carteira.usuario_id == usuario_id)
-    
-    return sqlalchemy_paginate(db, query)
+
+    return await paginar(db, query, "carteiras", contagem, usuario_id or None)
 
 @router.get("/{carteira_id}", response_model=schemas.CarteiraRead)
-async def read_carteira(carteira_id: int, db: Session = Depends(get_db)):
+async def read_carteira(
+    carteira_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
     """
     Retorna os dados de uma carteira específica pelo seu ID.
+    - Aprimoramento: Cache de leitura, invalidado por escritas e transferências.
+    - Aprimoramento: ETag forte; com If-None-Match da versão atual responde 304 sem corpo.
     """
-    statement = select(models.Carteira).where(models.Carteira.id == carteira_id)
-    db_carteira = db.execute(statement).scalar_one_or_none()
+    async def carregar():
+        db_carteira = await get_carteira(db, carteira_id)
+        if db_carteira is None:
+            return None
+        return etag_carteira(db_carteira), schemas.CarteiraRead.model_validate(db_carteira)
 
-    if db_carteira is None:
+    encontrada = await cache.obter_ou_carregar(chave("carteira", carteira_id), carregar)
+    if encontrada is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carteira não encontrada")
-    return db_carteira
+
+    etag, carteira = encontrada
+    if (nao_modificada := nao_modificado(request, etag)) is not None:
+        return nao_modificada
+    response.headers["ETag"] = etag
+    return carteira
+
+async def _moeda_da_carteira(db: AsyncSession, carteira_id: int) -> str:
+    moeda = await db.scalar(select(models.Carteira.moeda).where(models.Carteira.id == carteira_id))
+    if moeda is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carteira não encontrada")
+    return moeda
+
+async def _saldo_em(db: AsyncSession, carteira_id: int, momento: datetime) -> saldos.SaldoEm:
+    saldo = await saldos.saldo_em(db, carteira_id, momento)
+    if saldo is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Não há saldo registrado da carteira {carteira_id} antes de {momento.isoformat()}.",
+        )
+    return saldo
+
+@router.get("/{carteira_id}/saldo", response_model=schemas.SaldoHistoricoRead)
+async def read_saldo_historico(
+    carteira_id: int,
+    momento: Optional[datetime] = Query(None, alias="at"),
+    db: AsyncSession = Depends(get_db_leitura),
+):
+    """
+    Retorna o saldo da carteira imediatamente antes do instante `at` (padrão: agora).
+    - Aprimoramento: Parte da foto de saldo mais recente antes de `at` e soma só as transações
+      seguintes a ela: o custo não depende do tamanho do histórico.
+    """
+    moeda = await _moeda_da_carteira(db, carteira_id)
+    momento = saldos.instante(momento)
+    saldo = await _saldo_em(db, carteira_id, momento)
+    return schemas.SaldoHistoricoRead(
+        carteira_id=carteira_id,
+        moeda=moeda,
+        momento=momento,
+        saldo=dinheiro.para_decimal(saldo.saldo_unidades, moeda),
+        foto_momento=saldo.foto.momento,
+        transacoes_apos_foto=saldo.transacoes,
+    )
+
+@router.get("/{carteira_id}/extrato", response_model=schemas.ExtratoRead)
+async def read_extrato(
+    carteira_id: int,
+    inicio: datetime = Query(..., alias="from"),
+    fim: Optional[datetime] = Query(None, alias="to"),
+    apos_id: int = Query(0, ge=0),
+    size: int = Query(100, ge=1, le=settings.EXTRATO_MAX_LANCAMENTOS),
+    db: AsyncSession = Depends(get_db_leitura),
+):
+    """
+    Extrato da carteira em [from, to) (padrão de `to`: agora), com o saldo após cada transação.
+    - Aprimoramento: Saldo inicial pela foto mais recente + transações seguintes; saldo corrente por
+      SUM(...) OVER (ORDER BY timestamp, id) no banco, lendo só as transações (e partições) do período.
+    - Lançamentos em ordem de (timestamp, id), a mesma do saldo em um instante (`/saldo`).
+    - Com mais de `size` lançamentos, `proximo_apos_id` é o `apos_id` da página seguinte.
+    """
+    moeda = await _moeda_da_carteira(db, carteira_id)
+    inicio, fim = saldos.instante(inicio), saldos.instante(fim)
+    base = await _saldo_em(db, carteira_id, inicio)
+    linhas = await saldos.lancamentos(db, carteira_id, inicio, fim, apos_id, size + 1)
+    return schemas.ExtratoRead(
+        carteira_id=carteira_id,
+        moeda=moeda,
+        inicio=inicio,
+        fim=fim,
+        saldo_inicial=dinheiro.para_decimal(base.saldo_unidades, moeda),
+        lancamentos=[
+            schemas.LancamentoExtrato(
+                transacao_id=linha.id,
+                timestamp=linha.timestamp,
+                carteira_origem_id=linha.carteira_origem_id,
+                carteira_destino_id=linha.carteira_destino_id,
+                valor=dinheiro.para_decimal(linha.delta, moeda),
+                saldo=dinheiro.para_decimal(base.saldo_unidades + linha.acumulado, moeda),
+            )
+            for linha in linhas[:size]
+        ],
+        proximo_apos_id=linhas[size - 1].id if len(linhas) > size else None,
+    )
+
+@router.get("/{carteira_id}/resumo", response_model=schemas.ResumoCarteiraRead)
+async def read_resumo(
+    carteira_id: int,
+    granularidade: Literal["day", "month"] = Query("day", alias="granularity"),
+    desde: Optional[date] = Query(None, alias="from"),
+    ate: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db_leitura),
+):
+    """
+    Entradas, saídas e quantidade de transações da carteira por dia ou mês (`from`/`to` inclusivos).
+    - Aprimoramento: Lê só os resumos mantidos pelas transferências: custo proporcional ao número
+      de períodos, não ao de transações.
+    """
+    moeda = await _moeda_da_carteira(db, carteira_id)
+    return schemas.ResumoCarteiraRead(
+        carteira_id=carteira_id,
+        moeda=moeda,
+        granularidade=granularidade,
+        periodos=[
+            schemas.ResumoPeriodo(
+                periodo=resumo.periodo,
+                entradas=dinheiro.para_decimal(resumo.entradas_unidades, moeda),
+                saidas=dinheiro.para_decimal(resumo.saidas_unidades, moeda),
+                quantidade=resumo.quantidade,
+            )
+            for resumo in await resumos.listar(db, carteira_id, granularidade, desde, ate)
+        ],
+    )
 
 @router.put("/{carteira_id}", response_model=schemas.CarteiraRead)
-async def update_carteira(carteira_id: int, carteira: schemas.CarteiraUpdate, db: Session = Depends(get_db)):
+async def update_carteira(
+    carteira_id: int,
+    carteira: schemas.CarteiraUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
     """
     Atualiza informações de uma carteira.
+    - Aprimoramento: Com If-Match, só atualiza se o ETag ainda for o atual (senão 412).
+      O UPDATE confere a versão lida, então uma transferência concorrente também resulta em 412.
+    - Alterar o saldo grava uma foto em saldos_historicos (consultas de saldo passado continuam exatas).
+    - `fatias` liga (N > 0) ou desliga (0) o modo quente, para carteiras que recebem muitos créditos simultâneos.
     """
-    statement = select(models.Carteira).where(models.Carteira.id == carteira_id)
-    db_carteira = db.execute(statement).scalar_one_or_none()
+    db_carteira = await get_carteira(db, carteira_id)
 
     if db_carteira is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carteira não encontrada")
+    exigir_if_match(request, etag_carteira(db_carteira))
 
     update_data = carteira.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_carteira, key, value)
+    muda_saldo = update_data.keys() & {"saldo_atual", "fatias"}
+    if muda_saldo:
+        # Saldo e modo partem da linha principal com as fatias já recolhidas (e travada)
+        await fatias.recolher(db, [carteira_id])
+        await db.refresh(db_carteira, ["saldo_unidades", "saldo_em_fatias"])
+    try:
+        for key, value in update_data.items():
+            setattr(db_carteira, key, value)
+    except ValueError as e:
+        # Valor com mais casas decimais do que a moeda da carteira permite
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
     db.add(db_carteira)
-    db.commit()
-    db.refresh(db_carteira)
+    try:
+        await db.flush()
+    except StaleDataError:
+        await db.rollback()
+        raise versao_concorrente()
+    if muda_saldo:
+        # Saldo alterado fora de uma transferência (o histórico não o reconstituiria) ou mudança de modo
+        # (carteiras quentes não têm fotos nas transferências: as consultas partem desta)
+        await db.refresh(db_carteira, ["saldo_em_fatias"])
+        await saldos.fotografar(db, carteira_id, db_carteira.saldo_total_unidades)
+    await db.commit()
+    cache.invalidar(chave("carteira", carteira_id), chave("usuario", db_carteira.usuario_id), chave("fatias", carteira_id))
+    await db.refresh(db_carteira)
+    response.headers["ETag"] = etag_carteira(db_carteira)
     return db_carteira
 
 @router.delete("/{carteira_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_carteira(carteira_id: int, db: Session = Depends(get_db)):
+async def delete_carteira(carteira_id: int, db: AsyncSession = Depends(get_db)):
     """
     Deleta uma carteira.
     """
-    statement = select(models.Carteira).where(models.Carteira.id == carteira_id)
-    db_carteira = db.execute(statement).scalar_one_or_none()
+    db_carteira = await get_carteira(db, carteira_id)
 
     if db_carteira:
-        db.delete(db_carteira)
-        db.commit()
-    return None
\ No newline at end of file
+        chaves = [chave("carteira", carteira_id), chave("moeda", carteira_id), chave("usuario", db_carteira.usuario_id)]
+        chaves.append(chave("fatias", carteira_id))
+        for db_cartao in db_carteira.cartoes:
+            chaves += [chave("cartao", db_cartao.id), chave("moeda_cartao", db_cartao.id)]
+        chaves += chaves_contagem("carteiras", db_carteira.usuario_id) + chaves_contagem("cartoes", carteira_id)
+        await db.delete(db_carteira)
+        await db.commit()
+        cache.invalidar(*chaves)
+    return None
@@ -1,88 +1,305 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select, or_
-from typing import Optional
+import csv
+import io
+from datetime import datetime
+from typing import Optional, List, Annotated, Literal
 
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate as sqlalchemy_paginate
+import orjson
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.orm import aliased
 
 from app import models, schemas
-from app.api.dependencies import get_db
+from app.api.dependencies import get_db, get_db_leitura, get_sessionmaker_leitura
+from app.api.pagination import codificar_cursor, decodificar_cursor, estrategia_contagem, paginar
+from app.api.serializacao import colunas
+from app.core import dinheiro
+from app.core.config import settings
+from app.services import fila
+from app.services.transferencia import (
+    RECUSAS,
+    realizar_transferencia,
+    realizar_transferencia_idempotente,
+    realizar_transferencias_em_lote,
+    TransferenciaRecusada,
+    LoteRecusado,
+)
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.TransacaoRead)
-async def realizar_transacao(transacao: schemas.TransacaoCreate, db: Session = Depends(get_db)):
-
+async def realizar_transacao(
+    transacao: schemas.TransacaoCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Transfere um valor entre duas carteiras da mesma moeda.
+    - Aprimoramento: Débito condicional (sem leitura prévia), travas em ordem fixa e novas tentativas em deadlock.
+    - Aprimoramento: Com `Idempotency-Key`, repetições da mesma requisição devolvem a resposta original
+      (header `Idempotent-Replayed: true`) sem nova transferência; a chave expira após IDEMPOTENCIA_TTL_HORAS.
+    """
     try:
-        if transacao.carteira_origem_id == transacao.carteira_destino_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="A carteira de origem e destino não podem ser a mesma."
-            )
-
-        stmt_origem = select(models.Carteira).where(models.Carteira.id == transacao.carteira_origem_id)
-        carteira_origem = db.execute(stmt_origem).scalar_one_or_none()
-
-        stmt_destino = select(models.Carteira).where(models.Carteira.id == transacao.carteira_destino_id)
-        carteira_destino = db.execute(stmt_destino).scalar_one_or_none()
-
-        if not carteira_origem or not carteira_destino:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Uma ou ambas as carteiras não foram encontradas."
-            )
-        
-        if carteira_origem.moeda != carteira_destino.moeda:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Transferências só são permitidas entre carteiras da mesma moeda."
-            )
+        if idempotency_key is None:
+            return await realizar_transferencia(db, transacao)
+        db_transacao, repetida = await realizar_transferencia_idempotente(db, transacao, idempotency_key)
+        if repetida:
+            response.headers["Idempotent-Replayed"] = "true"
+        return db_transacao
+    except TransferenciaRecusada as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ocorreu um erro inesperado na transação: {e}"
+        )
 
-        if carteira_origem.saldo_atual < transacao.valor:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Saldo insuficiente na carteira de origem."
-            )
-            
-        carteira_origem.saldo_atual -= transacao.valor
-        carteira_destino.saldo_atual += transacao.valor
-
-        db_transacao = models.Transacao(
-            valor=transacao.valor,
-            carteira_origem_id=transacao.carteira_origem_id,
-            carteira_destino_id=transacao.carteira_destino_id
+def _item_do_lote(resultado) -> schemas.TransacaoLoteItem:
+    if resultado.recusa is not None:
+        return schemas.TransacaoLoteItem(
+            indice=resultado.indice, motivo=resultado.recusa.motivo, detail=resultado.recusa.detail
         )
-        db.add(db_transacao)
-        
-        db.commit()
-        db.refresh(db_transacao)
-        
-        return db_transacao
+    return schemas.TransacaoLoteItem(
+        indice=resultado.indice, transacao=schemas.TransacaoRead.model_validate(resultado.transacao)
+    )
 
-    except HTTPException:
-        db.rollback()
-        raise
+@router.post("/batch", response_model=schemas.TransacaoLoteRead)
+async def realizar_transacoes_em_lote(
+    transacoes: Annotated[
+        List[schemas.TransacaoCreate], Body(min_length=1, max_length=settings.TRANSACAO_LOTE_MAX_ITENS)
+    ],
+    atomico: bool = True,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Efetiva um lote de transferências com um único commit.
+    - `atomico=true` (padrão): tudo-ou-nada; qualquer recusa cancela o lote e retorna 400 com os itens recusados.
+    - `atomico=false`: efetiva os itens válidos e reporta o resultado de cada item.
+    """
+    try:
+        resultados = await realizar_transferencias_em_lote(db, transacoes, atomico=atomico)
+    except LoteRecusado as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail={"mensagem": e.detail, "recusados": [_item_do_lote(r).model_dump() for r in e.recusados]},
+        )
+    except TransferenciaRecusada as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ocorreu um erro inesperado na transação: {e}"
+            detail=f"Ocorreu um erro inesperado no lote de transações: {e}"
         )
 
-@router.get("/", response_model=Page[schemas.TransacaoRead])
+    itens = [_item_do_lote(r) for r in resultados]
+    recusadas = sum(1 for item in itens if item.motivo is not None)
+    return schemas.TransacaoLoteRead(efetivadas=len(itens) - recusadas, recusadas=recusadas, resultados=itens)
+
+def _situacao(request: Request, agendada: models.TransferenciaAgendada, db_transacao=None):
+    return schemas.TransferenciaAgendadaRead(
+        id=agendada.id,
+        estado=agendada.estado,
+        status_url=str(request.url_for("situacao_da_transferencia", agendada_id=agendada.id)),
+        carteira_origem_id=agendada.carteira_origem_id,
+        carteira_destino_id=agendada.carteira_destino_id,
+        valor=dinheiro.para_decimal(agendada.valor_unidades, agendada.moeda),
+        criada_em=agendada.criada_em,
+        processada_em=agendada.processada_em,
+        transacao=schemas.TransacaoRead.model_validate(db_transacao) if db_transacao is not None else None,
+        motivo=agendada.motivo,
+        detail=RECUSAS[agendada.motivo][1] if agendada.motivo else None,
+    )
+
+@router.post("/async", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.TransferenciaAgendadaRead)
+async def agendar_transacao(
+    transacao: schemas.TransacaoCreate, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
+    """
+    Recebe uma transferência para processamento assíncrono e responde 202 com a URL de situação (`Location`).
+    - Aprimoramento: Só um INSERT na fila; o worker efetiva muitas transferências por commit (group commit).
+    - Recusas que não dependem de saldo (mesma carteira, moeda, valor) são respondidas na hora;
+      saldo insuficiente aparece na situação como `recusada`.
+    """
+    try:
+        agendada = await fila.enfileirar(db, transacao)
+    except TransferenciaRecusada as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    situacao = _situacao(request, agendada)
+    response.headers["Location"] = situacao.status_url
+    return situacao
+
+@router.get("/async/{agendada_id}", response_model=schemas.TransferenciaAgendadaRead)
+async def situacao_da_transferencia(agendada_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Situação de uma transferência de POST /transacoes/async: `pendente`, `efetivada` (com a transação)
+    ou `recusada` (com `motivo` e `detail`).
+    """
+    agendada = await db.get(models.TransferenciaAgendada, agendada_id)
+    if agendada is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transferência não encontrada")
+    db_transacao = None
+    if agendada.transacao_id is not None:
+        statement = select(models.Transacao).where(models.Transacao.id == agendada.transacao_id)
+        db_transacao = (await db.execute(statement)).scalar_one_or_none()
+    return _situacao(request, agendada, db_transacao)
+
+def _no_periodo(query, desde: Optional[datetime], ate: Optional[datetime]):
+    """
+    Restringe `query` ao intervalo [desde, ate) de `timestamp`. No PostgreSQL a tabela é
+    particionada por mês nessa coluna: o planner só visita as partições do intervalo.
+    """
+    if desde:
+        query = query.where(models.Transacao.timestamp >= desde)
+    if ate:
+        query = query.where(models.Transacao.timestamp < ate)
+    return query
+
+def _ids_da_carteira(carteira_id: int, desde: Optional[datetime] = None, ate: Optional[datetime] = None):
+    """
+    Ids das transações de uma carteira (enviadas ou recebidas).
+    UNION ALL em vez de OR: cada ramo usa o seu índice (origem/destino) e, como origem e
+    destino nunca são a mesma carteira, não há duplicatas.
+    O intervalo é aplicado em cada ramo para que as partições fora dele também sejam descartadas ali.
+    """
+    return union_all(
+        _no_periodo(select(models.Transacao.id).where(models.Transacao.carteira_origem_id == carteira_id), desde, ate),
+        _no_periodo(select(models.Transacao.id).where(models.Transacao.carteira_destino_id == carteira_id), desde, ate),
+    )
+
+@router.get("/", response_model=schemas.Pagina[schemas.TransacaoRead])
 async def listar_transacoes(
-    db: Session = Depends(get_db),
-    carteira_id: Optional[int] = None # Filtro opcional
+    db: AsyncSession = Depends(get_db_leitura),
+    carteira_id: Optional[int] = None, # Filtro opcional
+    desde: Optional[datetime] = Query(None, alias="from"),
+    ate: Optional[datetime] = Query(None, alias="to"),
+    contagem: Optional[str] = Depends(estrategia_contagem),
 ):
-    query = select(models.Transacao).order_by(models.Transacao.timestamp.desc())
+    """
+    Lista transações (mais recentes primeiro) com paginação por página/tamanho.
+    - Aprimoramento: Lê só as colunas do schema (sem objetos ORM) e serializa a página direto em JSON.
+    - Aprimoramento: `from`/`to` filtram por `timestamp` (intervalo [from, to)) e limitam a leitura às partições do período.
+    - Aprimoramento: `count=estimated` usa a estimativa do planner; `count=none` dispensa o total (só has_next).
+      O total exato fica em cache por `carteira_id` (sem `from`/`to`) e é invalidado pelas novas transferências.
+    """
+    query = colunas(models.Transacao, schemas.TransacaoRead).order_by(models.Transacao.timestamp.desc())
+    query = _no_periodo(query, desde, ate)
 
     if carteira_id:
-        query = query.where(
-            or_(
-                models.Transacao.carteira_origem_id == carteira_id,
-                models.Transacao.carteira_destino_id == carteira_id
+        query = query.where(models.Transacao.id.in_(_ids_da_carteira(carteira_id, desde, ate)))
+
+    periodo = desde is not None or ate is not None
+    return await paginar(
+        db, query, "transacoes", contagem, carteira_id or None, schemas.TransacaoRead, contagem_em_cache=not periodo
+    )
+
+@router.get("/cursor", response_model=schemas.TransacaoCursorPage)
+async def listar_transacoes_por_cursor(
+    db: AsyncSession = Depends(get_db_leitura),
+    carteira_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    size: int = Query(50, ge=1, le=100),
+    desde: Optional[datetime] = Query(None, alias="from"),
+    ate: Optional[datetime] = Query(None, alias="to"),
+):
+    """
+    Lista transações (mais recentes primeiro) com paginação por cursor em (timestamp, id).
+    - Aprimoramento: Sem OFFSET nem COUNT(*); qualquer página custa o mesmo que a primeira.
+    - Com `carteira_id`, cada ramo (origem/destino) é paginado no seu índice e os dois são unidos.
+    - `from`/`to` filtram por `timestamp` (intervalo [from, to)) e limitam a leitura às partições do período.
+    """
+    posicao = decodificar_cursor(cursor) if cursor else None
+
+    def pagina(entidade, query):
+        return query.order_by(entidade.timestamp.desc(), entidade.id.desc()).limit(size + 1)
+
+    query = _no_periodo(select(models.Transacao), desde, ate)
+    if posicao:
+        query = query.where(tuple_(models.Transacao.timestamp, models.Transacao.id) < posicao)
+
+    if carteira_id:
+        ramos = [
+            pagina(models.Transacao, query.where(coluna == carteira_id)).subquery()
+            for coluna in (models.Transacao.carteira_origem_id, models.Transacao.carteira_destino_id)
+        ]
+        TransacaoDaCarteira = aliased(models.Transacao, union_all(*(select(r) for r in ramos)).subquery())
+        query = pagina(TransacaoDaCarteira, select(TransacaoDaCarteira))
+    else:
+        query = pagina(models.Transacao, query)
+
+    transacoes = (await db.scalars(query)).all()
+    items = transacoes[:size]
+    next_cursor = None
+    if len(transacoes) > size:
+        next_cursor = codificar_cursor(items[-1].timestamp, items[-1].id)
+    return schemas.TransacaoCursorPage(items=items, next_cursor=next_cursor, size=size)
+
+COLUNAS_EXPORTACAO = ("id", "valor", "timestamp", "carteira_origem_id", "carteira_destino_id")
+
+async def _linhas_exportadas(session_factory, query, formato: str):
+    """
+    Gera o corpo da exportação lendo o resultado aos poucos (cursor do servidor + yield_per),
+    sem instanciar objetos ORM: a memória não depende do tamanho do histórico.
+    """
+    async with session_factory() as db:
+        resultado = await db.stream(query.execution_options(yield_per=settings.TRANSACAO_EXPORT_YIELD_PER))
+
+        if formato == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(COLUNAS_EXPORTACAO)
+            async for linhas in resultado.partitions():
+                for id, unidades, moeda, timestamp, origem_id, destino_id in linhas:
+                    writer.writerow((id, dinheiro.para_decimal(unidades, moeda), timestamp.isoformat(), origem_id, destino_id))
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+            return
+
+        async for linhas in resultado.partitions():
+            yield b"".join(
+                orjson.dumps({
+                    "id": id,
+                    "valor": str(dinheiro.para_decimal(unidades, moeda)),
+                    "timestamp": timestamp,
+                    "carteira_origem_id": origem_id,
+                    "carteira_destino_id": destino_id,
+                }) + b"\n"
+                for id, unidades, moeda, timestamp, origem_id, destino_id in linhas
             )
-        )
-        
-    return sqlalchemy_paginate(db, query)
\ No newline at end of file
+
+@router.get("/export")
+async def exportar_transacoes(
+    session_factory = Depends(get_sessionmaker_leitura),
+    carteira_id: Optional[int] = None,
+    desde: Optional[datetime] = Query(None, alias="from"),
+    ate: Optional[datetime] = Query(None, alias="to"),
+    formato: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+):
+    """
+    Exporta o histórico de transações (mais antigas primeiro) em NDJSON ou CSV, via streaming.
+    - `from`/`to` filtram por `timestamp` (intervalo [from, to)).
+    """
+    query = select(
+        models.Transacao.id,
+        models.Transacao.valor_unidades,
+        models.Transacao.moeda,
+        models.Transacao.timestamp,
+        models.Transacao.carteira_origem_id,
+        models.Transacao.carteira_destino_id,
+    )
+    query = _no_periodo(query, desde, ate)
+    if carteira_id:
+        query = query.where(models.Transacao.id.in_(_ids_da_carteira(carteira_id, desde, ate)))
+    query = query.order_by(models.Transacao.timestamp, models.Transacao.id)
+
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _linhas_exportadas(session_factory, query, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transacoes.{formato}"'},
+    )
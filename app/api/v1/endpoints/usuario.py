@@ -1,77 +1,155 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy import select
-
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate as sqlalchemy_paginate
+from typing import Optional
 
 from app import models, schemas
-from app.api.dependencies import get_db
+from app.api.dependencies import get_db, get_db_leitura
+from app.api.etag import exigir_if_match, gerar_etag, nao_modificado, versao_concorrente
+from app.api.importacao import importar_da_requisicao
+from app.api.pagination import estrategia_contagem, paginar
+from app.core.cache import cache, chave, chaves_contagem
+from app.services.importacao import Entidade
 
 router = APIRouter()
 
+IMPORTACAO = Entidade(models.Usuario, schemas.UsuarioCreate, chaves_unicas=("cpf", "email"))
+
+async def get_usuario(db: AsyncSession, usuario_id: int, *options):
+    """
+    Busca um usuário pelo ID já com as carteiras carregadas (evita lazy load em contexto assíncrono).
+    `options` permite carregar relacionamentos adicionais na mesma leva de consultas.
+    """
+    statement = (
+        select(models.Usuario)
+        .where(models.Usuario.id == usuario_id)
+        .options(selectinload(models.Usuario.carteiras), *options)
+    )
+    return (await db.execute(statement)).scalar_one_or_none()
+
+def etag_usuario(db_usuario: models.Usuario) -> str:
+    """
+    A representação inclui as carteiras: o ETag muda com a versão do usuário e de cada carteira
+    (e com o saldo, que créditos em carteiras quentes alteram sem mudar a versão).
+    """
+    carteiras = [(c.id, c.versao, c.saldo_total_unidades) for c in db_usuario.carteiras]
+    return gerar_etag(db_usuario.id, db_usuario.versao, carteiras)
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UsuarioRead)
-async def create_usuario(usuario: schemas.UsuarioCreate, db: Session = Depends(get_db)):
+async def create_usuario(usuario: schemas.UsuarioCreate, db: AsyncSession = Depends(get_db)):
     """ Cria um novo usuário no banco de dados. """
     db_usuario = models.Usuario(**usuario.model_dump())
     db.add(db_usuario)
     try:
-        db.commit()
-        db.refresh(db_usuario)
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="CPF ou Email já cadastrado no sistema."
         )
-    return db_usuario
+    cache.invalidar(*chaves_contagem("usuarios"))
+    return await get_usuario(db, db_usuario.id)
+
+@router.post("/bulk", response_model=schemas.ImportacaoRead)
+async def bulk_create_usuarios(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Importa usuários em massa a partir de um corpo NDJSON (`application/x-ndjson`) ou CSV (`text/csv`).
+    - Validação em lotes com o mesmo schema do POST unitário e INSERT multi-linha por lote.
+    - Conflitos de CPF/Email (com o banco ou dentro do arquivo) são reportados por linha sem abortar a importação.
+    """
+    return await importar_da_requisicao(request, db, IMPORTACAO)
 
-@router.get("/", response_model=Page[schemas.UsuarioRead])
-async def read_usuarios(db: Session = Depends(get_db)):
-    """ Retorna uma lista paginada de todos os usuários. """
-    return sqlalchemy_paginate(db, select(models.Usuario))
+@router.get("/", response_model=schemas.Pagina[schemas.UsuarioRead])
+async def read_usuarios(db: AsyncSession = Depends(get_db_leitura), contagem: Optional[str] = Depends(estrategia_contagem)):
+    """ Retorna uma lista paginada de todos os usuários (total conforme `count`). """
+    query = select(models.Usuario).options(selectinload(models.Usuario.carteiras))
+    return await paginar(db, query, "usuarios", contagem)
 
 @router.get("/{usuario_id}", response_model=schemas.UsuarioRead)
-async def read_usuario(usuario_id: int, db: Session = Depends(get_db)):
-    """ Retorna os dados de um usuário específico, buscando pelo seu ID. """
-    statement = select(models.Usuario).where(models.Usuario.id == usuario_id)
-    db_usuario = db.execute(statement).scalar_one_or_none()
-    
-    if db_usuario is None:
+async def read_usuario(
+    usuario_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
+    """
+    Retorna os dados de um usuário específico, buscando pelo seu ID (com cache de leitura).
+    - Aprimoramento: ETag forte; com If-None-Match da versão atual responde 304 sem corpo.
+    """
+    async def carregar():
+        db_usuario = await get_usuario(db, usuario_id)
+        if db_usuario is None:
+            return None
+        return etag_usuario(db_usuario), schemas.UsuarioRead.model_validate(db_usuario)
+
+    encontrado = await cache.obter_ou_carregar(chave("usuario", usuario_id), carregar)
+    if encontrado is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
-    return db_usuario
+
+    etag, usuario = encontrado
+    if (nao_modificada := nao_modificado(request, etag)) is not None:
+        return nao_modificada
+    response.headers["ETag"] = etag
+    return usuario
 
 @router.put("/{usuario_id}", response_model=schemas.UsuarioRead)
-async def update_usuario(usuario_id: int, usuario: schemas.UsuarioUpdate, db: Session = Depends(get_db)):
-    """ Atualiza as informações de um usuário existente. """
-    statement = select(models.Usuario).where(models.Usuario.id == usuario_id)
-    db_usuario = db.execute(statement).scalar_one_or_none()
+async def update_usuario(
+    usuario_id: int,
+    usuario: schemas.UsuarioUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Atualiza as informações de um usuário existente.
+    - Aprimoramento: Com If-Match, só atualiza se o ETag ainda for o atual (senão 412).
+      O UPDATE confere a versão lida, então escritas concorrentes também resultam em 412.
+    """
+    db_usuario = await get_usuario(db, usuario_id)
 
     if db_usuario is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
+    exigir_if_match(request, etag_usuario(db_usuario))
 
     update_data = usuario.model_dump(exclude_unset=True)
-    
+
     for key, value in update_data.items():
         setattr(db_usuario, key, value)
 
     db.add(db_usuario)
-    db.commit()
-    db.refresh(db_usuario)
+    try:
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        raise versao_concorrente()
+    cache.invalidar(chave("usuario", usuario_id))
+    await db.refresh(db_usuario)
+    response.headers["ETag"] = etag_usuario(db_usuario)
     return db_usuario
 
 @router.delete("/{usuario_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_usuario(usuario_id: int, db: Session = Depends(get_db)):
+async def delete_usuario(usuario_id: int, db: AsyncSession = Depends(get_db)):
     """ Deleta um usuário do banco de dados. """
-    statement = select(models.Usuario).where(models.Usuario.id == usuario_id)
-    db_usuario = db.execute(statement).scalar_one_or_none()
+    # O cascade precisa das carteiras e dos cartões: carrega tudo de uma vez em vez de carteira por carteira
+    db_usuario = await get_usuario(
+        db, usuario_id, selectinload(models.Usuario.carteiras).selectinload(models.Carteira.cartoes)
+    )
 
     if db_usuario is None:
         # É uma boa prática não vazar se o usuário existia ou não no delete
         # Mas para consistência com o resto do CRUD, vamos manter o 404
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
 
-    db.delete(db_usuario)
-    db.commit()
-    return None
\ No newline at end of file
+    chaves = [chave("usuario", usuario_id)]
+    chaves += chaves_contagem("usuarios") + chaves_contagem("carteiras", usuario_id)
+    chaves += chaves_contagem("cartoes", *(db_carteira.id for db_carteira in db_usuario.carteiras))
+    for db_carteira in db_usuario.carteiras:
+        chaves += [chave("carteira", db_carteira.id), chave("moeda", db_carteira.id), chave("fatias", db_carteira.id)]
+        for db_cartao in db_carteira.cartoes:
+            chaves += [chave("cartao", db_cartao.id), chave("moeda_cartao", db_cartao.id)]
+
+    await db.delete(db_usuario)
+    await db.commit()
+    cache.invalidar(*chaves)
+    return None
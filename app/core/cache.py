@@ -0,0 +1,116 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.core.metricas import CACHE_OPERACOES
+
+
+def chave(entidade: str, id: int) -> str:
+    """ Chave de cache de uma entidade, ex.: chave("carteira", 7) -> "carteira:7". """
+    return f"{entidade}:{id}"
+
+
+def chave_contagem(recurso: str, filtro=None) -> str:
+    """ Chave do total de uma listagem: global ou por valor do filtro, ex.: "contagem:transacoes:7". """
+    return chave(f"contagem:{recurso}", "*" if filtro is None else filtro)
+
+
+def chaves_contagem(recurso: str, *filtros) -> list[str]:
+    """ Totais que mudam ao inserir/remover linhas de `recurso` com esses valores de filtro (e o total global). """
+    return [chave_contagem(recurso)] + [chave_contagem(recurso, filtro) for filtro in filtros]
+
+
+class BackendCache(ABC):
+    """
+    Interface de armazenamento do cache. Um backend compartilhado (ex.: Redis) deve
+    serializar os valores (schemas Pydantic) e respeitar o TTL informado em `guardar`.
+    """
+
+    @abstractmethod
+    def obter(self, chave: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def guardar(self, chave: str, valor: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def remover(self, chave: str) -> None:
+        ...
+
+    @abstractmethod
+    def limpar(self) -> None:
+        ...
+
+
+class MemoriaLRU(BackendCache):
+    """ Backend em memória do processo: LRU limitado a `max_itens`, com expiração por TTL. """
+
+    def __init__(self, max_itens: int):
+        self.max_itens = max_itens
+        self._itens: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def obter(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        expira_em, valor = item
+        if expira_em <= time.monotonic():
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        return valor
+
+    def guardar(self, chave, valor, ttl):
+        self._itens[chave] = (time.monotonic() + ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            CACHE_OPERACOES.labels(resultado="eviction").inc()
+
+    def remover(self, chave):
+        self._itens.pop(chave, None)
+
+    def limpar(self):
+        self._itens.clear()
+
+
+class CacheLeitura:
+    """
+    Cache read-through para os GETs por id.
+    Escritas devem chamar `invalidar` DEPOIS do commit. Uma leitura que começou antes de
+    uma invalidação não grava o valor que leu (ele pode estar desatualizado).
+    """
+
+    def __init__(self, backend: BackendCache):
+        self.backend = backend
+        self._invalidacoes = 0
+
+    async def obter_ou_carregar(self, chave: str, carregar: Callable[[], Awaitable[Optional[Any]]]):
+        if settings.CACHE_ENABLED:
+            valor = self.backend.obter(chave)
+            if valor is not None:
+                CACHE_OPERACOES.labels(resultado="hit").inc()
+                return valor
+            CACHE_OPERACOES.labels(resultado="miss").inc()
+
+        invalidacoes = self._invalidacoes
+        valor = await carregar()
+        # Ausências não são guardadas: o próximo POST não precisa invalidar nada
+        if settings.CACHE_ENABLED and valor is not None and invalidacoes == self._invalidacoes:
+            self.backend.guardar(chave, valor, settings.CACHE_TTL_SEGUNDOS)
+        return valor
+
+    def invalidar(self, *chaves: str) -> None:
+        self._invalidacoes += 1
+        for item in chaves:
+            self.backend.remover(item)
+
+    def limpar(self) -> None:
+        self._invalidacoes += 1
+        self.backend.limpar()
+
+
+cache = CacheLeitura(MemoriaLRU(settings.CACHE_MAX_ITENS))
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -6,5 +8,79 @@ class Settings(BaseSettings):
 
     # Suas configurações, como antes
     DATABASE_URL: str
+    # Réplicas de leitura (mesmo formato da DATABASE_URL; lista JSON no ambiente). Sem réplicas, tudo vai ao primário
+    DATABASE_REPLICA_URLS: list[str] = []
+    # Depois de uma escrita, o cliente lê do primário por até N segundos ou até a réplica alcançar o LSN da escrita
+    REPLICA_FIXAR_SEGUNDOS: float = 5.0
+    # Réplica que falhou ao conectar fica fora do rodízio por N segundos (as leituras vão ao primário)
+    REPLICA_PAUSA_SEGUNDOS: float = 30.0
+
+    # Pool de conexões de cada engine (primário e réplicas), criado no lifespan da aplicação
+    DB_POOL_TAMANHO: int = 10
+    DB_POOL_EXCEDENTE: int = 10
+    DB_POOL_RECICLAR_SEGUNDOS: int = 1800  # -1 nunca recicla
+    DB_POOL_ESPERA_SEGUNDOS: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    # Abre DB_POOL_TAMANHO conexões antes de a aplicação ficar pronta (/health/ready)
+    DB_POOL_AQUECER: bool = True
+    # Tempo máximo por comando SQL em milissegundos (0 desliga)
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    # PgBouncer em modo transação entre a API e o banco: sem pool próprio nem prepared statements nomeados
+    DB_PGBOUNCER: bool = False
+
+    # Transferências: novas tentativas em caso de deadlock/falha de serialização
+    TRANSFERENCIA_MAX_TENTATIVAS: int = 5
+    TRANSFERENCIA_BACKOFF_SEGUNDOS: float = 0.01
+    # Quantidade máxima de itens aceitos em POST /transacoes/batch
+    TRANSACAO_LOTE_MAX_ITENS: int = 5000
+    # Linhas buscadas por vez do cursor do servidor na exportação de transações
+    TRANSACAO_EXPORT_YIELD_PER: int = 2000
+    # Linhas por INSERT/commit nas importações em massa (POST .../bulk)
+    IMPORTACAO_TAMANHO_LOTE: int = 1000
+    # Idempotency-Key das transferências: validade da resposta gravada e
+    # quantas chaves expiradas cada nova chave remove de passagem
+    IDEMPOTENCIA_TTL_HORAS: float = 24.0
+    IDEMPOTENCIA_PURGA_LOTE: int = 100
+
+    # Respostas JSON: ORJSONResponse como classe padrão e, nas listagens, página
+    # serializada direto pelo TypeAdapter (sem revalidar o response_model)
+    RESPOSTA_ORJSON: bool = True
+    SERIALIZACAO_RAPIDA: bool = True
+
+    # Total das listagens paginadas: "exact" (COUNT, em cache por valor do filtro),
+    # "estimated" (estimativa do planner no PostgreSQL) ou "none" (sem total, só has_next).
+    # Padrão geral e por listagem (ex.: {"transacoes": "estimated"}); o parâmetro `count` sobrepõe.
+    CONTAGEM_PADRAO: Literal["exact", "estimated", "none"] = "exact"
+    CONTAGEM_POR_RECURSO: dict[str, Literal["exact", "estimated", "none"]] = {}
+
+    # Partições mensais de transações (PostgreSQL): meses futuros criados pela manutenção
+    # (python -m app.database.particoes) e pela migração que particiona a tabela
+    PARTICOES_MESES_A_FRENTE: int = 3
+
+    # Fotos do saldo (saldos_historicos) para consultas de saldo passado e extratos:
+    # uma foto a cada N transferências de cada carteira, além da criação e de alterações diretas do saldo
+    SALDO_FOTO_A_CADA: int = 1000
+    # Lançamentos por página do extrato
+    EXTRATO_MAX_LANCAMENTOS: int = 1000
+
+    # Carteiras quentes (fatias > 0): máximo de fatias por carteira e intervalo do recolhimento
+    # das fatias para a linha principal (0 desliga a tarefa em segundo plano)
+    FATIAS_MAX: int = 64
+    FATIAS_RECOLHER_SEGUNDOS: float = 5.0
+
+    # Fila de POST /transacoes/async: transferências por commit do worker e espera máxima
+    # com a fila vazia (0 desliga o worker deste processo)
+    FILA_LOTE_MAX: int = 500
+    FILA_ESPERA_SEGUNDOS: float = 1.0
+
+    # Instrumentação de SQL por requisição
+    SQL_SERVER_TIMING: bool = True  # Expõe o header Server-Timing
+    SQL_LOG_REQUESTS: bool = False  # Uma linha de log JSON por requisição
+    SQL_SLOW_QUERY_MS: float = 200.0  # Consultas acima deste tempo são logadas como lentas
+
+    # Cache de leitura (GET por id) em memória do processo
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ITENS: int = 10000
+    CACHE_TTL_SEGUNDOS: float = 30.0
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,56 @@
+# Valores monetários são gravados como inteiros em unidades menores da moeda (ex.: centavos),
+# em colunas BIGINT com o sufixo "_unidades" ao lado de uma coluna "moeda". A conversão de/para
+# Decimal acontece só na fronteira (propriedades dos modelos e leitura de linhas), e a API
+# continua recebendo e devolvendo decimais.
+from decimal import Decimal, InvalidOperation
+
+SUFIXO_UNIDADES = "_unidades"
+
+# Casas decimais (ISO 4217) das moedas que não usam 2
+EXPOENTES = {
+    **dict.fromkeys(
+        ("BIF", "CLP", "DJF", "GNF", "ISK", "JPY", "KMF", "KRW", "PYG", "RWF", "UGX", "VND", "VUV", "XAF", "XOF", "XPF"),
+        0,
+    ),
+    **dict.fromkeys(("BHD", "IQD", "JOD", "KWD", "LYD", "OMR", "TND"), 3),
+}
+EXPOENTE_PADRAO = 2
+
+# Faixa de um BIGINT
+MAXIMO_UNIDADES = 2 ** 63 - 1
+
+
+def expoente(moeda: str) -> int:
+    """ Quantidade de casas decimais da moeda (ex.: BRL -> 2, JPY -> 0). """
+    return EXPOENTES.get(moeda.upper(), EXPOENTE_PADRAO)
+
+
+def para_unidades(valor: Decimal, moeda: str) -> int:
+    """
+    Converte um valor decimal em unidades menores da moeda, sem arredondar.
+    Levanta ValueError se o valor tiver mais casas decimais do que a moeda permite ou não couber em BIGINT.
+    """
+    casas = expoente(moeda)
+    try:
+        unidades = Decimal(valor).scaleb(casas)
+    except InvalidOperation:
+        raise ValueError("Valor monetário inválido.")
+    if not unidades.is_finite():
+        raise ValueError("Valor monetário inválido.")
+    if unidades != unidades.to_integral_value():
+        raise ValueError(f"Valores em {moeda} aceitam no máximo {casas} casas decimais.")
+    if abs(unidades) > MAXIMO_UNIDADES:
+        raise ValueError("Valor acima do máximo suportado.")
+    return int(unidades)
+
+
+def para_decimal(unidades: int, moeda: str) -> Decimal:
+    """ Converte unidades menores em Decimal com as casas da moeda (ex.: 10050 BRL -> Decimal("100.50")). """
+    return Decimal(unidades).scaleb(-expoente(moeda))
+
+
+def converter_linha(dados: dict) -> dict:
+    """ Troca cada campo "<nome>_unidades" de uma linha (dict) por "<nome>" em Decimal, usando a coluna "moeda". """
+    for campo in [campo for campo in dados if campo.endswith(SUFIXO_UNIDADES)]:
+        dados[campo[:-len(SUFIXO_UNIDADES)]] = para_decimal(dados.pop(campo), dados["moeda"])
+    return dados
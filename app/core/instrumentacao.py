@@ -0,0 +1,114 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+logger = logging.getLogger("fintracker.sql")
+
+
+@dataclass
+class EstatisticasSQL:
+    """ Estatísticas de SQL acumuladas durante uma requisição (tempos em segundos). """
+    statements: int = 0
+    tempo_total: float = 0.0
+    mais_lenta: float = 0.0
+    sql_mais_lenta: Optional[str] = None
+
+    def server_timing(self, tempo_requisicao: float) -> str:
+        """ Valor do header Server-Timing (durações em milissegundos). """
+        return (
+            f'db;dur={self.tempo_total * 1000:.2f};desc="{self.statements} queries", '
+            f"db-slowest;dur={self.mais_lenta * 1000:.2f}, "
+            f"app;dur={tempo_requisicao * 1000:.2f}"
+        )
+
+
+_estatisticas: ContextVar[Optional[EstatisticasSQL]] = ContextVar("estatisticas_sql", default=None)
+
+
+def estatisticas_atuais() -> Optional[EstatisticasSQL]:
+    """ Estatísticas da requisição corrente (None fora de uma requisição HTTP). """
+    return _estatisticas.get()
+
+
+def _antes_do_cursor(conn, cursor, statement, parameters, context, executemany):
+    context._inicio_sql = time.perf_counter()
+
+
+def _depois_do_cursor(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - context._inicio_sql
+
+    estatisticas = _estatisticas.get()
+    if estatisticas is not None:
+        estatisticas.statements += 1
+        estatisticas.tempo_total += duracao
+        if duracao > estatisticas.mais_lenta:
+            estatisticas.mais_lenta = duracao
+            estatisticas.sql_mais_lenta = statement
+
+    if duracao * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(json.dumps({
+            "evento": "consulta_lenta",
+            "duracao_ms": round(duracao * 1000, 2),
+            "statement": statement,
+        }, ensure_ascii=False))
+
+
+def instrumentar_engine(engine) -> None:
+    """ Registra os eventos de cursor que alimentam as estatísticas por requisição. Aceita engine síncrono ou assíncrono. """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _antes_do_cursor)
+    event.listen(sync_engine, "after_cursor_execute", _depois_do_cursor)
+
+
+class InstrumentacaoSQLMiddleware:
+    """
+    Middleware ASGI que abre um escopo de estatísticas de SQL por requisição, expõe o
+    resultado no header `Server-Timing` e, opcionalmente, registra uma linha de log estruturada.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estatisticas = EstatisticasSQL()
+        token = _estatisticas.set(estatisticas)
+        inicio = time.perf_counter()
+        status_code = None
+
+        async def send_instrumentado(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SQL_SERVER_TIMING:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", estatisticas.server_timing(time.perf_counter() - inicio))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumentado)
+        finally:
+            _estatisticas.reset(token)
+            if settings.SQL_LOG_REQUESTS:
+                logger.info(json.dumps({
+                    "evento": "requisicao",
+                    "metodo": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "statements": estatisticas.statements,
+                    "db_ms": round(estatisticas.tempo_total * 1000, 2),
+                    "db_mais_lenta_ms": round(estatisticas.mais_lenta * 1000, 2),
+                    "sql_mais_lenta": estatisticas.sql_mais_lenta,
+                    "total_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                }, ensure_ascii=False))
@@ -0,0 +1,177 @@
+# Métricas no formato Prometheus.
+# Com vários workers do uvicorn, defina PROMETHEUS_MULTIPROC_DIR (um diretório vazio e
+# gravável, limpo a cada deploy) antes de iniciar a aplicação: cada processo grava seus
+# valores em arquivos mmap e o /metrics agrega todos os workers.
+import os
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+REQUISICOES = Counter(
+    "http_requests_total",
+    "Requisições HTTP atendidas, por rota (template) e status.",
+    ["method", "route", "status"],
+)
+LATENCIA = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP, por rota (template).",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+EM_ANDAMENTO = Gauge(
+    "http_requests_in_progress",
+    "Requisições HTTP em andamento.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# Um pool por engine: `pool` é o nome dado em `criar_engine` (primario, replica_N, manutencao)
+POOL_EM_USO = Gauge(
+    "db_pool_checked_out_connections",
+    "Conexões do pool atualmente em uso, por pool.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Conexões abertas além de pool_size (overflow do QueuePool), por pool.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_ESPERA = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Tempo para obter uma conexão do pool (espera por uma livre ou abertura de uma nova), por pool.",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+REPLICA_VERIFICACAO_LSN = Histogram(
+    "db_replica_lsn_check_seconds",
+    "Tempo para confirmar que a réplica já reproduziu o WAL até o LSN do cliente (leia-suas-escritas), por pool.",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+TRANSFERENCIAS = Counter(
+    "transferencias_total",
+    "Transferências processadas, por resultado e motivo da recusa.",
+    ["resultado", "motivo"],
+)
+
+CACHE_OPERACOES = Counter(
+    "cache_operacoes_total",
+    "Operações do cache de leitura: hit, miss e eviction.",
+    ["resultado"],
+)
+
+# Rotas não encontradas usam um rótulo fixo para não explodir a cardinalidade com paths arbitrários
+ROTA_DESCONHECIDA = "<desconhecida>"
+
+
+def registrar_transferencia(motivo: Optional[str] = None) -> None:
+    """ Conta uma transferência efetivada (sem motivo) ou recusada (com o motivo da recusa). """
+    if motivo is None:
+        TRANSFERENCIAS.labels(resultado="efetivada", motivo="").inc()
+    else:
+        TRANSFERENCIAS.labels(resultado="recusada", motivo=motivo).inc()
+
+
+def _medir_espera(pool, espera) -> None:
+    """ Cronometra cada retirada de conexão do `pool`: o SQLAlchemy não tem evento antes do checkout. """
+    obter = pool._do_get
+
+    def _do_get():
+        inicio = time.perf_counter()
+        try:
+            return obter()
+        finally:
+            espera.observe(time.perf_counter() - inicio)
+
+    pool._do_get = _do_get
+
+
+def instrumentar_pool(engine, nome: str) -> None:
+    """
+    Métricas do pool `nome`: gauges de conexões em uso e overflow (eventos do pool) e o tempo de
+    cada checkout. Só conta quem de fato usa uma conexão: sessões que não vão ao banco (ex.: leituras
+    servidas pelo cache) não aparecem.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    em_uso = POOL_EM_USO.labels(pool=nome)
+    excedente = POOL_OVERFLOW.labels(pool=nome)
+    espera = POOL_ESPERA.labels(pool=nome)
+    _medir_espera(sync_engine.pool, espera)
+
+    @event.listens_for(sync_engine, "engine_disposed")
+    def _descartado(engine):
+        # dispose() troca o pool por um novo
+        _medir_espera(engine.pool, espera)
+
+    def _atualizar_overflow():
+        overflow = getattr(sync_engine.pool, "overflow", None)
+        if overflow is not None:
+            excedente.set(max(overflow(), 0))
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        em_uso.inc()
+        _atualizar_overflow()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        em_uso.dec()
+        _atualizar_overflow()
+
+
+def exportar() -> tuple[bytes, str]:
+    """ Corpo e content-type do /metrics, agregando todos os workers em modo multiprocesso. """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricasMiddleware:
+    """ Middleware ASGI que mede contagem, latência e requisições em andamento. """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        status_code = 500
+        inicio = time.perf_counter()
+
+        async def send_medido(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        em_andamento = EM_ANDAMENTO.labels(method=metodo)
+        em_andamento.inc()
+        try:
+            await self.app(scope, receive, send_medido)
+        finally:
+            em_andamento.dec()
+            # O roteador grava a rota encontrada no scope; usamos o template, nunca o path bruto
+            rota = scope.get("route")
+            rota = getattr(rota, "path", ROTA_DESCONHECIDA)
+            REQUISICOES.labels(method=metodo, route=rota, status=str(status_code)).inc()
+            LATENCIA.labels(method=metodo, route=rota).observe(time.perf_counter() - inicio)
@@ -0,0 +1,56 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import expression
+from sqlalchemy.types import Date, DateTime
+
+
+class agora(expression.FunctionElement):
+    """
+    `now()` portável para server_default.
+    No SQLite, CURRENT_TIMESTAMP tem resolução de segundos e um formato diferente do que o
+    SQLAlchemy usa ao enviar datetimes como parâmetro, o que quebra comparações de intervalo
+    e de cursor. Aqui o SQLite grava no mesmo formato ("YYYY-MM-DD HH:MM:SS.ffffff").
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(agora)
+def _agora_padrao(element, compiler, **kw):
+    return "now()"
+
+
+@compiles(agora, "sqlite")
+def _agora_sqlite(element, compiler, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+class inicio_do_dia(expression.FunctionElement):
+    """ Data (sem hora) de um DateTime: período diário dos resumos por carteira. """
+    type = Date()
+    inherit_cache = True
+
+
+class inicio_do_mes(expression.FunctionElement):
+    """ Primeiro dia do mês de um DateTime: período mensal dos resumos por carteira. """
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(inicio_do_dia)
+def _inicio_do_dia_padrao(element, compiler, **kw):
+    return "CAST(date_trunc('day', %s) AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(inicio_do_dia, "sqlite")
+def _inicio_do_dia_sqlite(element, compiler, **kw):
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(inicio_do_mes)
+def _inicio_do_mes_padrao(element, compiler, **kw):
+    return "CAST(date_trunc('month', %s) AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(inicio_do_mes, "sqlite")
+def _inicio_do_mes_sqlite(element, compiler, **kw):
+    return "date(%s, 'start of month')" % compiler.process(element.clauses, **kw)
@@ -0,0 +1,348 @@
+"""
+Gerador de massa de dados direto no banco (sem a API), para reproduzir tabelas do tamanho das de
+produção (milhões de transações) ao testar índices, partições e paginação.
+
+    python -m app.database.gerador --usuarios 100000 --transacoes 5000000 --processos 8
+
+- Os dados (Faker) são gerados em processos paralelos, em blocos; o processo principal grava
+  cada bloco com COPY (PostgreSQL) ou INSERT em lote (SQLite), um commit por bloco.
+- Toda carteira tem dono e todo cartão tem carteira; transferências são entre carteiras da mesma
+  moeda, em ordem de id e de `timestamp`. O saldo inicial de cada carteira é o bastante para que
+  o saldo nunca fique negativo ao longo do histórico, e o saldo gravado é o inicial mais o histórico.
+- Cada carteira recebe uma foto do saldo inicial (consultas de saldo passado) e os resumos do
+  período são reconstruídos no final.
+- Com a mesma `--semente`, o mesmo `--ate` e o mesmo banco de partida, os dados são idênticos.
+  Os ids continuam a partir dos maiores já existentes.
+"""
+import argparse
+import asyncio
+import os
+import random
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from faker import Faker
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, async_sessionmaker
+
+from app import models
+from app.core import dinheiro
+from app.core.config import settings
+from app.database import particoes
+from app.services import resumos
+
+COLUNAS = {
+    models.Usuario: ("id", "nome", "cpf", "email"),
+    models.Carteira: ("id", "saldo_unidades", "moeda", "movimentos", "usuario_id"),
+    models.Cartao: ("id", "numero", "validade", "limite_unidades", "moeda", "carteira_id"),
+    models.Transacao: ("id", "valor_unidades", "moeda", "timestamp", "carteira_origem_id", "carteira_destino_id"),
+    models.SaldoHistorico: ("carteira_id", "saldo_unidades", "ate_transacao_id", "momento"),
+}
+
+
+@dataclass(frozen=True)
+class Plano:
+    """ Tudo o que os processos geradores precisam: cada bloco é uma função pura do plano. """
+    semente: int
+    usuarios: int
+    carteiras_por_usuario: int
+    cartoes_por_carteira: int
+    transacoes: int
+    moedas: tuple[str, ...]
+    inicio: datetime
+    fim: datetime
+    bloco: int
+    # Primeiros ids a gerar (continuam os existentes)
+    usuario_id: int = 1
+    carteira_id: int = 1
+    cartao_id: int = 1
+    transacao_id: int = 1
+
+    @property
+    def carteiras(self) -> int:
+        return self.usuarios * self.carteiras_por_usuario
+
+    def blocos(self, total: int) -> list[tuple[int, int]]:
+        return [(inicio, min(inicio + self.bloco, total)) for inicio in range(0, total, self.bloco)]
+
+
+def _aleatorio(plano: Plano, tipo: str, inicio: int) -> random.Random:
+    # Semente em texto: a mesma em qualquer processo (não depende de PYTHONHASHSEED)
+    return random.Random(f"{plano.semente}:{tipo}:{inicio}")
+
+
+def moeda_da_carteira(plano: Plano, indice: int) -> str:
+    """ Carteiras se alternam entre as moedas: as de uma moeda são os índices de mesmo resto. """
+    return plano.moedas[indice % len(plano.moedas)]
+
+
+def saldo_base(plano: Plano, indice: int) -> int:
+    """ Parte sorteada do saldo inicial da carteira (o gerador soma o necessário para nunca ficar negativo). """
+    moeda = moeda_da_carteira(plano, indice)
+    return _aleatorio(plano, "saldo", indice).randint(0, 5000 * 10 ** dinheiro.expoente(moeda))
+
+
+def _digitos_cpf(base: str) -> str:
+    for tamanho in (9, 10):
+        soma = sum(int(digito) * peso for digito, peso in zip(base, range(tamanho + 1, 1, -1)))
+        base += str(soma * 10 % 11 % 10)
+    return base
+
+
+def _luhn(base: str) -> str:
+    soma = 0
+    for posicao, digito in enumerate(reversed(base)):
+        valor = int(digito) * (2 if posicao % 2 == 0 else 1)
+        soma += valor - 9 if valor > 9 else valor
+    return base + str(-soma % 10)
+
+
+_faker: Optional[Faker] = None
+
+
+def _faker_do_bloco(plano: Plano, inicio: int) -> Faker:
+    global _faker
+    if _faker is None:
+        _faker = Faker("pt_BR")  # Um por processo: criar o Faker é caro
+    _faker.seed_instance(f"{plano.semente}:cadastro:{inicio}")
+    return _faker
+
+
+def gerar_cadastros(plano: Plano, bloco: tuple[int, int]) -> tuple[list, list, list]:
+    """
+    Usuários [inicio, fim) do plano com as suas carteiras e cartões. CPF, email e número do cartão
+    derivam do id (únicos); as carteiras saem sem saldo e sem movimentos, definidos pelo gerador.
+    """
+    inicio, fim = bloco
+    fake = _faker_do_bloco(plano, inicio)
+    usuarios, carteiras, cartoes = [], [], []
+    for indice in range(inicio, fim):
+        usuario_id = plano.usuario_id + indice
+        usuarios.append((
+            usuario_id,
+            fake.name()[:100],
+            _digitos_cpf(f"{usuario_id:09d}"[-9:]),
+            f"{fake.user_name()}.{usuario_id}@{fake.free_email_domain()}"[:100],
+        ))
+        for k in range(plano.carteiras_por_usuario):
+            indice_carteira = indice * plano.carteiras_por_usuario + k
+            carteira_id = plano.carteira_id + indice_carteira
+            moeda = moeda_da_carteira(plano, indice_carteira)
+            carteiras.append((carteira_id, None, moeda, None, usuario_id))
+            for c in range(plano.cartoes_por_carteira):
+                cartao_id = plano.cartao_id + indice_carteira * plano.cartoes_por_carteira + c
+                cartoes.append((
+                    cartao_id,
+                    _luhn(f"5{cartao_id:014d}"),
+                    fake.credit_card_expire(),
+                    fake.random_int(500, 10000) * 10 ** dinheiro.expoente(moeda),
+                    moeda,
+                    carteira_id,
+                ))
+    return usuarios, carteiras, cartoes
+
+
+def gerar_transacoes(plano: Plano, bloco: tuple[int, int]) -> list[tuple]:
+    """
+    Transações [inicio, fim) do plano: origem sorteada, destino sorteado entre as outras carteiras
+    da mesma moeda. `timestamp` cresce com o id, de `plano.inicio` a `plano.fim`.
+    """
+    inicio, fim = bloco
+    aleatorio = _aleatorio(plano, "transacoes", inicio)
+    moedas = len(plano.moedas)
+    passo = (plano.fim - plano.inicio) / max(plano.transacoes, 1)
+    linhas = []
+    for indice in range(inicio, fim):
+        origem = aleatorio.randrange(plano.carteiras)
+        # Mesma moeda: mesmo resto da divisão pelo número de moedas
+        resto, mesma_moeda = origem % moedas, (plano.carteiras - origem % moedas + moedas - 1) // moedas
+        destino = origem
+        while destino == origem:
+            destino = resto + aleatorio.randrange(mesma_moeda) * moedas
+        moeda = moeda_da_carteira(plano, origem)
+        linhas.append((
+            plano.transacao_id + indice,
+            aleatorio.randint(1, 100 * 10 ** dinheiro.expoente(moeda)),
+            moeda,
+            plano.inicio + passo * indice,
+            plano.carteira_id + origem,
+            plano.carteira_id + destino,
+        ))
+    return linhas
+
+
+def movimentos_do_bloco(plano: Plano, bloco: tuple[int, int]) -> dict[int, tuple[int, int, int]]:
+    """
+    Efeito do bloco de transações em cada carteira (índice): (saldo líquido, menor saldo acumulado
+    dentro do bloco, quantidade de transações). Basta isso para encadear os blocos em ordem.
+    """
+    efeito = defaultdict(lambda: [0, 0, 0])
+    for _, valor, _, _, origem, destino in gerar_transacoes(plano, bloco):
+        saida = efeito[origem - plano.carteira_id]
+        saida[0] -= valor
+        saida[1] = min(saida[1], saida[0])
+        saida[2] += 1
+        entrada = efeito[destino - plano.carteira_id]
+        entrada[0] += valor
+        entrada[2] += 1
+    return {indice: tuple(valores) for indice, valores in efeito.items()}
+
+
+async def _em_ordem(executor: ProcessPoolExecutor, funcao, plano: Plano, blocos: list, janela: int):
+    """ Resultados de `funcao(plano, bloco)` na ordem dos blocos, com no máximo `janela` em andamento. """
+    loop = asyncio.get_running_loop()
+    pendentes, proximos = deque(), iter(blocos)
+    for bloco in proximos:
+        pendentes.append(loop.run_in_executor(executor, funcao, plano, bloco))
+        if len(pendentes) >= janela:
+            yield await pendentes.popleft()
+    while pendentes:
+        yield await pendentes.popleft()
+
+
+async def inserir(conn: AsyncConnection, modelo, linhas: list[tuple]) -> None:
+    """ COPY no PostgreSQL; nos demais bancos, INSERT com executemany. """
+    if not linhas:
+        return
+    colunas = COLUNAS[modelo]
+    if conn.dialect.name == "postgresql":
+        bruta = await conn.get_raw_connection()
+        await bruta.driver_connection.copy_records_to_table(modelo.__tablename__, records=linhas, columns=colunas)
+    else:
+        await conn.execute(insert(modelo.__table__), [dict(zip(colunas, linha)) for linha in linhas])
+
+
+async def _proximos_ids(conn: AsyncConnection) -> dict:
+    ids = {}
+    for campo, modelo in (
+        ("usuario_id", models.Usuario), ("carteira_id", models.Carteira),
+        ("cartao_id", models.Cartao), ("transacao_id", models.Transacao),
+    ):
+        ids[campo] = await conn.scalar(select(func.coalesce(func.max(modelo.id), 0))) + 1
+    return ids
+
+
+async def gerar(engine: AsyncEngine, plano: Plano, processos: int, progresso=print) -> dict:
+    """
+    Grava o plano no banco. Os ids do plano são ajustados para continuar os existentes.
+    Retorna as quantidades gravadas e o plano efetivo.
+    """
+    if plano.carteiras < 2 * len(plano.moedas):
+        raise ValueError("São necessárias pelo menos duas carteiras por moeda.")
+    async with engine.connect() as conn:
+        plano = Plano(**{**asdict(plano), **await _proximos_ids(conn)})
+    janela = 2 * processos
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        # 1) Efeito das transações em cada carteira, bloco a bloco e em ordem: saldo líquido,
+        #    menor saldo ao longo do histórico (define o saldo inicial) e quantidade de movimentos
+        liquido, minimo, movimentos = defaultdict(int), defaultdict(int), defaultdict(int)
+        async for efeito in _em_ordem(executor, movimentos_do_bloco, plano, plano.blocos(plano.transacoes), janela):
+            for indice, (saldo, menor, quantidade) in efeito.items():
+                minimo[indice] = min(minimo[indice], liquido[indice] + menor)
+                liquido[indice] += saldo
+                movimentos[indice] += quantidade
+        progresso(f"Histórico simulado para {plano.carteiras} carteiras")
+
+        # 2) Cadastros, com o saldo final (inicial + histórico) e a foto do saldo inicial
+        momento_inicial = plano.inicio - timedelta(microseconds=1)
+        async for usuarios, carteiras, cartoes in _em_ordem(
+            executor, gerar_cadastros, plano, plano.blocos(plano.usuarios), janela
+        ):
+            fotos = []
+            for posicao, (carteira_id, _, moeda, _, usuario_id) in enumerate(carteiras):
+                indice = carteira_id - plano.carteira_id
+                inicial = saldo_base(plano, indice) - minimo.get(indice, 0)
+                carteiras[posicao] = (
+                    carteira_id, inicial + liquido.get(indice, 0), moeda, movimentos.get(indice, 0), usuario_id
+                )
+                fotos.append((carteira_id, inicial, plano.transacao_id - 1, momento_inicial))
+            async with engine.begin() as conn:
+                await inserir(conn, models.Usuario, usuarios)
+                await inserir(conn, models.Carteira, carteiras)
+                await inserir(conn, models.Cartao, cartoes)
+                await inserir(conn, models.SaldoHistorico, fotos)
+            progresso(f"Usuários até {usuarios[-1][0]} gravados")
+
+        # 3) Transações (no PostgreSQL, com as partições mensais do período já criadas)
+        if engine.dialect.name == "postgresql":
+            async with engine.connect() as conn:
+                for mes in particoes.meses(plano.inicio.date(), plano.fim.date()):
+                    async with conn.begin():
+                        await particoes.criar_particao(conn, mes)
+        async for transacoes in _em_ordem(
+            executor, gerar_transacoes, plano, plano.blocos(plano.transacoes), janela
+        ):
+            async with engine.begin() as conn:
+                await inserir(conn, models.Transacao, transacoes)
+            progresso(f"Transações até {transacoes[-1][0]} gravadas")
+
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            # Os ids foram dados explicitamente: as sequências continuam depois deles
+            for tabela in ("usuarios", "carteiras", "cartoes", "transacoes"):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), (SELECT max(id) FROM {tabela}))"
+                ))
+    async with async_sessionmaker(engine)() as db:
+        await resumos.reconstruir(db, plano.inicio.date())
+    if engine.dialect.name == "postgresql":
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("ANALYZE"))
+
+    return {
+        "usuarios": plano.usuarios,
+        "carteiras": plano.carteiras,
+        "cartoes": plano.carteiras * plano.cartoes_por_carteira,
+        "transacoes": plano.transacoes,
+        "plano": plano,
+    }
+
+
+async def main(plano: Plano, processos: int) -> dict:
+    from app.database.session import criar_engine
+
+    engine = criar_engine(settings.DATABASE_URL, limite_comando_ms=0, pool="manutencao")
+    try:
+        return await gerar(engine, plano, processos)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--carteiras-por-usuario", type=int, default=2)
+    parser.add_argument("--cartoes-por-carteira", type=int, default=1)
+    parser.add_argument("--transacoes", type=int, default=100_000)
+    parser.add_argument("--moedas", default="BRL", help="moedas das carteiras, separadas por vírgula (ex.: BRL,USD)")
+    parser.add_argument("--ate", type=date.fromisoformat, default=date.today(), help="fim do período das transações (fixe para reproduzir)")
+    parser.add_argument("--dias", type=int, default=365, help="duração do período das transações")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="processos geradores")
+    parser.add_argument("--bloco", type=int, default=10_000, help="linhas por bloco (e por commit)")
+    args = parser.parse_args()
+
+    fim = datetime.combine(args.ate, time.min)
+    resultado = asyncio.run(main(
+        Plano(
+            semente=args.semente,
+            usuarios=args.usuarios,
+            carteiras_por_usuario=args.carteiras_por_usuario,
+            cartoes_por_carteira=args.cartoes_por_carteira,
+            transacoes=args.transacoes,
+            moedas=tuple(moeda.strip().upper() for moeda in args.moedas.split(",")),
+            inicio=fim - timedelta(days=args.dias),
+            fim=fim,
+            bloco=args.bloco,
+        ),
+        args.processos,
+    ))
+    print(
+        f"Gerados: {resultado['usuarios']} usuários, {resultado['carteiras']} carteiras, "
+        f"{resultado['cartoes']} cartões e {resultado['transacoes']} transações (até {args.ate})."
+    )
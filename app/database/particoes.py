@@ -0,0 +1,103 @@
+"""
+Manutenção das partições mensais de `transacoes` (PostgreSQL, particionamento declarativo por
+intervalo de `timestamp`). Cria com antecedência as partições dos próximos meses para que as
+inserções nunca caiam na partição padrão.
+
+    python -m app.database.particoes --meses 3
+
+Rode periodicamente (ex.: cron diário); partições já existentes são mantidas.
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+
+TABELA = "transacoes"
+# Recebe linhas fora de qualquer partição mensal (ex.: relógio adiantado) em vez de recusar a inserção
+PARTICAO_PADRAO = f"{TABELA}_padrao"
+
+
+def inicio_do_mes(momento: date) -> date:
+    return date(momento.year, momento.month, 1)
+
+
+def mes_seguinte(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def meses(inicio: date, fim: date) -> list[date]:
+    """ Primeiro dia de cada mês de `inicio` até `fim`, inclusive. """
+    mes, resultado = inicio_do_mes(inicio), []
+    while mes <= fim:
+        resultado.append(mes)
+        mes = mes_seguinte(mes)
+    return resultado
+
+
+def nome_da_particao(mes: date) -> str:
+    return f"{TABELA}_{mes:%Y_%m}"
+
+
+async def criar_particao(conn: AsyncConnection, mes: date) -> bool:
+    """
+    Cria a partição do mês, se ainda não existir. Linhas do mês que já estejam na partição
+    padrão são movidas para ela antes do ATTACH (que falharia com elas lá).
+    Retorna True se a partição foi criada.
+    """
+    nome = nome_da_particao(mes)
+    if await conn.scalar(text("SELECT to_regclass(:nome) IS NOT NULL"), {"nome": nome}):
+        return False
+    limites = {"inicio": datetime.combine(mes, time.min), "fim": datetime.combine(mes_seguinte(mes), time.min)}
+    await conn.execute(text(f"CREATE TABLE {nome} (LIKE {TABELA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await conn.execute(
+        text(
+            f"WITH movidas AS (DELETE FROM {PARTICAO_PADRAO} WHERE \"timestamp\" >= :inicio AND \"timestamp\" < :fim RETURNING *) "
+            f"INSERT INTO {nome} SELECT * FROM movidas"
+        ),
+        limites,
+    )
+    # Limites de partição não aceitam parâmetros
+    await conn.execute(
+        text(f"ALTER TABLE {TABELA} ATTACH PARTITION {nome} FOR VALUES FROM ('{mes}') TO ('{mes_seguinte(mes)}')")
+    )
+    return True
+
+
+async def criar_particoes_futuras(conn: AsyncConnection, meses_a_frente: int, hoje: date = None) -> list[str]:
+    """ Garante as partições do mês corrente e dos `meses_a_frente` seguintes; retorna as criadas. """
+    hoje = hoje or date.today()
+    fim = inicio_do_mes(hoje)
+    for _ in range(meses_a_frente):
+        fim = mes_seguinte(fim)
+    criadas = []
+    for mes in meses(hoje, fim):
+        # Uma transação por partição: o lock do ATTACH dura só o necessário
+        async with conn.begin():
+            if await criar_particao(conn, mes):
+                criadas.append(nome_da_particao(mes))
+    return criadas
+
+
+async def main(meses_a_frente: int) -> list[str]:
+    from app.database.session import criar_engine
+
+    engine = criar_engine(settings.DATABASE_URL, limite_comando_ms=0, pool="manutencao")
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Particionamento de transações só existe no PostgreSQL.")
+    try:
+        async with engine.connect() as conn:
+            return await criar_particoes_futuras(conn, meses_a_frente)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meses", type=int, default=settings.PARTICOES_MESES_A_FRENTE, help="meses futuros a garantir")
+    args = parser.parse_args()
+    for nome in asyncio.run(main(args.meses)):
+        print(f"Partição criada: {nome}")
@@ -0,0 +1,168 @@
+"""
+Roteamento das leituras entre réplicas e primário.
+- Handlers somente leitura pedem a sessão a `sessao_de_leitura`; escritas continuam em `get_db` (primário).
+- Leia-suas-escritas: depois de uma escrita, o cliente recebe o LSN do primário (header `X-Primary-LSN`
+  e cookie com validade REPLICA_FIXAR_SEGUNDOS). Enquanto manda esse token (cookie ou `X-Min-LSN`),
+  uma réplica só atende se já reproduziu o WAL até ele; senão, a leitura vai ao primário.
+- Réplica que falha ao conectar sai do rodízio por REPLICA_PAUSA_SEGUNDOS e a leitura vai ao primário.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.metricas import REPLICA_VERIFICACAO_LSN
+from app.database.session import ReplicaSessionLocal
+
+logger = logging.getLogger("fintracker.replicas")
+
+HEADER_LSN = "X-Primary-LSN"
+HEADER_MIN_LSN = "X-Min-LSN"
+COOKIE_LSN = "fintracker_lsn"
+# Valor do token quando o LSN do primário não é conhecido (ex.: SQLite): fixa no primário pela validade do cookie
+SEM_LSN = "-"
+
+# Fábricas de sessão das réplicas (substituível nos testes)
+fabricas: list[async_sessionmaker] = ReplicaSessionLocal
+_rodizio = itertools.count()
+_pausada_ate: dict[int, float] = {}
+
+
+def proxima_replica() -> Optional[tuple[int, async_sessionmaker]]:
+    """ Próxima réplica do rodízio fora de pausa, ou None (sem réplicas ou todas pausadas). """
+    agora = time.monotonic()
+    inicio = next(_rodizio)
+    for passo in range(len(fabricas)):
+        indice = (inicio + passo) % len(fabricas)
+        if _pausada_ate.get(indice, 0.0) <= agora:
+            return indice, fabricas[indice]
+    return None
+
+
+def pausar(indice: int, erro: BaseException) -> None:
+    _pausada_ate[indice] = time.monotonic() + settings.REPLICA_PAUSA_SEGUNDOS
+    logger.warning("Réplica %s indisponível, leituras no primário por %ss: %s",
+                   indice, settings.REPLICA_PAUSA_SEGUNDOS, erro)
+
+
+async def lsn_do_primario(db: AsyncSession) -> Optional[str]:
+    """ Posição atual do WAL no primário; None fora do PostgreSQL. """
+    if db.bind.dialect.name != "postgresql":
+        return None
+    return await db.scalar(text("SELECT pg_current_wal_lsn()::text"))
+
+
+async def alcancou(db: AsyncSession, lsn: str) -> bool:
+    """
+    Se a réplica da sessão já reproduziu o WAL até `lsn`. Fora do PostgreSQL não há como
+    confirmar: False, e a leitura vai ao primário.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return False
+    try:
+        return bool(await db.scalar(
+            text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"), {"lsn": lsn}
+        ))
+    except DBAPIError:
+        # Token malformado: vale como "não alcançou"
+        await db.rollback()
+        return False
+
+
+async def _abrir_replica(token: Optional[str]) -> Optional[tuple[AsyncSession, async_sessionmaker]]:
+    """ Sessão conectada em uma réplica apta a atender o `token` (e a fábrica dela), ou None. """
+    if token == SEM_LSN:
+        # Escrita recente sem LSN conhecido: nem adianta consultar a réplica
+        return None
+    escolhida = proxima_replica() if fabricas else None
+    if escolhida is None:
+        return None
+    indice, fabrica = escolhida
+    db = fabrica()
+    try:
+        await db.connection()
+        em_dia = token is None
+        if not em_dia:
+            # Ida e volta à réplica depois do checkout: métrica própria, fora da espera pelo pool
+            inicio = time.perf_counter()
+            em_dia = await alcancou(db, token)
+            REPLICA_VERIFICACAO_LSN.labels(pool=f"replica_{indice}").observe(time.perf_counter() - inicio)
+        if em_dia:
+            db.info["replica"] = True
+            return db, fabrica
+    except (DBAPIError, OSError, asyncio.TimeoutError) as erro:
+        pausar(indice, erro)
+    await db.close()
+    return None
+
+
+def token_da_requisicao(request) -> Optional[str]:
+    return request.headers.get(HEADER_MIN_LSN) or request.cookies.get(COOKIE_LSN)
+
+
+async def sessao_de_leitura(request, fabrica_primaria: async_sessionmaker) -> AsyncSession:
+    """ Sessão para um handler somente leitura: réplica quando possível, primário caso contrário. """
+    aberta = await _abrir_replica(token_da_requisicao(request))
+    if aberta is not None:
+        return aberta[0]
+    # No primário a conexão só sai do pool no primeiro comando
+    return fabrica_primaria()
+
+
+async def fabrica_de_leitura(request, fabrica_primaria: async_sessionmaker) -> async_sessionmaker:
+    """
+    Como `sessao_de_leitura`, para handlers que abrem as próprias sessões (respostas em streaming):
+    a réplica é testada com uma conexão que volta ao pool em seguida.
+    """
+    aberta = await _abrir_replica(token_da_requisicao(request))
+    if aberta is None:
+        return fabrica_primaria
+    db, fabrica = aberta
+    await db.close()
+    return fabrica
+
+
+class LeiaSuasEscritasMiddleware:
+    """
+    Middleware ASGI que, com réplicas configuradas, anexa às escritas bem-sucedidas o LSN do
+    primário (header `X-Primary-LSN` e cookie `fintracker_lsn` válido por REPLICA_FIXAR_SEGUNDOS).
+    O LSN é lido depois do commit do handler, antes do envio dos headers.
+    """
+    METODOS_DE_ESCRITA = {"POST", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, app, fabrica_primaria):
+        self.app = app
+        # Chamável que devolve a fábrica do primário (respeita a sobrescrita de get_sessionmaker)
+        self.fabrica_primaria = fabrica_primaria
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not fabricas or scope["method"] not in self.METODOS_DE_ESCRITA:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_com_lsn(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                try:
+                    async with self.fabrica_primaria()() as db:
+                        lsn = await lsn_do_primario(db)
+                except (DBAPIError, OSError, asyncio.TimeoutError):
+                    logger.exception("Falha ao ler o LSN do primário")
+                    lsn = None
+                if lsn is not None:
+                    headers.append(HEADER_LSN, lsn)
+                headers.append("set-cookie", (
+                    f"{COOKIE_LSN}={lsn or SEM_LSN}; Max-Age={math.ceil(settings.REPLICA_FIXAR_SEGUNDOS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                ))
+            await send(message)
+
+        await self.app(scope, receive, send_com_lsn)
@@ -1,6 +1,122 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
 from app.core.config import settings
+from app.core.instrumentacao import instrumentar_engine
+from app.core.metricas import instrumentar_pool
+
+# Drivers assíncronos equivalentes aos drivers síncronos usados pelo Alembic
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Converte a DATABASE_URL (síncrona, usada pelo Alembic) para o driver assíncrono
+    correspondente. URLs que já usam um driver assíncrono são mantidas.
+    """
+    url = make_url(database_url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+def opcoes_do_engine(async_url: str, limite_comando_ms: int) -> dict:
+    """
+    Argumentos do create_async_engine a partir das configurações DB_*.
+    - Pool próprio (tamanho, excedente, reciclagem, pre-ping) ou, com DB_PGBOUNCER, NullPool:
+      o PgBouncer já é o pool, e no modo transação cada transação pode cair em outra conexão do servidor.
+    - asyncpg com PgBouncer: sem cache de prepared statements e com nomes únicos por preparo.
+    - Tempo máximo por comando (`limite_comando_ms`, 0 desliga): `statement_timeout` da sessão no
+      PostgreSQL; com PgBouncer (que recusa parâmetros de sessão na conexão), timeout do asyncpg.
+    """
+    url = make_url(async_url)
+    if settings.DB_PGBOUNCER:
+        opcoes = {"poolclass": NullPool}
+    elif issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        opcoes = {
+            "pool_size": settings.DB_POOL_TAMANHO,
+            "max_overflow": settings.DB_POOL_EXCEDENTE,
+            "pool_recycle": settings.DB_POOL_RECICLAR_SEGUNDOS,
+            "pool_timeout": settings.DB_POOL_ESPERA_SEGUNDOS,
+        }
+    else:
+        # Pool padrão sem tamanho (ex.: StaticPool do SQLite em memória): só as opções aceitas por todos
+        opcoes = {"pool_recycle": settings.DB_POOL_RECICLAR_SEGUNDOS}
+    opcoes["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+
+    if url.drivername != "postgresql+asyncpg":
+        return opcoes
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        if limite_comando_ms:
+            connect_args["command_timeout"] = limite_comando_ms / 1000
+    elif limite_comando_ms:
+        connect_args["server_settings"] = {"statement_timeout": str(limite_comando_ms)}
+    opcoes["connect_args"] = connect_args
+    return opcoes
+
+def criar_engine(database_url: str, limite_comando_ms: Optional[int] = None, pool: str = "primario") -> AsyncEngine:
+    """
+    Engine assíncrono instrumentado para `database_url`. `limite_comando_ms` sobrepõe
+    DB_STATEMENT_TIMEOUT_MS (ex.: 0 nas manutenções em massa, que rodam comandos longos).
+    `pool` é o rótulo das métricas do pool (primario, replica_N, manutencao).
+    """
+    if limite_comando_ms is None:
+        limite_comando_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    async_url = get_async_database_url(database_url)
+    engine = create_async_engine(async_url, **opcoes_do_engine(async_url, limite_comando_ms))
+    instrumentar_engine(engine)
+    instrumentar_pool(engine, pool)
+    return engine
+
+def criar_sessionmaker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+# Engines da aplicação: criados em `iniciar` e descartados em `encerrar` (lifespan do FastAPI)
+engine: Optional[AsyncEngine] = None
+SessionLocal: Optional[async_sessionmaker] = None
+# Réplicas de leitura, na ordem de DATABASE_REPLICA_URLS (roteamento em app.database.replicas).
+# As listas são preenchidas no lugar: app.database.replicas guarda a referência
+replica_engines: list[AsyncEngine] = []
+ReplicaSessionLocal: list[async_sessionmaker] = []
+
+def iniciar() -> None:
+    """ Cria os engines do primário e das réplicas (nenhuma conexão é aberta aqui). """
+    global engine, SessionLocal
+    engine = criar_engine(settings.DATABASE_URL)
+    SessionLocal = criar_sessionmaker(engine)
+    replica_engines[:] = [
+        criar_engine(url, pool=f"replica_{indice}") for indice, url in enumerate(settings.DATABASE_REPLICA_URLS)
+    ]
+    ReplicaSessionLocal[:] = [criar_sessionmaker(replica_engine) for replica_engine in replica_engines]
+
+async def encerrar() -> None:
+    """ Fecha as conexões dos pools (primário e réplicas). """
+    global engine, SessionLocal
+    for aberto in [engine, *replica_engines]:
+        if aberto is not None:
+            await aberto.dispose()
+    engine, SessionLocal = None, None
+    replica_engines.clear()
+    ReplicaSessionLocal.clear()
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+async def aquecer(engine: AsyncEngine, conexoes: int) -> None:
+    """
+    Abre `conexoes` conexões ao mesmo tempo e as devolve ao pool: as primeiras requisições
+    depois do deploy não pagam o estabelecimento de conexão (TCP, TLS, autenticação).
+    Pools sem tamanho configurável (NullPool, StaticPool) não são aquecidos.
+    """
+    if not isinstance(engine.pool, QueuePool):
+        return
+    async with AsyncExitStack() as pilha:
+        await asyncio.gather(*(pilha.enter_async_context(engine.connect()) for _ in range(conexoes)))
@@ -1,7 +1,62 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import configure_mappers
+from app.api.dependencies import get_sessionmaker
+from app.api.serializacao import preparar_serializadores
 from app.api.v1.api import api_router
+from app.core.config import settings
+from app.core.instrumentacao import InstrumentacaoSQLMiddleware
+from app.core.metricas import MetricasMiddleware, exportar
+from app.database import replicas, session
+from app.database.replicas import LeiaSuasEscritasMiddleware
+from app.services.fatias import recolher_periodicamente
+from app.services.fila import processar_continuamente
 from fastapi_pagination import add_pagination
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da aplicação:
+    - Cria os engines a partir das configurações DB_*, abre o pool (DB_POOL_AQUECER) e monta os
+      serializadores das respostas antes de /health/ready responder 200.
+    - Tarefas em segundo plano: recolhimento das fatias das carteiras quentes e worker da fila de
+      transferências assíncronas.
+    - No desligamento, /health/ready volta a 503, as tarefas param e os pools são fechados.
+    """
+    app.state.pronto = False
+    session.iniciar()
+    # Respeita a sobrescrita da fábrica de sessões (ex.: banco dos testes)
+    session_factory = app.dependency_overrides.get(get_sessionmaker, get_sessionmaker)()
+    if settings.DB_POOL_AQUECER and not settings.DB_PGBOUNCER:
+        await session.aquecer(session_factory.kw["bind"], settings.DB_POOL_TAMANHO)
+        for indice, fabrica in enumerate(replicas.fabricas):
+            try:
+                await session.aquecer(fabrica.kw["bind"], settings.DB_POOL_TAMANHO)
+            except (DBAPIError, OSError, asyncio.TimeoutError) as erro:
+                # Réplica fora do ar não impede a subida: as leituras vão ao primário
+                replicas.pausar(indice, erro)
+    configure_mappers()
+    preparar_serializadores(app.routes)
+
+    tarefas = []
+    if settings.FATIAS_RECOLHER_SEGUNDOS > 0:
+        tarefas.append(recolher_periodicamente(session_factory, settings.FATIAS_RECOLHER_SEGUNDOS))
+    if settings.FILA_ESPERA_SEGUNDOS > 0:
+        tarefas.append(processar_continuamente(session_factory, settings.FILA_ESPERA_SEGUNDOS))
+    tarefas = [asyncio.create_task(tarefa) for tarefa in tarefas]
+    app.state.pronto = True
+    yield
+    app.state.pronto = False
+    for tarefa in tarefas:
+        tarefa.cancel()
+        with suppress(asyncio.CancelledError):
+            await tarefa
+    await session.encerrar()
+
 app = FastAPI(
     title="FinTrackerAPI",
     version="0.1.0",
@@ -15,6 +70,9 @@ app = FastAPI(
         "name": "MIT",
         "url": "https://opensource.org/licenses/MIT",
     },
+    # orjson codifica datetime e números nativamente e bem mais rápido que o json da stdlib
+    default_response_class=ORJSONResponse if settings.RESPOSTA_ORJSON else JSONResponse,
+    lifespan=lifespan,
 )
 
 # Inclui todas as rotas da v1 sob o prefixo /api/v1
@@ -23,6 +81,18 @@ app.include_router(api_router, prefix="/api/v1")
 # Adiciona o middleware de paginação à aplicação
 add_pagination(app)
 
+# LSN do primário nas respostas das escritas (leia-suas-escritas com réplicas de leitura)
+app.add_middleware(
+    LeiaSuasEscritasMiddleware,
+    fabrica_primaria=lambda: app.dependency_overrides.get(get_sessionmaker, get_sessionmaker)(),
+)
+
+# Contagem e tempo de SQL por requisição (header Server-Timing e logs estruturados)
+app.add_middleware(InstrumentacaoSQLMiddleware)
+
+# Contagem, latência por rota e requisições em andamento para o /metrics
+app.add_middleware(MetricasMiddleware)
+
 @app.get("/", tags=["Root"], include_in_schema=False)
 def read_root():
     return {"message": "Bem-vindo à FinTrackerAPI"}
@@ -31,3 +101,20 @@ def read_root():
 def health_check():
     """Verifica se a aplicação está online e respondendo."""
     return {"status": "ok"}
+
+@app.get("/health/ready", tags=["Health"], summary="Verifica se a aplicação está pronta para receber tráfego")
+def readiness_check(response: Response):
+    """
+    Pronta depois do aquecimento (pool aberto, serializadores montados) e até o início do desligamento:
+    o balanceador só manda tráfego para instâncias aquecidas e tira as que estão saindo.
+    """
+    if not getattr(app.state, "pronto", False):
+        response.status_code = 503
+        return {"status": "unavailable"}
+    return {"status": "ready"}
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """Expõe as métricas da aplicação no formato texto do Prometheus."""
+    corpo, content_type = exportar()
+    return Response(content=corpo, media_type=content_type)
@@ -1,4 +1,10 @@
 from .usuario import Usuario
+from .saldo_fatia import SaldoFatia
 from .carteira import Carteira
 from .cartao import Cartao
-from .transacao import Transacao
\ No newline at end of file
+from .transacao import Transacao
+from .idempotencia import ChaveIdempotencia
+from .saldo_historico import SaldoHistorico
+from .resumo import ResumoCarteira
+from .transferencia_agendada import TransferenciaAgendada
+from .autorizacao import UsoCartao, Autorizacao
\ No newline at end of file
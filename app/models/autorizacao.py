@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+
+from app.database.base import Base
+from app.database.functions import agora
+
+class UsoCartao(Base):
+    """
+    Quanto do limite de um cartão está reservado (autorizações em aberto) e utilizado (capturadas).
+    Fora da linha do cartão: autorizações simultâneas disputam só esta linha, e o disponível é
+    `Cartao.limite_unidades - reservado - utilizado`. Criada na primeira autorização do cartão.
+    """
+    __tablename__ = "cartoes_uso"
+
+    cartao_id = Column(Integer, ForeignKey("cartoes.id", ondelete="CASCADE"), primary_key=True)
+    reservado_unidades = Column(BigInteger, nullable=False, default=0)
+    utilizado_unidades = Column(BigInteger, nullable=False, default=0)
+
+class Autorizacao(Base):
+    """
+    Reserva de um valor contra o limite do cartão (POST /cartoes/{id}/autorizacoes), depois
+    capturada (parcial ou totalmente; o restante volta ao disponível) ou liberada.
+    """
+    __tablename__ = "autorizacoes"
+
+    id = Column(Integer, primary_key=True)
+    cartao_id = Column(Integer, ForeignKey("cartoes.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Em unidades menores da moeda do cartão
+    valor_unidades = Column(BigInteger, nullable=False)
+    capturado_unidades = Column(BigInteger, nullable=True)
+    moeda = Column(String(3), nullable=False)
+    estado = Column(String(10), nullable=False, default="reservada")  # reservada, capturada ou liberada
+    criada_em = Column(DateTime, nullable=False, server_default=agora())
+    encerrada_em = Column(DateTime, nullable=True)
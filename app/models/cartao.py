@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey
 from sqlalchemy.orm import relationship
 
+from app.core import dinheiro
 from app.database.base import Base
 
 class Cartao(Base):
@@ -9,10 +10,22 @@ class Cartao(Base):
     id = Column(Integer, primary_key=True, index=True)
     numero = Column(String(16), unique=True, nullable=False)
     validade = Column(String(5), nullable=False) # Formato "MM/YY"
-    limite = Column(Numeric(10, 2), nullable=False)
+    # Limite em unidades menores da moeda da carteira, copiada em `moeda` na criação do cartão
+    limite_unidades = Column(BigInteger, nullable=False)
+    moeda = Column(String(3), nullable=False, default="BRL")
 
     # Chave Estrangeira para a carteira
     carteira_id = Column(Integer, ForeignKey("carteiras.id"), nullable=False)
 
     # Relacionamento de volta para a carteira
-    carteira = relationship("Carteira", back_populates="cartoes")
\ No newline at end of file
+    carteira = relationship("Carteira", back_populates="cartoes")
+
+    @property
+    def limite(self):
+        if self.limite_unidades is None:
+            return None
+        return dinheiro.para_decimal(self.limite_unidades, self.moeda)
+
+    @limite.setter
+    def limite(self, valor):
+        self.limite_unidades = dinheiro.para_unidades(valor, self.moeda or "BRL")
\ No newline at end of file
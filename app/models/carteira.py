@@ -1,26 +1,68 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, func, select
+from sqlalchemy.orm import column_property, relationship
 
+from app.core import dinheiro
 from app.database.base import Base
+from app.models.saldo_fatia import SaldoFatia
 
 class Carteira(Base):
     __tablename__ = "carteiras"
 
     id = Column(Integer, primary_key=True, index=True)
-    saldo_atual = Column(Numeric(10, 2), nullable=False, default=0.00)
+    # Saldo em unidades menores da moeda (ex.: centavos); `saldo_atual` é a visão em Decimal
+    saldo_unidades = Column(BigInteger, nullable=False, default=0)
     moeda = Column(String(3), nullable=False, default="BRL") # Ex: BRL, USD
+    # Incrementada a cada UPDATE: pelo ORM e, nas transferências, pelos próprios UPDATEs condicionais
+    versao = Column(Integer, nullable=False, server_default="1")
+    # Transferências que alteraram o saldo; a cada SALDO_FOTO_A_CADA uma foto vai para saldos_historicos
+    movimentos = Column(Integer, nullable=False, server_default="0")
+    # Modo quente: com N > 0, os créditos vão para N fatias (saldos_fatias) em vez desta linha
+    fatias = Column(Integer, nullable=False, server_default="0")
+    # Soma das fatias ainda não recolhidas, lida junto com a carteira (subconsulta pela chave primária)
+    saldo_em_fatias = column_property(
+        select(func.coalesce(func.sum(SaldoFatia.saldo_unidades), 0))
+        .where(SaldoFatia.carteira_id == id)
+        .correlate_except(SaldoFatia)
+        .scalar_subquery()
+    )
 
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
     usuario = relationship("Usuario", back_populates="carteiras")  
-    cartoes = relationship("Cartao", back_populates="carteira", cascade="all, delete-orphan")
+    # raise_on_sql: os cartões devem ser carregados explicitamente (selectinload), nunca um a um
+    cartoes = relationship("Cartao", back_populates="carteira", cascade="all, delete-orphan", lazy="raise_on_sql")
 
+    # passive_deletes: o histórico nunca é carregado só para remover a carteira; quem protege
+    # as transações é a chave estrangeira no banco
     transacoes_enviadas = relationship(
         "Transacao",
         foreign_keys="[Transacao.carteira_origem_id]",
-        back_populates="carteira_origem"
+        back_populates="carteira_origem",
+        passive_deletes=True
     )
     transacoes_recebidas = relationship(
         "Transacao",
         foreign_keys="[Transacao.carteira_destino_id]",
-        back_populates="carteira_destino"
-    )
\ No newline at end of file
+        back_populates="carteira_destino",
+        passive_deletes=True
+    )
+
+    __mapper_args__ = {"version_id_col": versao}
+
+    @property
+    def saldo_total_unidades(self):
+        """ Linha principal mais as fatias ainda não recolhidas. """
+        if self.saldo_unidades is None:
+            return None
+        return self.saldo_unidades + (self.saldo_em_fatias or 0)
+
+    @property
+    def saldo_atual(self):
+        if self.saldo_unidades is None:
+            return None
+        return dinheiro.para_decimal(self.saldo_total_unidades, self.moeda)
+
+    @saldo_atual.setter
+    def saldo_atual(self, valor):
+        # A moeda precisa estar definida antes do saldo (ex.: Carteira(moeda=..., saldo_atual=...)).
+        # As fatias continuam somando: a linha principal fica com a diferença.
+        self.saldo_unidades = dinheiro.para_unidades(valor, self.moeda or "BRL") - (self.saldo_em_fatias or 0)
\ No newline at end of file
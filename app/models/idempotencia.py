@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime, JSON
+
+from app.database.base import Base
+from app.database.functions import agora
+
+class ChaveIdempotencia(Base):
+    """ Resposta de uma transferência já efetivada, indexada pelo header Idempotency-Key do cliente. """
+    __tablename__ = "chaves_idempotencia"
+
+    chave = Column(String(255), primary_key=True)
+    # sha256 do corpo da requisição: a mesma chave com outro corpo é recusada
+    hash_requisicao = Column(String(64), nullable=False)
+    resposta = Column(JSON, nullable=False)  # TransacaoRead serializado
+    criado_em = Column(DateTime, nullable=False, server_default=agora())
+    expira_em = Column(DateTime, nullable=False, index=True)
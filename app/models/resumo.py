@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, ForeignKey
+
+from app.database.base import Base
+
+class ResumoCarteira(Base):
+    """
+    Entradas, saídas e quantidade de transações de uma carteira por período ("day" ou "month").
+    Mantido pelas transferências no mesmo commit (upsert incremental); o histórico anterior
+    é preenchido por `python -m app.services.resumos`.
+    Créditos em carteiras quentes (`Carteira.fatias` > 0) somam em uma `fatia` sorteada, como o
+    saldo; o período é a soma das suas fatias.
+    """
+    __tablename__ = "resumos_carteiras"
+
+    carteira_id = Column(Integer, ForeignKey("carteiras.id", ondelete="CASCADE"), primary_key=True)
+    granularidade = Column(String(5), primary_key=True)
+    periodo = Column(Date, primary_key=True)  # Primeiro dia do período
+    fatia = Column(Integer, primary_key=True, default=0, server_default="0")
+    # Em unidades menores da moeda da carteira
+    entradas_unidades = Column(BigInteger, nullable=False, default=0)
+    saidas_unidades = Column(BigInteger, nullable=False, default=0)
+    quantidade = Column(Integer, nullable=False, default=0)
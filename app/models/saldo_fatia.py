@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+
+from app.database.base import Base
+
+class SaldoFatia(Base):
+    """
+    Parte do saldo de uma carteira em modo quente (`Carteira.fatias` > 0). Cada crédito soma em uma
+    fatia sorteada, então créditos simultâneos disputam N linhas em vez da linha da carteira.
+    O saldo da carteira é a linha principal mais as fatias; `app.services.fatias` as recolhe para a principal.
+    """
+    __tablename__ = "saldos_fatias"
+
+    carteira_id = Column(Integer, ForeignKey("carteiras.id", ondelete="CASCADE"), primary_key=True)
+    fatia = Column(Integer, primary_key=True)
+    saldo_unidades = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, Index
+
+from app.database.base import Base
+from app.database.functions import agora
+
+class SaldoHistorico(Base):
+    """
+    Foto do saldo de uma carteira, que inclui todas as transações da carteira com id <= `ate_transacao_id`.
+    A transação é inserida com a carteira travada, então para uma mesma carteira os ids crescem na
+    ordem em que o saldo mudou: a foto mais as transações seguintes dão o saldo exato.
+    """
+    __tablename__ = "saldos_historicos"
+    __table_args__ = (
+        # Foto mais recente antes de um instante
+        Index("ix_saldos_historicos_carteira_momento", "carteira_id", "momento"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    carteira_id = Column(Integer, ForeignKey("carteiras.id", ondelete="CASCADE"), nullable=False)
+    saldo_unidades = Column(BigInteger, nullable=False)
+    ate_transacao_id = Column(Integer, nullable=False, default=0)
+    momento = Column(DateTime, nullable=False, server_default=agora())
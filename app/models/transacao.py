@@ -1,17 +1,36 @@
-from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
+from app.core import dinheiro
 from app.database.base import Base
+from app.database.functions import agora
 
 class Transacao(Base):
+    """
+    No PostgreSQL a tabela é particionada por mês em `timestamp` (migração e1d5b3a9c2f7), com chave
+    primária (id, timestamp); os ids continuam vindo de uma única sequência. Filtros por intervalo
+    de `timestamp` deixam o planner descartar as partições fora dele.
+    """
     __tablename__ = "transacoes"
+    __table_args__ = (
+        # Paginação por cursor em (timestamp, id), com e sem filtro por carteira
+        Index("ix_transacoes_timestamp_id", "timestamp", "id"),
+        Index("ix_transacoes_origem_timestamp_id", "carteira_origem_id", "timestamp", "id"),
+        Index("ix_transacoes_destino_timestamp_id", "carteira_destino_id", "timestamp", "id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    valor = Column(Numeric(10, 2), nullable=False)
-    timestamp = Column(DateTime, server_default=func.now())
+    id = Column(Integer, primary_key=True)
+    # Valor em unidades menores da moeda das carteiras envolvidas (sempre a mesma)
+    valor_unidades = Column(BigInteger, nullable=False)
+    moeda = Column(String(3), nullable=False, default="BRL")
+    timestamp = Column(DateTime, nullable=False, server_default=agora())
     
     carteira_origem_id = Column(Integer, ForeignKey("carteiras.id"), nullable=False)
     carteira_destino_id = Column(Integer, ForeignKey("carteiras.id"), nullable=False)
 
     carteira_origem = relationship("Carteira", foreign_keys=[carteira_origem_id])
-    carteira_destino = relationship("Carteira", foreign_keys=[carteira_destino_id])
\ No newline at end of file
+    carteira_destino = relationship("Carteira", foreign_keys=[carteira_destino_id])
+
+    @property
+    def valor(self):
+        return dinheiro.para_decimal(self.valor_unidades, self.moeda)
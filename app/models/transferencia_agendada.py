@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, text
+
+from app.database.base import Base
+from app.database.functions import agora
+
+class TransferenciaAgendada(Base):
+    """
+    Transferência recebida por POST /transacoes/async, à espera do worker da fila
+    (`app.services.fila`), que efetiva muitas por commit. Depois de processada, guarda o resultado.
+    Sem chaves estrangeiras: uma carteira removida antes do processamento vira uma recusa.
+    """
+    __tablename__ = "transferencias_agendadas"
+    __table_args__ = (
+        # Só as pendentes, em ordem de chegada: o índice fica do tamanho da fila, não do histórico
+        Index(
+            "ix_transferencias_agendadas_pendentes",
+            "id",
+            postgresql_where=text("estado = 'pendente'"),
+            sqlite_where=text("estado = 'pendente'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    carteira_origem_id = Column(Integer, nullable=False)
+    carteira_destino_id = Column(Integer, nullable=False)
+    # Em unidades menores da moeda, já conferida no recebimento
+    valor_unidades = Column(BigInteger, nullable=False)
+    moeda = Column(String(3), nullable=False)
+    estado = Column(String(10), nullable=False, default="pendente")  # pendente, efetivada ou recusada
+    motivo = Column(String(40), nullable=True)  # Código da recusa (ex.: "saldo_insuficiente")
+    transacao_id = Column(Integer, nullable=True)
+    criada_em = Column(DateTime, nullable=False, server_default=agora())
+    processada_em = Column(DateTime, nullable=True)
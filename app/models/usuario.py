@@ -11,6 +11,11 @@ class Usuario(Base):
     cpf = Column(String(11), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     data_criacao = Column(DateTime, server_default=func.now())
+    # Incrementada a cada UPDATE pelo ORM (controle otimista de concorrência e ETag)
+    versao = Column(Integer, nullable=False, server_default="1")
 
     # Relacionamento: Um usuário pode ter várias carteiras
-    carteiras = relationship("Carteira", back_populates="usuario", cascade="all, delete-orphan")
\ No newline at end of file
+    # raise_on_sql: as carteiras devem ser carregadas explicitamente (selectinload), nunca uma a uma
+    carteiras = relationship("Carteira", back_populates="usuario", cascade="all, delete-orphan", lazy="raise_on_sql")
+
+    __mapper_args__ = {"version_id_col": versao}
\ No newline at end of file
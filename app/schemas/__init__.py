@@ -1,4 +1,8 @@
 from .usuario import UsuarioCreate, UsuarioUpdate, UsuarioRead
 from .carteira import CarteiraCreate, CarteiraUpdate, CarteiraRead
-from .cartao import CartaoCreate, CartaoUpdate, CartaoRead
-from .transacao import TransacaoCreate, TransacaoRead
\ No newline at end of file
+from .cartao import CartaoCreate, CartaoUpdate, CartaoRead, AutorizacaoCreate, AutorizacaoCaptura, AutorizacaoRead
+from .transacao import TransacaoCreate, TransacaoRead, TransacaoCursorPage, TransacaoLoteItem, TransacaoLoteRead, TransferenciaAgendadaRead
+from .importacao import ImportacaoCriado, ImportacaoErro, ImportacaoRead
+from .saldo import SaldoHistoricoRead, LancamentoExtrato, ExtratoRead
+from .resumo import ResumoPeriodo, ResumoCarteiraRead
+from .pagina import Pagina
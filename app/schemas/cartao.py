@@ -1,6 +1,7 @@
 from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Annotated
 from decimal import Decimal
+from datetime import datetime
 
 
 class CartaoBase(BaseModel):
@@ -23,4 +24,21 @@ class CartaoRead(CartaoBase):
     id: int
     carteira_id: int
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+class AutorizacaoCreate(BaseModel):
+    valor: Decimal = Field(gt=0, description="Valor a reservar, na moeda do cartão")
+
+class AutorizacaoCaptura(BaseModel):
+    # Sem valor, captura toda a reserva; com valor menor, o restante volta ao disponível
+    valor: Optional[Decimal] = Field(None, gt=0)
+
+class AutorizacaoRead(BaseModel):
+    """ Autorização aprovada: `reservada`, `capturada` (com o valor capturado) ou `liberada`. """
+    id: int
+    cartao_id: int
+    estado: str
+    valor: Decimal
+    capturado: Optional[Decimal] = None
+    moeda: str
+    criada_em: datetime
+    encerrada_em: Optional[datetime] = None
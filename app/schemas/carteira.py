@@ -1,7 +1,10 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import Optional, List
 from decimal import Decimal
 
+from app.core import dinheiro
+from app.core.config import settings
+
 class CartaoReadSimple(BaseModel):
     id: int
     numero: str
@@ -16,12 +19,21 @@ class CarteiraBase(BaseModel):
 class CarteiraCreate(CarteiraBase):
     usuario_id: int
 
+    @model_validator(mode="after")
+    def saldo_representavel(self):
+        # O saldo é gravado em unidades menores: casas decimais além das da moeda são recusadas (422)
+        dinheiro.para_unidades(self.saldo_atual, self.moeda)
+        return self
+
 class CarteiraUpdate(BaseModel):
     saldo_atual: Optional[Decimal] = None
+    # Modo quente: créditos distribuídos em N fatias (0 volta ao modo normal)
+    fatias: Optional[int] = Field(None, ge=0, le=settings.FATIAS_MAX)
 
 class CarteiraRead(CarteiraBase):
     id: int
     usuario_id: int
+    fatias: int = 0
     cartoes: List[CartaoReadSimple] = []
 
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
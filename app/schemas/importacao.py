@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportacaoCriado(BaseModel):
+    linha: int
+    id: int
+
+class ImportacaoErro(BaseModel):
+    linha: int
+    motivo: str  # "invalido", "conflito" ou "referencia_inexistente"
+    detail: str
+
+class ImportacaoRead(BaseModel):
+    """ Resultado de uma importação em massa: ids criados por linha e erros por linha. """
+    inseridos: int
+    rejeitados: int
+    criados: List[ImportacaoCriado]
+    erros: List[ImportacaoErro]
@@ -0,0 +1,17 @@
+from typing import Generic, Optional
+
+from fastapi_pagination import Page
+from fastapi_pagination.types import GreaterEqualZero
+from typing_extensions import TypeVar
+
+T = TypeVar("T")
+
+class Pagina(Page[T], Generic[T]):
+    """
+    Página por página/tamanho com a estratégia de contagem escolhida (`count`):
+    `total` pode ser exato, estimado ou ausente (`total_exact` diz qual); `has_next` é sempre exato.
+    """
+    total: Optional[GreaterEqualZero] = None
+    pages: Optional[GreaterEqualZero] = None
+    total_exact: bool
+    has_next: bool
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from decimal import Decimal
+from datetime import date
+from typing import List
+
+class ResumoPeriodo(BaseModel):
+    """ Movimento da carteira em um período: `periodo` é o primeiro dia dele. """
+    periodo: date
+    entradas: Decimal
+    saidas: Decimal
+    quantidade: int
+
+class ResumoCarteiraRead(BaseModel):
+    carteira_id: int
+    moeda: str
+    granularidade: str
+    periodos: List[ResumoPeriodo]
@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from decimal import Decimal
+from datetime import datetime
+from typing import Optional, List
+
+class SaldoHistoricoRead(BaseModel):
+    """ Saldo de uma carteira imediatamente antes de `momento`, calculado a partir da foto mais recente. """
+    carteira_id: int
+    moeda: str
+    momento: datetime
+    saldo: Decimal
+    foto_momento: datetime
+    transacoes_apos_foto: int
+
+class LancamentoExtrato(BaseModel):
+    """ Uma transação do extrato: `valor` com sinal (crédito positivo) e `saldo` logo após ela. """
+    transacao_id: int
+    timestamp: datetime
+    carteira_origem_id: int
+    carteira_destino_id: int
+    valor: Decimal
+    saldo: Decimal
+
+class ExtratoRead(BaseModel):
+    """ Extrato de [inicio, fim): `proximo_apos_id` continua a listagem quando há mais lançamentos. """
+    carteira_id: int
+    moeda: str
+    inicio: datetime
+    fim: datetime
+    saldo_inicial: Decimal
+    lancamentos: List[LancamentoExtrato]
+    proximo_apos_id: Optional[int] = None
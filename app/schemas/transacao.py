@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, ConfigDict
 from decimal import Decimal
 from datetime import datetime
+from typing import Optional, List
 
 class TransacaoCreate(BaseModel):
     carteira_origem_id: int
@@ -15,4 +16,40 @@ class TransacaoRead(BaseModel):
     carteira_origem_id: int
     carteira_destino_id: int
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class TransacaoCursorPage(BaseModel):
+    """ Página da listagem por cursor: `next_cursor` é nulo na última página. """
+    items: List[TransacaoRead]
+    next_cursor: Optional[str] = None
+    size: int
+
+class TransacaoLoteItem(BaseModel):
+    """ Resultado de um item de um lote: a transação efetivada ou o motivo da recusa. """
+    indice: int
+    transacao: Optional[TransacaoRead] = None
+    motivo: Optional[str] = None
+    detail: Optional[str] = None
+
+class TransacaoLoteRead(BaseModel):
+    """ Schema de resposta de POST /transacoes/batch. """
+    efetivadas: int
+    recusadas: int
+    resultados: List[TransacaoLoteItem]
+
+class TransferenciaAgendadaRead(BaseModel):
+    """
+    Situação de uma transferência de POST /transacoes/async: `pendente`, `efetivada`
+    (com a transação) ou `recusada` (com o motivo).
+    """
+    id: int
+    estado: str
+    status_url: str
+    carteira_origem_id: int
+    carteira_destino_id: int
+    valor: Decimal
+    criada_em: datetime
+    processada_em: Optional[datetime] = None
+    transacao: Optional[TransacaoRead] = None
+    motivo: Optional[str] = None
+    detail: Optional[str] = None
@@ -0,0 +1,169 @@
+"""
+Autorizações de cartão contra `Cartao.limite`: reserva, captura e liberação.
+A decisão é um único UPDATE condicional em `cartoes_uso` (reservado + utilizado + valor <= limite):
+sem leitura prévia do uso, autorizações simultâneas do mesmo cartão só se enfileiram na trava da
+linha durante o UPDATE, e cada uma reavalia a condição sobre o valor já atualizado pela anterior.
+O limite nunca é excedido, qualquer que seja a concorrência.
+"""
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import status
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core import dinheiro
+from app.core.cache import cache, chave
+from app.services.importacao import INSERTS_COM_ON_CONFLICT
+from app.services.saldos import instante
+
+RECUSAS = {
+    "cartao_nao_encontrado": (status.HTTP_404_NOT_FOUND, "Cartão não encontrado"),
+    "limite_insuficiente": (status.HTTP_402_PAYMENT_REQUIRED, "Limite disponível do cartão insuficiente."),
+    "valor_invalido": (
+        status.HTTP_400_BAD_REQUEST,
+        "O valor tem mais casas decimais do que a moeda permite ou excede o máximo suportado.",
+    ),
+    "autorizacao_nao_encontrada": (status.HTTP_404_NOT_FOUND, "Autorização não encontrada"),
+    "autorizacao_encerrada": (status.HTTP_409_CONFLICT, "A autorização já foi capturada ou liberada."),
+    "captura_acima_da_reserva": (status.HTTP_400_BAD_REQUEST, "O valor capturado excede o valor reservado."),
+}
+
+
+class AutorizacaoRecusada(Exception):
+    """ Recusa de uma operação de autorização; `motivo` é um código estável (ex.: "limite_insuficiente"). """
+
+    def __init__(self, motivo: str):
+        self.status_code, self.detail = RECUSAS[motivo]
+        super().__init__(self.detail)
+        self.motivo = motivo
+
+
+async def moeda_do_cartao(db: AsyncSession, cartao_id: int) -> str:
+    """ Moeda do cartão (fixa desde a criação), em cache: o caminho da autorização não lê o cartão. """
+    async def carregar():
+        return await db.scalar(select(models.Cartao.moeda).where(models.Cartao.id == cartao_id))
+
+    moeda = await cache.obter_ou_carregar(chave("moeda_cartao", cartao_id), carregar)
+    if moeda is None:
+        raise AutorizacaoRecusada("cartao_nao_encontrado")
+    return moeda
+
+
+def _unidades(valor: Decimal, moeda: str) -> int:
+    try:
+        return dinheiro.para_unidades(valor, moeda)
+    except ValueError:
+        raise AutorizacaoRecusada("valor_invalido")
+
+
+def _reserva(cartao_id: int, unidades: int):
+    uso = models.UsoCartao
+    limite = select(models.Cartao.limite_unidades).where(models.Cartao.id == cartao_id).scalar_subquery()
+    return (
+        update(uso)
+        .where(
+            uso.cartao_id == cartao_id,
+            uso.reservado_unidades + uso.utilizado_unidades + unidades <= limite,
+        )
+        .values(reservado_unidades=uso.reservado_unidades + unidades)
+        .returning(uso.cartao_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def autorizar(db: AsyncSession, cartao_id: int, valor: Decimal) -> models.Autorizacao:
+    """ Reserva `valor` no limite do cartão e grava a autorização, ou levanta a recusa. """
+    moeda = await moeda_do_cartao(db, cartao_id)
+    unidades = _unidades(valor, moeda)
+
+    reservou = (await db.execute(_reserva(cartao_id, unidades))).first()
+    if reservou is None:
+        # Primeira autorização do cartão (ainda sem linha de uso), limite insuficiente ou cartão removido
+        tabela = models.UsoCartao.__table__
+        try:
+            await db.execute(
+                INSERTS_COM_ON_CONFLICT[db.bind.dialect.name](tabela)
+                .values(cartao_id=cartao_id, reservado_unidades=0, utilizado_unidades=0)
+                .on_conflict_do_nothing()
+            )
+        except IntegrityError:
+            # Chave estrangeira: o cartão foi removido depois de a moeda entrar no cache (ex.: de outro processo)
+            await db.rollback()
+            cache.invalidar(chave("moeda_cartao", cartao_id))
+            raise AutorizacaoRecusada("cartao_nao_encontrado")
+        reservou = (await db.execute(_reserva(cartao_id, unidades))).first()
+    if reservou is None:
+        await db.rollback()
+        if await db.scalar(select(models.Cartao.id).where(models.Cartao.id == cartao_id)) is None:
+            cache.invalidar(chave("moeda_cartao", cartao_id))
+            raise AutorizacaoRecusada("cartao_nao_encontrado")
+        raise AutorizacaoRecusada("limite_insuficiente")
+
+    autorizacao = models.Autorizacao(
+        cartao_id=cartao_id, valor_unidades=unidades, moeda=moeda, estado="reservada", criada_em=instante(None)
+    )
+    db.add(autorizacao)
+    await db.commit()
+    return autorizacao
+
+
+async def _encerrar(
+    db: AsyncSession, cartao_id: int, autorizacao_id: int, estado: str, capturado: Optional[int]
+) -> models.Autorizacao:
+    """
+    Passa a autorização de `reservada` para `estado` (UPDATE condicional: nunca duas vezes) e devolve
+    a reserva ao uso do cartão, somando o capturado ao utilizado. Uma transação.
+    """
+    autorizacao = models.Autorizacao
+    valores = {"estado": estado, "encerrada_em": instante(None)}
+    condicoes = [
+        autorizacao.id == autorizacao_id,
+        autorizacao.cartao_id == cartao_id,
+        autorizacao.estado == "reservada",
+    ]
+    if estado == "capturada":
+        valores["capturado_unidades"] = autorizacao.valor_unidades if capturado is None else capturado
+        if capturado is not None:
+            condicoes.append(autorizacao.valor_unidades >= capturado)
+
+    encerrada = await db.scalar(
+        update(autorizacao).where(*condicoes).values(**valores).returning(autorizacao)
+        .execution_options(populate_existing=True)
+    )
+    if encerrada is None:
+        await db.rollback()
+        existente = await db.get(models.Autorizacao, autorizacao_id)
+        if existente is None or existente.cartao_id != cartao_id:
+            raise AutorizacaoRecusada("autorizacao_nao_encontrada")
+        if existente.estado != "reservada":
+            raise AutorizacaoRecusada("autorizacao_encerrada")
+        raise AutorizacaoRecusada("captura_acima_da_reserva")
+
+    uso = models.UsoCartao
+    await db.execute(
+        update(uso)
+        .where(uso.cartao_id == cartao_id)
+        .values(
+            reservado_unidades=uso.reservado_unidades - encerrada.valor_unidades,
+            utilizado_unidades=uso.utilizado_unidades + (encerrada.capturado_unidades or 0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return encerrada
+
+
+async def capturar(
+    db: AsyncSession, cartao_id: int, autorizacao_id: int, valor: Optional[Decimal]
+) -> models.Autorizacao:
+    """ Captura `valor` (padrão: toda a reserva) de uma autorização reservada; o restante volta ao disponível. """
+    capturado = None if valor is None else _unidades(valor, await moeda_do_cartao(db, cartao_id))
+    return await _encerrar(db, cartao_id, autorizacao_id, "capturada", capturado)
+
+
+async def liberar(db: AsyncSession, cartao_id: int, autorizacao_id: int) -> models.Autorizacao:
+    """ Cancela uma autorização reservada, devolvendo o valor ao disponível do cartão. """
+    return await _encerrar(db, cartao_id, autorizacao_id, "liberada", None)
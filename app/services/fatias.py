@@ -0,0 +1,108 @@
+"""
+Carteiras quentes: com `Carteira.fatias` = N > 0, cada crédito soma em uma de N linhas de
+`saldos_fatias` (sorteada), e não na linha da carteira. Créditos simultâneos para a mesma carteira
+deixam de fazer fila na trava de uma única linha. Débitos continuam na linha principal; se ela não
+bastar, as fatias são recolhidas para ela antes de desistir. Uma tarefa em segundo plano recolhe as
+fatias periodicamente, então elas ficam pequenas.
+"""
+import asyncio
+import logging
+import random
+from collections import defaultdict
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.cache import cache, chave
+from app.services.importacao import INSERTS_COM_ON_CONFLICT
+
+logger = logging.getLogger("fintracker.fatias")
+
+
+class PerfilCredito(NamedTuple):
+    """ O que um crédito precisa saber da carteira de destino sem travá-la. """
+    fatias: int
+    usuario_id: int
+
+
+async def perfil(db: AsyncSession, carteira_id: int) -> Optional[PerfilCredito]:
+    """ Modo da carteira (em cache: muda raramente e a escrita invalida a chave). """
+    async def carregar():
+        statement = select(models.Carteira.fatias, models.Carteira.usuario_id).where(models.Carteira.id == carteira_id)
+        linha = (await db.execute(statement)).first()
+        return PerfilCredito(*linha) if linha else None
+
+    return await cache.obter_ou_carregar(chave("fatias", carteira_id), carregar)
+
+
+def sortear(fatias: int) -> int:
+    return random.randrange(fatias)
+
+
+def credito(dialeto: str, carteira_id: int, fatia: int, unidades: int):
+    """ Upsert que soma `unidades` na fatia da carteira. """
+    tabela = models.SaldoFatia.__table__
+    statement = INSERTS_COM_ON_CONFLICT[dialeto](tabela).values(
+        carteira_id=carteira_id, fatia=fatia, saldo_unidades=unidades
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[tabela.c.carteira_id, tabela.c.fatia],
+        set_={"saldo_unidades": tabela.c.saldo_unidades + statement.excluded.saldo_unidades},
+    )
+
+
+async def recolher(db: AsyncSession, carteira_ids: Iterable[int]) -> dict[int, int]:
+    """
+    Move o saldo das fatias das carteiras para as suas linhas principais, na transação corrente.
+    Retorna o total recolhido por carteira (vazio se não havia fatias). O saldo total não muda.
+    """
+    ids = sorted(set(carteira_ids))
+    if not ids:
+        return {}
+    # Linha principal antes das fatias, como o débito: recolhimento e débito nunca se esperam em ciclo
+    await db.execute(
+        select(models.Carteira.id).where(models.Carteira.id.in_(ids)).order_by(models.Carteira.id).with_for_update()
+    )
+    statement = (
+        delete(models.SaldoFatia)
+        .where(models.SaldoFatia.carteira_id.in_(ids))
+        .returning(models.SaldoFatia.carteira_id, models.SaldoFatia.saldo_unidades)
+    )
+    totais = defaultdict(int)
+    for carteira_id, unidades in (await db.execute(statement)).all():
+        totais[carteira_id] += unidades
+    if totais:
+        statement = (
+            update(models.Carteira)
+            .where(models.Carteira.id.in_(totais))
+            .values(saldo_unidades=models.Carteira.saldo_unidades + case(dict(totais), value=models.Carteira.id))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(statement)
+    return dict(totais)
+
+
+async def recolher_pendentes(session_factory) -> int:
+    """ Recolhe as fatias de todas as carteiras que as têm, uma carteira por transação. Retorna quantas. """
+    async with session_factory() as db:
+        ids = (await db.scalars(select(models.SaldoFatia.carteira_id).distinct())).all()
+    for carteira_id in ids:
+        # Sem invalidar o cache: o saldo exibido e o ETag dependem só do total (linha principal + fatias),
+        # da versão e dos cartões, e recolher não muda nenhum deles
+        async with session_factory() as db:
+            await recolher(db, [carteira_id])
+            await db.commit()
+    return len(ids)
+
+
+async def recolher_periodicamente(session_factory, intervalo: float) -> None:
+    """ Tarefa em segundo plano da aplicação: recolhe as fatias a cada `intervalo` segundos. """
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await recolher_pendentes(session_factory)
+        except Exception:
+            # Deadlock com uma transferência, banco indisponível...: tenta de novo no próximo ciclo
+            logger.exception("Falha ao recolher as fatias das carteiras quentes")
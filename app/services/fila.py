@@ -0,0 +1,112 @@
+"""
+Fila de transferências assíncronas (POST /transacoes/async), guardada no próprio banco
+(`transferencias_agendadas`): o recebimento é um INSERT curto, sem travar carteiras.
+O worker da aplicação drena a fila em lotes de até FILA_LOTE_MAX, cada lote em uma única
+transação (group commit): um fsync para muitas transferências em vez de um por transferência.
+Com vários processos da API, cada worker pega pendentes diferentes (FOR UPDATE SKIP LOCKED).
+"""
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.core import dinheiro
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.metricas import registrar_transferencia
+from app.services.saldos import instante
+from app.services.transferencia import aplicar_lote, com_retentativas, validar_transferencia
+
+logger = logging.getLogger("fintracker.fila")
+
+# Acorda o worker deste processo quando uma transferência chega (os outros processos acham na próxima espera).
+# Criado pelo worker, no event loop em que ele roda
+chegou: Optional[asyncio.Event] = None
+
+
+async def enfileirar(db: AsyncSession, transacao: schemas.TransacaoCreate) -> models.TransferenciaAgendada:
+    """
+    Grava a transferência como pendente. Recusas que não dependem de saldo (mesma carteira, moeda,
+    valor) são levantadas aqui; saldo insuficiente só aparece no processamento.
+    """
+    moeda, unidades = await validar_transferencia(db, transacao)
+    agendada = models.TransferenciaAgendada(
+        carteira_origem_id=transacao.carteira_origem_id,
+        carteira_destino_id=transacao.carteira_destino_id,
+        valor_unidades=unidades,
+        moeda=moeda,
+        estado="pendente",
+    )
+    db.add(agendada)
+    await db.commit()
+    await db.refresh(agendada)
+    if chegou is not None:
+        chegou.set()
+    return agendada
+
+
+async def processar_lote(db: AsyncSession, limite: int) -> int:
+    """ Efetiva (ou recusa) as `limite` pendentes mais antigas em uma transação. Retorna quantas. """
+    async def operacao():
+        statement = (
+            select(models.TransferenciaAgendada)
+            .where(models.TransferenciaAgendada.estado == "pendente")
+            .order_by(models.TransferenciaAgendada.id)
+            .limit(limite)
+            .with_for_update(skip_locked=True)
+        )
+        agendadas = (await db.scalars(statement)).all()
+        if not agendadas:
+            return [], set()
+        transacoes = [
+            schemas.TransacaoCreate(
+                carteira_origem_id=agendada.carteira_origem_id,
+                carteira_destino_id=agendada.carteira_destino_id,
+                valor=dinheiro.para_decimal(agendada.valor_unidades, agendada.moeda),
+            )
+            for agendada in agendadas
+        ]
+        aplicado = await aplicar_lote(db, transacoes, atomico=False)
+        if aplicado is None:
+            return None
+        resultados, chaves = aplicado
+        processada_em = instante(None)
+        for agendada, resultado in zip(agendadas, resultados):
+            agendada.processada_em = processada_em
+            if resultado.recusa is not None:
+                agendada.estado, agendada.motivo = "recusada", resultado.recusa.motivo
+            else:
+                agendada.estado, agendada.transacao_id = "efetivada", resultado.transacao.id
+        return resultados, chaves
+
+    resultados, chaves = await com_retentativas(db, operacao)
+    cache.invalidar(*chaves)
+    for resultado in resultados:
+        registrar_transferencia(resultado.recusa.motivo if resultado.recusa else None)
+    return len(resultados)
+
+
+async def processar_continuamente(session_factory, espera: float) -> None:
+    """
+    Worker da aplicação: processa lotes enquanto houver pendentes; com a fila vazia, espera
+    uma chegada neste processo ou `espera` segundos. Sob carga, as transferências que chegam
+    durante um lote formam o próximo.
+    """
+    global chegou
+    chegou = asyncio.Event()
+    while True:
+        chegou.clear()
+        try:
+            async with session_factory() as db:
+                processadas = await processar_lote(db, settings.FILA_LOTE_MAX)
+        except Exception:
+            # Banco indisponível, conflito esgotado...: as pendentes continuam na fila
+            logger.exception("Falha ao processar a fila de transferências")
+            processadas = 0
+        if processadas < settings.FILA_LOTE_MAX:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(chegou.wait(), espera)
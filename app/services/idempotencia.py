@@ -0,0 +1,61 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+
+
+def _agora() -> datetime:
+    # As colunas DateTime do projeto são sem fuso, em UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def hash_requisicao(corpo: BaseModel) -> str:
+    """ Hash estável do corpo validado (chaves ordenadas, decimais como texto). """
+    canonico = json.dumps(corpo.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonico.encode()).hexdigest()
+
+
+async def buscar(db: AsyncSession, chave: str) -> Optional[models.ChaveIdempotencia]:
+    """ Registro ainda válido da chave, se houver; chaves expiradas são tratadas como inexistentes. """
+    statement = select(models.ChaveIdempotencia).where(
+        models.ChaveIdempotencia.chave == chave,
+        models.ChaveIdempotencia.expira_em > _agora(),
+    )
+    return (await db.execute(statement)).scalar_one_or_none()
+
+
+async def registrar(db: AsyncSession, chave: str, hash_corpo: str, resposta: dict) -> None:
+    """
+    Grava a resposta na transação corrente (sem commit): ela só existe se a transferência existir.
+    Antes, remove a própria chave se expirada e até IDEMPOTENCIA_PURGA_LOTE outras chaves
+    expiradas, de modo que a tabela se limpa sozinha sem um job agendado.
+    """
+    agora = _agora()
+    expiradas = (
+        select(models.ChaveIdempotencia.chave)
+        .where(models.ChaveIdempotencia.expira_em <= agora)
+        .limit(settings.IDEMPOTENCIA_PURGA_LOTE)
+    )
+    await db.execute(
+        delete(models.ChaveIdempotencia)
+        .where(
+            or_(models.ChaveIdempotencia.chave == chave, models.ChaveIdempotencia.chave.in_(expiradas)),
+            models.ChaveIdempotencia.expira_em <= agora,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        insert(models.ChaveIdempotencia).values(
+            chave=chave,
+            hash_requisicao=hash_corpo,
+            resposta=resposta,
+            expira_em=agora + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS),
+        )
+    )
@@ -0,0 +1,243 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional, Type, Union
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache, chave as chave_cache, chaves_contagem
+from app.core.config import settings
+
+# Dialetos com INSERT ... ON CONFLICT DO NOTHING
+INSERTS_COM_ON_CONFLICT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+@dataclass
+class Entidade:
+    """ Como importar um modelo: schema de validação, chaves únicas e chave estrangeira a conferir. """
+    modelo: type
+    schema: Type[BaseModel]
+    chaves_unicas: tuple[str, ...] = ()
+    referencia: Optional[tuple[str, type]] = None  # (campo, modelo referenciado)
+    # Ajusta os dados validados às colunas da tabela (ex.: valores em unidades menores da moeda).
+    # Recebe a linha do registro referenciado, se houver; um ValueError vira erro da linha.
+    converter: Optional[Callable[[dict, object], dict]] = None
+    # Chamado com os (id, dados) gravados de cada lote, antes do commit (ex.: registros derivados)
+    apos_inserir: Optional[Callable[[AsyncSession, list[tuple[int, dict]]], Awaitable[None]]] = None
+
+
+@dataclass
+class ResultadoImportacao:
+    criados: list[tuple[int, int]] = field(default_factory=list)  # (linha, id)
+    erros: list[tuple[int, str, str]] = field(default_factory=list)  # (linha, motivo, detalhe)
+
+
+async def linhas_da_requisicao(corpo: AsyncIterator[bytes]) -> AsyncIterator[Union[str, UnicodeDecodeError]]:
+    """
+    Quebra o corpo da requisição em linhas à medida que ele chega, sem carregá-lo inteiro.
+    Linhas que não são UTF-8 válido vêm como o UnicodeDecodeError, para o leitor rejeitá-las.
+    """
+    resto = b""
+    async for pedaco in corpo:
+        resto += pedaco
+        # O byte "\n" nunca aparece dentro de um caractere UTF-8 multibyte: cada linha decodifica sozinha
+        *linhas, resto = resto.split(b"\n")
+        for linha in linhas:
+            yield _decodificar(linha)
+    if resto:
+        yield _decodificar(resto)
+
+
+def _decodificar(linha: bytes) -> Union[str, UnicodeDecodeError]:
+    try:
+        return linha.decode().rstrip("\r")
+    except UnicodeDecodeError as e:
+        return e
+
+
+def _linha_invalida(erro: UnicodeDecodeError) -> ValueError:
+    return ValueError(f"Linha não está em UTF-8: byte inválido na posição {erro.start + 1}.")
+
+
+async def registros_ndjson(linhas: AsyncIterator[Union[str, UnicodeDecodeError]]) -> AsyncIterator[tuple[int, object]]:
+    """ (número da linha, objeto) para cada linha não vazia; linhas inválidas viram um ValueError com o motivo. """
+    numero = 0
+    async for linha in linhas:
+        numero += 1
+        if isinstance(linha, UnicodeDecodeError):
+            yield numero, _linha_invalida(linha)
+            continue
+        if not linha.strip():
+            continue
+        try:
+            yield numero, json.loads(linha)
+        except ValueError as e:
+            yield numero, ValueError(f"JSON inválido: {e}")
+
+
+async def _registros_csv_brutos(
+    linhas: AsyncIterator[Union[str, UnicodeDecodeError]]
+) -> AsyncIterator[tuple[int, Union[str, ValueError]]]:
+    """
+    (número da primeira linha, texto) de cada registro CSV. Um campo entre aspas pode conter quebras
+    de linha: o registro só termina na linha em que as aspas ficam balanceadas.
+    """
+    numero = inicio = aspas = 0
+    pendentes = []
+    async for linha in linhas:
+        numero += 1
+        if not pendentes:
+            if isinstance(linha, str) and not linha.strip():
+                continue
+            inicio = numero
+        pendentes.append(linha)
+        # As aspas (0x22) também nunca fazem parte de um caractere multibyte: contam mesmo nos bytes inválidos
+        aspas += linha.object.count(b'"') if isinstance(linha, UnicodeDecodeError) else linha.count('"')
+        if aspas % 2 == 0:
+            yield inicio, _juntar(pendentes)
+            pendentes, aspas = [], 0
+    if pendentes:
+        yield inicio, _juntar(pendentes)
+
+
+def _juntar(linhas: list[Union[str, UnicodeDecodeError]]) -> Union[str, ValueError]:
+    for linha in linhas:
+        if isinstance(linha, UnicodeDecodeError):
+            return _linha_invalida(linha)
+    return "\n".join(linhas)
+
+
+async def registros_csv(linhas: AsyncIterator[Union[str, UnicodeDecodeError]]) -> AsyncIterator[tuple[int, object]]:
+    """ (número da linha, dict) para cada registro de dados; o primeiro é o cabeçalho. Células vazias são omitidas. """
+    cabecalho = None
+    async for numero, registro in _registros_csv_brutos(linhas):
+        if isinstance(registro, ValueError):
+            yield numero, registro
+            continue
+        try:
+            valores = next(csv.reader(io.StringIO(registro)))
+        except csv.Error as e:
+            yield numero, ValueError(f"CSV inválido: {e}")
+            continue
+        if cabecalho is None:
+            cabecalho = [coluna.strip() for coluna in valores]
+            continue
+        yield numero, {coluna: valor for coluna, valor in zip(cabecalho, valores) if valor != ""}
+
+
+class _Importador:
+    def __init__(self, db: AsyncSession, entidade: Entidade):
+        self.db = db
+        self.entidade = entidade
+        self.resultado = ResultadoImportacao()
+        # Valores únicos já vistos nesta importação: duplicatas dentro do próprio arquivo são conflitos
+        self.vistos = {chave: set() for chave in entidade.chaves_unicas}
+        self.tabela = entidade.modelo.__table__
+
+    def validar(self, numero: int, registro) -> Optional[dict]:
+        if isinstance(registro, Exception):
+            self.resultado.erros.append((numero, "invalido", str(registro)))
+            return None
+        try:
+            dados = self.entidade.schema.model_validate(registro).model_dump()
+        except ValidationError as e:
+            detalhe = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            self.resultado.erros.append((numero, "invalido", detalhe))
+            return None
+        for chave, vistos in self.vistos.items():
+            if dados[chave] in vistos:
+                self.resultado.erros.append((numero, "conflito", f"{chave} repetido no arquivo."))
+                return None
+        for chave, vistos in self.vistos.items():
+            vistos.add(dados[chave])
+        return dados
+
+    async def gravar(self, lote: list[tuple[int, dict]]) -> None:
+        """ Grava um lote validado com um INSERT multi-linha e confirma; conflitos viram erros por linha. """
+        existentes = {}
+        if self.entidade.referencia and lote:
+            campo, referenciado = self.entidade.referencia
+            ids = {dados[campo] for _, dados in lote}
+            statement = select(*referenciado.__table__.c).where(referenciado.id.in_(ids))
+            existentes = {linha.id: linha for linha in (await self.db.execute(statement)).all()}
+            validos = []
+            for numero, dados in lote:
+                if dados[campo] in existentes:
+                    validos.append((numero, dados))
+                else:
+                    self.resultado.erros.append(
+                        (numero, "referencia_inexistente", f"{campo} {dados[campo]} não encontrado.")
+                    )
+            lote = validos
+        if self.entidade.converter and lote:
+            convertidos = []
+            for numero, dados in lote:
+                referencia = existentes.get(dados[self.entidade.referencia[0]]) if self.entidade.referencia else None
+                try:
+                    convertidos.append((numero, self.entidade.converter(dados, referencia)))
+                except ValueError as e:
+                    self.resultado.erros.append((numero, "invalido", str(e)))
+            lote = convertidos
+        if not lote:
+            return
+        invalidadas = chaves_contagem(self.tabela.name)
+        if self.entidade.referencia:
+            campo, referenciado = self.entidade.referencia
+            ids = {dados[campo] for _, dados in lote}
+            # As leituras do registro pai (ex.: usuário -> carteiras) mudam com os novos filhos, assim como os totais por pai
+            invalidadas += [chave_cache(referenciado.__name__.lower(), id) for id in ids]
+            invalidadas += chaves_contagem(self.tabela.name, *ids)
+
+        parametros = [dados for _, dados in lote]
+        gravados = []
+        if self.entidade.chaves_unicas:
+            chave = self.entidade.chaves_unicas[0]
+            dialeto = self.db.bind.dialect.name
+            statement = (
+                INSERTS_COM_ON_CONFLICT[dialeto](self.tabela)
+                .on_conflict_do_nothing()
+                .returning(self.tabela.c.id, self.tabela.c[chave])
+            )
+            inseridos = {valor: id for id, valor in (await self.db.execute(statement, parametros)).all()}
+            for numero, dados in lote:
+                if dados[chave] in inseridos:
+                    self.resultado.criados.append((numero, inseridos[dados[chave]]))
+                    gravados.append((inseridos[dados[chave]], dados))
+                else:
+                    chaves = "/".join(self.entidade.chaves_unicas)
+                    self.resultado.erros.append((numero, "conflito", f"{chaves} já cadastrado no sistema."))
+        else:
+            statement = insert(self.tabela).returning(self.tabela.c.id, sort_by_parameter_order=True)
+            ids = (await self.db.execute(statement, parametros)).scalars().all()
+            self.resultado.criados.extend((numero, id) for (numero, _), id in zip(lote, ids))
+            gravados = [(id, dados) for (_, dados), id in zip(lote, ids)]
+        if self.entidade.apos_inserir and gravados:
+            await self.entidade.apos_inserir(self.db, gravados)
+        await self.db.commit()
+        cache.invalidar(*invalidadas)
+
+
+async def importar(
+    db: AsyncSession, entidade: Entidade, registros: AsyncIterator[tuple[int, object]]
+) -> ResultadoImportacao:
+    """
+    Importa registros em lotes de IMPORTACAO_TAMANHO_LOTE linhas: cada lote é validado com o
+    schema Pydantic, gravado com um único INSERT multi-linha (... ON CONFLICT DO NOTHING
+    RETURNING quando há chaves únicas) e confirmado. Linhas inválidas ou em conflito são
+    reportadas individualmente e não interrompem a importação.
+    """
+    importador = _Importador(db, entidade)
+    lote = []
+    async for numero, registro in registros:
+        dados = importador.validar(numero, registro)
+        if dados is not None:
+            lote.append((numero, dados))
+        if len(lote) >= settings.IMPORTACAO_TAMANHO_LOTE:
+            await importador.gravar(lote)
+            lote = []
+    await importador.gravar(lote)
+    return importador.resultado
@@ -0,0 +1,169 @@
+"""
+Resumos por carteira e período (entradas, saídas e quantidade de transações), mantidos de forma
+incremental pelas transferências. Para preencher ou refazer o histórico:
+
+    python -m app.services.resumos [--desde AAAA-MM-DD]
+
+A reconstrução trava as inserções em `transacoes` (no PostgreSQL) enquanto recalcula os períodos
+a partir de `--desde` (padrão: todo o histórico), então os resumos nunca contam uma transação duas vezes.
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy import delete, func, insert, literal, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+from app.database.functions import inicio_do_dia, inicio_do_mes
+from app.services.importacao import INSERTS_COM_ON_CONFLICT
+
+# granularidade -> (início do período de um datetime em Python, o mesmo em SQL)
+GRANULARIDADES = {
+    "day": (lambda momento: momento.date(), inicio_do_dia),
+    "month": (lambda momento: momento.date().replace(day=1), inicio_do_mes),
+}
+
+
+def _meia_noite(dia: date) -> datetime:
+    return datetime.combine(dia, time.min)
+
+
+async def acumular(
+    db: AsyncSession, transacoes: Iterable[models.Transacao], fatias: Optional[Mapping[int, int]] = None
+) -> None:
+    """
+    Soma as transações aos resumos das carteiras envolvidas, na transação corrente do banco
+    (um upsert por carteira e período). As carteiras já estão travadas pela transferência, então
+    as linhas de resumo de uma carteira nunca são disputadas fora da ordem das travas.
+    `fatias` (carteira -> fatia) desvia as entradas de carteiras quentes, que não são travadas,
+    para a mesma fatia sorteada para o saldo.
+    """
+    fatias = fatias or {}
+    # (carteira, granularidade, período, fatia) -> [entradas, saídas, quantidade]
+    totais = defaultdict(lambda: [0, 0, 0])
+    for transacao in transacoes:
+        for granularidade, (periodo, _) in GRANULARIDADES.items():
+            inicio = periodo(transacao.timestamp)
+            destino = transacao.carteira_destino_id
+            entrada = totais[(destino, granularidade, inicio, fatias.get(destino, 0))]
+            entrada[0] += transacao.valor_unidades
+            entrada[2] += 1
+            saida = totais[(transacao.carteira_origem_id, granularidade, inicio, 0)]
+            saida[1] += transacao.valor_unidades
+            saida[2] += 1
+    if not totais:
+        return
+
+    tabela = models.ResumoCarteira.__table__
+    statement = INSERTS_COM_ON_CONFLICT[db.bind.dialect.name](tabela)
+    statement = statement.on_conflict_do_update(
+        index_elements=[tabela.c.carteira_id, tabela.c.granularidade, tabela.c.periodo, tabela.c.fatia],
+        set_={
+            "entradas_unidades": tabela.c.entradas_unidades + statement.excluded.entradas_unidades,
+            "saidas_unidades": tabela.c.saidas_unidades + statement.excluded.saidas_unidades,
+            "quantidade": tabela.c.quantidade + statement.excluded.quantidade,
+        },
+    )
+    await db.execute(statement, [
+        {
+            "carteira_id": carteira_id,
+            "granularidade": granularidade,
+            "periodo": inicio,
+            "fatia": fatia,
+            "entradas_unidades": entradas,
+            "saidas_unidades": saidas,
+            "quantidade": quantidade,
+        }
+        for (carteira_id, granularidade, inicio, fatia), (entradas, saidas, quantidade) in sorted(totais.items())
+    ])
+
+
+async def listar(db: AsyncSession, carteira_id: int, granularidade: str, desde: Optional[date], ate: Optional[date]):
+    """
+    Resumos da carteira em ordem de período (fatias somadas), opcionalmente entre `desde` e `ate` (inclusive).
+    Cada linha tem `periodo`, `entradas_unidades`, `saidas_unidades` e `quantidade`.
+    """
+    resumo = models.ResumoCarteira
+    statement = (
+        select(
+            resumo.periodo,
+            func.sum(resumo.entradas_unidades).label("entradas_unidades"),
+            func.sum(resumo.saidas_unidades).label("saidas_unidades"),
+            func.sum(resumo.quantidade).label("quantidade"),
+        )
+        .where(resumo.carteira_id == carteira_id, resumo.granularidade == granularidade)
+        .group_by(resumo.periodo)
+    )
+    if desde:
+        statement = statement.where(models.ResumoCarteira.periodo >= GRANULARIDADES[granularidade][0](_meia_noite(desde)))
+    if ate:
+        statement = statement.where(models.ResumoCarteira.periodo <= ate)
+    return (await db.execute(statement.order_by(resumo.periodo))).all()
+
+
+async def reconstruir(db: AsyncSession, desde: Optional[date] = None) -> None:
+    """ Recalcula os resumos a partir de `desde` (todo o histórico se None) direto das transações. """
+    if db.bind.dialect.name == "postgresql":
+        # Transferências esperam a reconstrução terminar: nenhuma é somada duas vezes ou perdida
+        await db.execute(text("LOCK TABLE transacoes IN SHARE MODE"))
+    tabela = models.ResumoCarteira.__table__
+    transacao = models.Transacao
+    for granularidade, (periodo, periodo_sql) in GRANULARIDADES.items():
+        inicio = periodo(_meia_noite(desde)) if desde else None
+        apagar = delete(tabela).where(tabela.c.granularidade == granularidade)
+        if inicio:
+            apagar = apagar.where(tabela.c.periodo >= inicio)
+        await db.execute(apagar)
+
+        ramos = []
+        for carteira, entrada, saida in (
+            (transacao.carteira_destino_id, transacao.valor_unidades, literal(0)),
+            (transacao.carteira_origem_id, literal(0), transacao.valor_unidades),
+        ):
+            ramo = select(
+                carteira.label("carteira_id"),
+                periodo_sql(transacao.timestamp).label("periodo"),
+                entrada.label("entrada"),
+                saida.label("saida"),
+            )
+            if inicio:
+                ramo = ramo.where(transacao.timestamp >= _meia_noite(inicio))
+            ramos.append(ramo)
+        movimentos = union_all(*ramos).subquery()
+        agregados = select(
+            movimentos.c.carteira_id,
+            literal(granularidade),
+            movimentos.c.periodo,
+            func.sum(movimentos.c.entrada),
+            func.sum(movimentos.c.saida),
+            func.count(),
+        ).group_by(movimentos.c.carteira_id, movimentos.c.periodo)
+        await db.execute(
+            insert(tabela).from_select(
+                ["carteira_id", "granularidade", "periodo", "entradas_unidades", "saidas_unidades", "quantidade"],
+                agregados,
+            )
+        )
+    await db.commit()
+
+
+async def main(desde: Optional[date]) -> None:
+    from app.database.session import criar_engine, criar_sessionmaker
+
+    engine = criar_engine(settings.DATABASE_URL, limite_comando_ms=0, pool="manutencao")
+    try:
+        async with criar_sessionmaker(engine)() as db:
+            await reconstruir(db, desde)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="primeiro dia a recalcular")
+    args = parser.parse_args()
+    asyncio.run(main(args.desde))
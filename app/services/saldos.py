@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import case, func, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+
+# `timestamp` é o início da transação do banco, não o momento do commit: uma transferência
+# aplicada depois da foto pode ter começado um pouco antes dela. A folga só limita a busca
+# (e as partições lidas); quem decide se a transação entra é o id.
+FOLGA = timedelta(hours=1)
+
+
+@dataclass
+class SaldoEm:
+    """ Saldo de uma carteira num instante: a foto usada como base e as transações somadas a ela. """
+    saldo_unidades: int
+    foto: models.SaldoHistorico
+    transacoes: int
+
+
+def instante(momento: Optional[datetime]) -> datetime:
+    """ Instante da consulta como as colunas DateTime do projeto (UTC, sem fuso); ausente = agora. """
+    if momento is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if momento.tzinfo is not None:
+        return momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento
+
+
+def deve_fotografar(movimentos_antes: int, movimentos_depois: int) -> bool:
+    """ Se o contador de movimentos da carteira cruzou um múltiplo de SALDO_FOTO_A_CADA. """
+    a_cada = settings.SALDO_FOTO_A_CADA
+    return movimentos_depois // a_cada > movimentos_antes // a_cada
+
+
+def foto(carteira_id: int, saldo_unidades: int, ate_transacao_id: int, momento: Optional[datetime] = None) -> dict:
+    """ Linha de saldos_historicos; numa transferência, `momento` é o timestamp da transação que fecha a foto. """
+    linha = {"carteira_id": carteira_id, "saldo_unidades": saldo_unidades, "ate_transacao_id": ate_transacao_id}
+    if momento is not None:
+        linha["momento"] = momento
+    return linha
+
+
+async def registrar_fotos(db: AsyncSession, fotos: list[dict]) -> None:
+    """ Grava as fotos na transação corrente (a mesma que alterou os saldos). """
+    if fotos:
+        await db.execute(insert(models.SaldoHistorico), fotos)
+
+
+async def fotografar(db: AsyncSession, carteira_id: int, saldo_unidades: int, ate_transacao_id: Optional[int] = None) -> None:
+    """
+    Foto fora de uma transferência (criação da carteira ou saldo alterado diretamente).
+    Deve rodar com a carteira já travada pelo UPDATE/INSERT da transação corrente: nenhuma
+    transferência da carteira está em andamento, e as próximas recebem ids maiores que o maior atual.
+    """
+    if ate_transacao_id is None:
+        ate_transacao_id = await db.scalar(select(func.coalesce(func.max(models.Transacao.id), 0)))
+    await registrar_fotos(db, [foto(carteira_id, saldo_unidades, ate_transacao_id)])
+
+
+def _da_carteira(carteira_id: int):
+    return or_(models.Transacao.carteira_origem_id == carteira_id, models.Transacao.carteira_destino_id == carteira_id)
+
+
+def _delta(carteira_id: int):
+    """ Efeito da transação no saldo da carteira: crédito positivo, débito negativo. """
+    return case(
+        (models.Transacao.carteira_destino_id == carteira_id, models.Transacao.valor_unidades),
+        else_=-models.Transacao.valor_unidades,
+    )
+
+
+async def saldo_em(db: AsyncSession, carteira_id: int, momento: datetime) -> Optional[SaldoEm]:
+    """
+    Saldo da carteira imediatamente antes de `momento`: a foto mais recente anterior a ele
+    mais as transações seguintes à foto. O trabalho é limitado pelo intervalo entre fotos,
+    não pelo tamanho do histórico. None se não houver foto antes de `momento`.
+    """
+    statement = (
+        select(models.SaldoHistorico)
+        .where(models.SaldoHistorico.carteira_id == carteira_id, models.SaldoHistorico.momento < momento)
+        .order_by(models.SaldoHistorico.momento.desc(), models.SaldoHistorico.ate_transacao_id.desc())
+        .limit(1)
+    )
+    base = (await db.scalars(statement)).first()
+    if base is None:
+        return None
+
+    statement = select(func.coalesce(func.sum(_delta(carteira_id)), 0), func.count()).where(
+        _da_carteira(carteira_id),
+        models.Transacao.id > base.ate_transacao_id,
+        models.Transacao.timestamp >= base.momento - FOLGA,
+        models.Transacao.timestamp < momento,
+    )
+    delta, transacoes = (await db.execute(statement)).one()
+    return SaldoEm(base.saldo_unidades + delta, base, transacoes)
+
+
+async def lancamentos(
+    db: AsyncSession, carteira_id: int, inicio: datetime, fim: datetime, apos_id: int, limite: int
+) -> list:
+    """
+    Transações da carteira em [inicio, fim), por (timestamp, id), com o delta e o acumulado desde
+    `inicio` (SUM ... OVER). É a mesma ordem que `saldo_em` usa para decidir o que já entrou no saldo
+    (timestamp < momento), então o saldo após cada lançamento é o de `saldo_em` logo depois dele.
+    O acumulado é calculado sobre o período inteiro antes de paginar, então continua correto nas
+    páginas seguintes; a página começa depois da transação `apos_id` na mesma ordem.
+    """
+    delta = _delta(carteira_id)
+    no_periodo = (models.Transacao.timestamp >= inicio, models.Transacao.timestamp < fim)
+    periodo = (
+        select(
+            models.Transacao.id,
+            models.Transacao.timestamp,
+            models.Transacao.moeda,
+            models.Transacao.carteira_origem_id,
+            models.Transacao.carteira_destino_id,
+            delta.label("delta"),
+            func.sum(delta).over(order_by=(models.Transacao.timestamp, models.Transacao.id)).label("acumulado"),
+        )
+        .where(_da_carteira(carteira_id), *no_periodo)
+        .subquery()
+    )
+    statement = select(periodo).order_by(periodo.c.timestamp, periodo.c.id).limit(limite)
+    if apos_id:
+        # Chave da página: (timestamp, id) da última transação entregue; o filtro do período limita as partições lidas
+        apos_timestamp = (
+            select(models.Transacao.timestamp).where(models.Transacao.id == apos_id, *no_periodo).scalar_subquery()
+        )
+        statement = statement.where(tuple_(periodo.c.timestamp, periodo.c.id) > tuple_(apos_timestamp, apos_id))
+    return (await db.execute(statement)).all()
@@ -0,0 +1,509 @@
+import asyncio
+import random
+from collections import Counter
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional
+
+from fastapi import status
+from sqlalchemy import select, update, insert, case, literal
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.core import dinheiro
+from app.core.cache import cache, chave, chaves_contagem
+from app.core.config import settings
+from app.core.metricas import registrar_transferencia
+from app.services import fatias, idempotencia, resumos
+from app.services import saldos as historico  # `saldos` é o nome dos saldos simulados no lote
+
+# SQLSTATEs do PostgreSQL que indicam conflito transitório: serialization_failure e deadlock_detected
+SQLSTATES_RETENTAVEIS = {"40001", "40P01"}
+
+
+class TransferenciaRecusada(Exception):
+    """
+    Erro de negócio de uma transferência.
+    `motivo` é um código estável (ex.: "saldo_insuficiente") para métricas e logs.
+    """
+
+    def __init__(self, status_code: int, detail: str, motivo: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.motivo = motivo
+
+
+# Catálogo de recusas: motivo -> (status HTTP, mensagem)
+RECUSAS = {
+    "mesma_carteira": (status.HTTP_400_BAD_REQUEST, "A carteira de origem e destino não podem ser a mesma."),
+    "carteira_nao_encontrada": (status.HTTP_404_NOT_FOUND, "Uma ou ambas as carteiras não foram encontradas."),
+    "moeda_divergente": (status.HTTP_400_BAD_REQUEST, "Transferências só são permitidas entre carteiras da mesma moeda."),
+    "saldo_insuficiente": (status.HTTP_400_BAD_REQUEST, "Saldo insuficiente na carteira de origem."),
+    "valor_invalido": (
+        status.HTTP_400_BAD_REQUEST,
+        "O valor tem mais casas decimais do que a moeda permite ou excede o máximo suportado.",
+    ),
+    "chave_idempotencia_reutilizada": (
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "Idempotency-Key já utilizada com uma requisição diferente.",
+    ),
+    "conflito_concorrencia": (
+        status.HTTP_409_CONFLICT,
+        "Não foi possível concluir a transferência devido à concorrência. Tente novamente.",
+    ),
+}
+
+
+def recusa(motivo: str) -> TransferenciaRecusada:
+    status_code, detail = RECUSAS[motivo]
+    return TransferenciaRecusada(status_code, detail, motivo)
+
+
+@dataclass
+class ResultadoLote:
+    """ Resultado de um item do lote: a transação efetivada ou a recusa. """
+    indice: int
+    transacao: Optional[models.Transacao] = None
+    recusa: Optional[TransferenciaRecusada] = None
+
+
+class LoteRecusado(TransferenciaRecusada):
+    """ Lote tudo-ou-nada com pelo menos um item recusado; nenhuma transferência foi aplicada. """
+
+    def __init__(self, recusados: list[ResultadoLote]):
+        super().__init__(
+            status.HTTP_400_BAD_REQUEST,
+            "Lote recusado: nenhuma transferência foi aplicada.",
+            "lote_recusado",
+        )
+        self.recusados = recusados
+
+
+def erro_retentavel(erro: DBAPIError) -> bool:
+    """ Indica se o erro do banco é um conflito de concorrência que pode ser resolvido tentando de novo. """
+    orig = erro.orig
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if sqlstate in SQLSTATES_RETENTAVEIS:
+        return True
+    # O SQLite sinaliza contenção de escrita como "database is locked"
+    return "database is locked" in str(orig)
+
+
+async def _moeda_das_carteiras(db: AsyncSession, transacao: schemas.TransacaoCreate) -> str:
+    """
+    Moeda comum às duas carteiras, necessária para converter o valor em unidades menores.
+    A moeda de uma carteira nunca muda, então fica no cache de leitura: no caminho quente
+    não há consulta extra. Levanta a recusa se uma carteira não existir ou as moedas divergirem.
+    """
+    async def carregar(carteira_id: int):
+        statement = select(models.Carteira.moeda).where(models.Carteira.id == carteira_id)
+        return (await db.execute(statement)).scalar_one_or_none()
+
+    moedas = [
+        await cache.obter_ou_carregar(chave("moeda", carteira_id), partial(carregar, carteira_id))
+        for carteira_id in (transacao.carteira_origem_id, transacao.carteira_destino_id)
+    ]
+    if None in moedas:
+        raise recusa("carteira_nao_encontrada")
+    if moedas[0] != moedas[1]:
+        raise recusa("moeda_divergente")
+    return moedas[0]
+
+
+def _unidades(transacao: schemas.TransacaoCreate, moeda: str) -> Optional[int]:
+    """ Valor da transferência em unidades menores da moeda, ou None se não for representável. """
+    try:
+        return dinheiro.para_unidades(transacao.valor, moeda)
+    except ValueError:
+        return None
+
+
+# Devolvidas pelos UPDATEs de saldo: chaves de cache e fotos do saldo (saldos_historicos)
+COLUNAS_ATUALIZADAS = (
+    models.Carteira.id,
+    models.Carteira.usuario_id,
+    models.Carteira.saldo_unidades,
+    models.Carteira.movimentos,
+    models.Carteira.fatias,
+)
+
+
+def _debito(transacao: schemas.TransacaoCreate, unidades: int):
+    """ UPDATE condicional: só debita se houver saldo (a moeda já foi conferida antes). """
+    return (
+        update(models.Carteira)
+        .where(
+            models.Carteira.id == transacao.carteira_origem_id,
+            models.Carteira.saldo_unidades >= unidades,
+        )
+        .values(
+            saldo_unidades=models.Carteira.saldo_unidades - unidades,
+            versao=models.Carteira.versao + 1,
+            movimentos=models.Carteira.movimentos + 1,
+        )
+        .returning(*COLUNAS_ATUALIZADAS)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _credito(transacao: schemas.TransacaoCreate, unidades: int):
+    return (
+        update(models.Carteira)
+        .where(models.Carteira.id == transacao.carteira_destino_id)
+        .values(
+            saldo_unidades=models.Carteira.saldo_unidades + unidades,
+            versao=models.Carteira.versao + 1,
+            movimentos=models.Carteira.movimentos + 1,
+        )
+        .returning(*COLUNAS_ATUALIZADAS)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def validar_transferencia(db: AsyncSession, transacao: schemas.TransacaoCreate) -> tuple[str, int]:
+    """ Regras que não dependem de saldo (só de leituras em cache). Retorna (moeda, valor em unidades menores). """
+    if transacao.carteira_origem_id == transacao.carteira_destino_id:
+        raise recusa("mesma_carteira")
+    moeda = await _moeda_das_carteiras(db, transacao)
+    unidades = _unidades(transacao, moeda)
+    if unidades is None:
+        raise recusa("valor_invalido")
+    return moeda, unidades
+
+
+async def _debitar(db: AsyncSession, transacao: schemas.TransacaoCreate, unidades: int):
+    """ Débito condicional; se a linha principal não bastar, recolhe as fatias da origem e tenta uma vez mais. """
+    carteira = (await db.execute(_debito(transacao, unidades))).first()
+    if carteira is None and await fatias.recolher(db, [transacao.carteira_origem_id]):
+        carteira = (await db.execute(_debito(transacao, unidades))).first()
+    return carteira
+
+
+def _fotografavel(carteira, antes: int) -> bool:
+    """ Carteiras quentes não têm foto: a linha principal não é o saldo inteiro. """
+    return not carteira.fatias and historico.deve_fotografar(antes, carteira.movimentos)
+
+
+async def _diagnosticar_recusa(db: AsyncSession, transacao: schemas.TransacaoCreate, unidades: int) -> None:
+    """
+    Descobre por que o UPDATE condicional não afetou nenhuma linha e levanta a recusa correspondente.
+    Só roda no caminho de erro; se nada estiver errado (o saldo mudou no meio tempo), retorna para nova tentativa.
+    """
+    statement = select(
+        models.Carteira.id, (models.Carteira.saldo_unidades + models.Carteira.saldo_em_fatias).label("saldo_unidades")
+    ).where(models.Carteira.id.in_([transacao.carteira_origem_id, transacao.carteira_destino_id]))
+    carteiras = {row.id: row for row in (await db.execute(statement)).all()}
+    await db.rollback()
+
+    origem = carteiras.get(transacao.carteira_origem_id)
+    destino = carteiras.get(transacao.carteira_destino_id)
+
+    if not origem or not destino:
+        raise recusa("carteira_nao_encontrada")
+    if origem.saldo_unidades < unidades:
+        raise recusa("saldo_insuficiente")
+
+
+async def _aplicar_transferencia(
+    db: AsyncSession, transacao: schemas.TransacaoCreate, unidades: int, moeda: str, destino: fatias.PerfilCredito
+):
+    """
+    Aplica débito, crédito e registro da transação dentro da transação corrente do banco.
+    As carteiras são travadas sempre na mesma ordem (menor id primeiro), então duas
+    transferências cruzadas (A->B e B->A) nunca esperam uma pela outra em ciclo.
+    Destino quente: o crédito soma em uma fatia sorteada e a linha do destino não é travada.
+    Retorna a transação e as chaves de cache afetadas (carteiras, seus donos e totais das listagens),
+    ou None se o débito ou o crédito não afetou nenhuma linha.
+    """
+    async def creditar():
+        return (await db.execute(_credito(transacao, unidades))).first()
+
+    async def debitar():
+        return await _debitar(db, transacao, unidades)
+
+    fatia = fatias.sortear(destino.fatias) if destino.fatias else None
+    if fatia is not None:
+        ordem = (debitar,)
+    elif transacao.carteira_origem_id < transacao.carteira_destino_id:
+        ordem = (debitar, creditar)
+    else:
+        ordem = (creditar, debitar)
+
+    chaves, carteiras = [], []
+    for passo in ordem:
+        carteira = await passo()
+        if carteira is None:
+            return None
+        carteiras.append(carteira)
+        chaves += [chave("carteira", carteira.id), chave("usuario", carteira.usuario_id)]
+    if fatia is not None:
+        statement = fatias.credito(db.bind.dialect.name, transacao.carteira_destino_id, fatia, unidades)
+        await db.execute(statement)
+        chaves += [chave("carteira", transacao.carteira_destino_id), chave("usuario", destino.usuario_id)]
+    chaves += chaves_contagem("transacoes", transacao.carteira_origem_id, transacao.carteira_destino_id)
+
+    statement = insert(models.Transacao).values(
+        valor_unidades=unidades,
+        moeda=moeda,
+        carteira_origem_id=transacao.carteira_origem_id,
+        carteira_destino_id=transacao.carteira_destino_id,
+    ).returning(models.Transacao)
+    db_transacao = (await db.scalars(statement)).one()
+    await resumos.acumular(db, [db_transacao], {transacao.carteira_destino_id: fatia} if fatia is not None else None)
+    await historico.registrar_fotos(db, [
+        historico.foto(carteira.id, carteira.saldo_unidades, db_transacao.id, db_transacao.timestamp)
+        for carteira in carteiras
+        if _fotografavel(carteira, carteira.movimentos - 1)
+    ])
+    return db_transacao, chaves
+
+
+async def com_retentativas(db: AsyncSession, operacao):
+    """
+    Executa `operacao` e faz o commit, repetindo em deadlocks e falhas de serialização
+    com backoff exponencial e jitter. Se `operacao` retornar None, a transação é
+    desfeita e tentada de novo (ex.: um UPDATE condicional perdeu a corrida).
+    """
+    max_tentativas = settings.TRANSFERENCIA_MAX_TENTATIVAS
+    for tentativa in range(1, max_tentativas + 1):
+        try:
+            resultado = await operacao()
+            if resultado is not None:
+                await db.commit()
+                return resultado
+            await db.rollback()
+        except TransferenciaRecusada:
+            await db.rollback()
+            raise
+        except DBAPIError as e:
+            await db.rollback()
+            if not erro_retentavel(e) or tentativa == max_tentativas:
+                raise
+        await asyncio.sleep(settings.TRANSFERENCIA_BACKOFF_SEGUNDOS * 2 ** (tentativa - 1) * random.random())
+
+    raise recusa("conflito_concorrencia")
+
+
+async def realizar_transferencia(
+    db: AsyncSession, transacao: schemas.TransacaoCreate, chave_idempotencia: Optional[str] = None
+) -> models.Transacao:
+    """
+    Transfere `valor` entre duas carteiras de forma atômica e segura sob concorrência.
+    Não há leitura-modificação-escrita: o saldo é validado pelo próprio UPDATE.
+    Com `chave_idempotencia`, a resposta é gravada no mesmo commit da transferência.
+    """
+    async def operacao():
+        aplicada = await _aplicar_transferencia(db, transacao, unidades, moeda, destino)
+        if aplicada is None:
+            await db.rollback()
+            await _diagnosticar_recusa(db, transacao, unidades)
+        elif chave_idempotencia is not None:
+            resposta = schemas.TransacaoRead.model_validate(aplicada[0]).model_dump(mode="json")
+            await idempotencia.registrar(db, chave_idempotencia, idempotencia.hash_requisicao(transacao), resposta)
+        return aplicada
+
+    try:
+        moeda, unidades = await validar_transferencia(db, transacao)
+        destino = await fatias.perfil(db, transacao.carteira_destino_id)
+        if destino is None:
+            raise recusa("carteira_nao_encontrada")
+        db_transacao, chaves = await com_retentativas(db, operacao)
+    except TransferenciaRecusada as e:
+        registrar_transferencia(e.motivo)
+        raise
+    cache.invalidar(*chaves)
+    registrar_transferencia()
+    return db_transacao
+
+
+async def _resposta_gravada(
+    db: AsyncSession, transacao: schemas.TransacaoCreate, chave: str
+) -> Optional[schemas.TransacaoRead]:
+    registro = await idempotencia.buscar(db, chave)
+    if registro is None:
+        return None
+    if registro.hash_requisicao != idempotencia.hash_requisicao(transacao):
+        registrar_transferencia("chave_idempotencia_reutilizada")
+        raise recusa("chave_idempotencia_reutilizada")
+    return schemas.TransacaoRead.model_validate(registro.resposta)
+
+
+async def realizar_transferencia_idempotente(
+    db: AsyncSession, transacao: schemas.TransacaoCreate, chave: str
+) -> tuple[schemas.TransacaoRead, bool]:
+    """
+    Transferência protegida por Idempotency-Key. Retorna (transação, repetida):
+    - Chave já usada com o mesmo corpo: devolve a resposta gravada, sem tocar em saldos.
+    - Chave já usada com outro corpo: recusa (422).
+    - Duas requisições simultâneas com a mesma chave: a segunda esbarra na chave primária,
+      sua transferência é desfeita e ela devolve a resposta gravada pela primeira.
+    Só transferências efetivadas são gravadas; uma recusa pode ser tentada de novo com a mesma chave.
+    """
+    gravada = await _resposta_gravada(db, transacao, chave)
+    if gravada is not None:
+        return gravada, True
+    try:
+        db_transacao = await realizar_transferencia(db, transacao, chave_idempotencia=chave)
+    except IntegrityError:
+        await db.rollback()
+        gravada = await _resposta_gravada(db, transacao, chave)
+        if gravada is None:
+            raise
+        return gravada, True
+    return schemas.TransacaoRead.model_validate(db_transacao), False
+
+
+def _validar_item(
+    transacao: schemas.TransacaoCreate, carteiras: dict, saldos: dict
+) -> tuple[Optional[str], Optional[int]]:
+    """
+    Valida um item do lote contra o snapshot das carteiras.
+    Retorna (motivo da recusa, None) ou (None, valor em unidades menores).
+    """
+    if transacao.carteira_origem_id == transacao.carteira_destino_id:
+        return "mesma_carteira", None
+    origem = carteiras.get(transacao.carteira_origem_id)
+    destino = carteiras.get(transacao.carteira_destino_id)
+    if not origem or not destino:
+        return "carteira_nao_encontrada", None
+    if origem.moeda != destino.moeda:
+        return "moeda_divergente", None
+    unidades = _unidades(transacao, origem.moeda)
+    if unidades is None:
+        return "valor_invalido", None
+    if saldos[origem.id] < unidades:
+        return "saldo_insuficiente", None
+    return None, unidades
+
+
+async def aplicar_lote(
+    db: AsyncSession, transacoes: list[schemas.TransacaoCreate], atomico: bool
+) -> Optional[tuple[list[ResultadoLote], set]]:
+    """
+    Aplica um lote de transferências na transação corrente do banco, sem commit.
+    - Uma única leitura (com trava, em ordem de id) de todas as carteiras referenciadas, cujas
+      fatias (carteiras quentes) são recolhidas antes: o lote trabalha só com as linhas principais.
+    - Validação item a item em memória, na ordem do lote, sobre os saldos simulados.
+    - Os deltas são compensados por carteira e aplicados com um único UPDATE ... CASE.
+    - As transações são inseridas em bloco com INSERT ... RETURNING.
+    Retorna os resultados e as chaves de cache afetadas, ou None se um saldo mudou desde a leitura.
+    """
+    ids = sorted({i for t in transacoes for i in (t.carteira_origem_id, t.carteira_destino_id)})
+    statement = (
+        select(models.Carteira.id, models.Carteira.moeda, models.Carteira.saldo_unidades, models.Carteira.usuario_id)
+        .where(models.Carteira.id.in_(ids))
+        .order_by(models.Carteira.id)
+        .with_for_update()
+    )
+    carteiras = {row.id: row for row in (await db.execute(statement)).all()}
+    recolhido = await fatias.recolher(db, carteiras)
+    # Saldos das linhas principais já com as fatias recolhidas
+    originais = {carteira_id: row.saldo_unidades + recolhido.get(carteira_id, 0) for carteira_id, row in carteiras.items()}
+    saldos = dict(originais)
+
+    resultados, aceitas = [], []
+    for indice, transacao in enumerate(transacoes):
+        motivo, unidades = _validar_item(transacao, carteiras, saldos)
+        resultado = ResultadoLote(indice=indice, recusa=recusa(motivo) if motivo else None)
+        resultados.append(resultado)
+        if motivo is None:
+            saldos[transacao.carteira_origem_id] -= unidades
+            saldos[transacao.carteira_destino_id] += unidades
+            aceitas.append((resultado, unidades))
+
+    recusados = [r for r in resultados if r.recusa is not None]
+    if atomico and recusados:
+        raise LoteRecusado(recusados)
+
+    deltas = {
+        carteira_id: saldo - originais[carteira_id]
+        for carteira_id, saldo in saldos.items()
+        if saldo != originais[carteira_id]
+    }
+    movimentos = Counter(
+        carteira_id
+        for r, _ in aceitas
+        for carteira_id in (transacoes[r.indice].carteira_origem_id, transacoes[r.indice].carteira_destino_id)
+        if carteira_id in deltas
+    )
+    atualizadas = []
+    if deltas:
+        delta = case(
+            {carteira_id: literal(valor, models.Carteira.saldo_unidades.type) for carteira_id, valor in deltas.items()},
+            value=models.Carteira.id,
+        )
+        statement = (
+            update(models.Carteira)
+            .where(models.Carteira.id.in_(deltas), models.Carteira.saldo_unidades + delta >= 0)
+            .values(
+                saldo_unidades=models.Carteira.saldo_unidades + delta,
+                versao=models.Carteira.versao + 1,
+                movimentos=models.Carteira.movimentos + case(movimentos, value=models.Carteira.id),
+            )
+            .returning(
+                models.Carteira.id, models.Carteira.saldo_unidades, models.Carteira.movimentos, models.Carteira.fatias
+            )
+            .execution_options(synchronize_session=False)
+        )
+        atualizadas = (await db.execute(statement)).all()
+        # Sem FOR UPDATE (ex.: SQLite) um saldo pode ter mudado desde a leitura: tenta de novo
+        if len(atualizadas) != len(deltas):
+            return None
+
+    if aceitas:
+        statement = insert(models.Transacao).returning(models.Transacao, sort_by_parameter_order=True)
+        parametros = [
+            {
+                "valor_unidades": unidades,
+                "moeda": carteiras[transacoes[r.indice].carteira_origem_id].moeda,
+                "carteira_origem_id": transacoes[r.indice].carteira_origem_id,
+                "carteira_destino_id": transacoes[r.indice].carteira_destino_id,
+            }
+            for r, unidades in aceitas
+        ]
+        db_transacoes = (await db.scalars(statement, parametros)).all()
+        await resumos.acumular(db, db_transacoes)
+        ultima = {}
+        for (resultado, _), db_transacao in zip(aceitas, db_transacoes):
+            resultado.transacao = db_transacao
+            ultima[db_transacao.carteira_origem_id] = ultima[db_transacao.carteira_destino_id] = db_transacao
+        await historico.registrar_fotos(db, [
+            historico.foto(carteira.id, carteira.saldo_unidades, ultima[carteira.id].id, ultima[carteira.id].timestamp)
+            for carteira in atualizadas
+            if _fotografavel(carteira, carteira.movimentos - movimentos[carteira.id])
+        ])
+
+    chaves = set()
+    for carteira_id in deltas.keys() | recolhido.keys():
+        chaves.update((chave("carteira", carteira_id), chave("usuario", carteiras[carteira_id].usuario_id)))
+    envolvidas = {
+        carteira_id
+        for r, _ in aceitas
+        for carteira_id in (transacoes[r.indice].carteira_origem_id, transacoes[r.indice].carteira_destino_id)
+    }
+    if envolvidas:
+        chaves.update(chaves_contagem("transacoes", *envolvidas))
+    return resultados, chaves
+
+
+async def realizar_transferencias_em_lote(
+    db: AsyncSession, transacoes: list[schemas.TransacaoCreate], atomico: bool = True
+) -> list[ResultadoLote]:
+    """
+    Aplica um lote de transferências em uma única transação do banco (ver `aplicar_lote`).
+    Com `atomico=True`, qualquer recusa cancela o lote inteiro (LoteRecusado);
+    caso contrário, os itens recusados são reportados e os demais efetivados.
+    """
+    try:
+        resultados, chaves = await com_retentativas(db, partial(aplicar_lote, db, transacoes, atomico))
+    except LoteRecusado as e:
+        # Itens válidos de um lote tudo-ou-nada recusado também não foram efetivados
+        for resultado in e.recusados:
+            registrar_transferencia(resultado.recusa.motivo)
+        raise
+    cache.invalidar(*chaves)
+    for resultado in resultados:
+        registrar_transferencia(resultado.recusa.motivo if resultado.recusa else None)
+    return resultados
@@ -0,0 +1,135 @@
+"""
+Benchmark do custo por item das listagens paginadas (GET /transacoes/).
+
+Compara, para páginas de 100 transações:
+- padrao: objetos ORM -> Page -> response_model do FastAPI -> JSONResponse (json da stdlib)
+- orjson: o mesmo fluxo, com ORJSONResponse como classe de resposta
+- rapido: linhas (SELECT das colunas do schema) -> itens_de_linhas -> Page -> TypeAdapter.dump_json
+  (o mesmo caminho de `paginar(..., schema_linhas)`)
+
+Uso: python benchmark_serializacao.py [--itens 20000] [--repeticoes 5]
+Imprime um JSON com microssegundos por item para a carga (banco -> Python) e a serialização
+(montagem da página + corpo JSON); o custo total por item é a soma das duas.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from functools import partial
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from fastapi_pagination import Page, Params  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app import models, schemas  # noqa: E402
+from app.api.serializacao import adaptador, colunas, itens_de_linhas  # noqa: E402
+from app.database.base import Base  # noqa: E402
+
+TAMANHO_PAGINA = 100
+TipoPagina = Page[schemas.TransacaoRead]
+
+
+async def _popular(engine, itens: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Usuario).values(nome="Benchmark", cpf="00000000000", email="b@example.com"))
+        await conn.execute(insert(models.Carteira), [{"usuario_id": 1, "saldo_unidades": 0, "moeda": "BRL"}] * 2)
+        await conn.execute(
+            insert(models.Transacao),
+            [
+                {
+                    "valor_unidades": i % 10000 + 100,
+                    "moeda": "BRL",
+                    "carteira_origem_id": 1 + i % 2,
+                    "carteira_destino_id": 2 - i % 2,
+                }
+                for i in range(itens)
+            ],
+        )
+
+
+def _paginas(itens: list, transformar=list) -> list[TipoPagina]:
+    return [
+        TipoPagina.create(transformar(itens[i:i + TAMANHO_PAGINA]), Params(page=1, size=TAMANHO_PAGINA), total=len(itens))
+        for i in range(0, len(itens), TAMANHO_PAGINA)
+    ]
+
+
+async def _medir(funcao, repeticoes: int, itens: int) -> float:
+    """ Melhor tempo entre as repetições, em microssegundos por item. """
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return round(melhor / itens * 1e6, 3)
+
+
+async def _carga(session_factory, query, escalares: bool, repeticoes: int, itens: int) -> tuple[float, list]:
+    melhor, resultado = float("inf"), []
+    for _ in range(repeticoes):
+        async with session_factory() as db:
+            inicio = time.perf_counter()
+            if escalares:
+                resultado = (await db.scalars(query)).all()
+            else:
+                resultado = (await db.execute(query)).all()
+            melhor = min(melhor, time.perf_counter() - inicio)
+    return round(melhor / itens * 1e6, 3), resultado
+
+
+async def main(itens: int, repeticoes: int) -> dict:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        await _popular(engine, itens)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+        carga_orm, objetos = await _carga(session_factory, select(models.Transacao), True, repeticoes, itens)
+        carga_linhas, linhas = await _carga(
+            session_factory, colunas(models.Transacao, schemas.TransacaoRead), False, repeticoes, itens
+        )
+    finally:
+        await engine.dispose()
+
+    campo = create_model_field(name="response", type_=TipoPagina, mode="serialization")
+
+    async def fluxo_fastapi(classe_resposta):
+        for pagina in _paginas(objetos):
+            conteudo = await serialize_response(field=campo, response_content=pagina)
+            classe_resposta(conteudo).body
+
+    async def rapido():
+        serializador = adaptador(TipoPagina)
+        for pagina in _paginas(linhas, partial(itens_de_linhas, schemas.TransacaoRead)):
+            serializador.dump_json(pagina)
+
+    serializacao = {
+        "padrao": await _medir(lambda: fluxo_fastapi(JSONResponse), repeticoes, itens),
+        "orjson": await _medir(lambda: fluxo_fastapi(ORJSONResponse), repeticoes, itens),
+        "rapido": await _medir(rapido, repeticoes, itens),
+    }
+    return {
+        "itens": itens,
+        "tamanho_pagina": TAMANHO_PAGINA,
+        "carga_us_por_item": {"orm": carga_orm, "linhas": carga_linhas},
+        "serializacao_us_por_item": serializacao,
+        "total_us_por_item": {
+            "padrao": round(carga_orm + serializacao["padrao"], 3),
+            "orjson": round(carga_orm + serializacao["orjson"], 3),
+            "rapido": round(carga_linhas + serializacao["rapido"], 3),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itens", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.itens, args.repeticoes)), indent=2))
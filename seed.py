@@ -1,143 +1,349 @@
-import requests
+"""
+Povoamento e gerador de carga da API.
+
+Cria usuários, carteiras e cartões em paralelo e, em seguida, dispara uma mistura de leituras e
+transferências com concorrência fixa. Parte das transferências vai para poucas carteiras
+"quentes", como acontece com as contas de lojistas. Ao final, imprime a vazão e as latências
+p50/p95/p99 de cada endpoint. Com `--json`, grava o mesmo relatório em JSON para comparar
+execuções entre commits.
+
+Uso (com a API rodando localmente):
+
+    python seed.py                                   # povoamento pequeno + carga padrão
+    python seed.py --usuarios 200 --operacoes 20000 --concorrencia 64 --json carga.json
+    python seed.py --quentes 2 --skew 0.7 --fatias 8 # contenção em 2 carteiras, em modo quente
+
+A mesma `--semente` gera os mesmos dados e o mesmo plano de operações.
+"""
+import argparse
+import asyncio
+import json
 import random
+import subprocess
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
 from faker import Faker
 from rich.console import Console
 from rich.progress import Progress
-from collections import defaultdict
+from rich.table import Table
 
-# --- CONFIGURAÇÃO ---
+# --- CONFIGURAÇÃO PADRÃO ---
 BASE_URL = "http://127.0.0.1:8000/api/v1"
-NUM_USUARIOS = 5
-MAX_CARTEIRAS_POR_USUARIO = 2
-MAX_CARTOES_POR_CARTEIRA = 2
-NUM_TRANSACOES = 10
+TAMANHO_PAGINA = 100
 
-# Inicializa o Faker para o Brasil e o Rich para output colorido
 fake = Faker('pt_BR')
-console = Console()
+# Progresso e tabelas na saída de erro: a saída padrão fica livre para `--json -`
+console = Console(stderr=True)
 
-# --- FUNÇÕES AUXILIARES --- (as funções clear_data, create_user, create_wallet, create_card continuam iguais)
 
-def clear_data(session):
-    """Limpa todos os dados existentes na API para um novo seed."""
-    console.print("[bold yellow]🗑️ Limpando dados existentes...[/bold yellow]")
+@dataclass
+class Medicoes:
+    """ Latências (segundos) e status HTTP por endpoint, rotulado pelo template da rota. """
+    latencias: dict = field(default_factory=lambda: defaultdict(list))
+    status: dict = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+    falhas: dict = field(default_factory=lambda: defaultdict(int))  # Erros de conexão/timeout
+
+
+def percentil(valores: list[float], p: float) -> float:
+    """ Percentil por posição mais próxima sobre os valores já ordenados. """
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[indice]
+
+
+async def requisitar(cliente: httpx.AsyncClient, medicoes: Medicoes, rotulo: str, metodo: str, url: str, **kwargs):
+    """ Faz a requisição medindo a latência sob `rotulo`; devolve a resposta ou None em erro de rede. """
+    inicio = time.perf_counter()
     try:
-        # A ordem é importante devido às Foreign Keys: cartões -> carteiras -> usuários
-        cartoes = session.get(f"{BASE_URL}/cartoes/").json().get("items", [])
-        for cartao in cartoes:
-            session.delete(f"{BASE_URL}/cartoes/{cartao['id']}")
-        
-        carteiras = session.get(f"{BASE_URL}/carteiras/").json().get("items", [])
-        for carteira in carteiras:
-            session.delete(f"{BASE_URL}/carteiras/{carteira['id']}")
-        
-        usuarios = session.get(f"{BASE_URL}/usuarios/").json().get("items", [])
-        for usuario in usuarios:
-            session.delete(f"{BASE_URL}/usuarios/{usuario['id']}")
-            
+        resposta = await cliente.request(metodo, url, **kwargs)
+    except httpx.HTTPError:
+        medicoes.falhas[rotulo] += 1
+        return None
+    medicoes.latencias[rotulo].append(time.perf_counter() - inicio)
+    medicoes.status[rotulo][resposta.status_code] += 1
+    return resposta
+
+
+async def em_paralelo(tarefas, concorrencia: int, progress: Progress, descricao: str) -> list:
+    """ Executa as corrotinas com no máximo `concorrencia` em andamento, na ordem dada. """
+    tarefas = list(tarefas)
+    task_id = progress.add_task(descricao, total=len(tarefas))
+    resultados = [None] * len(tarefas)
+    proxima = iter(range(len(tarefas)))
+
+    async def trabalhador():
+        for indice in proxima:
+            resultados[indice] = await tarefas[indice]
+            progress.advance(task_id)
+
+    await asyncio.gather(*(trabalhador() for _ in range(min(concorrencia, len(tarefas)) or 1)))
+    return resultados
+
+
+# --- LIMPEZA ---
+
+async def listar_ids(cliente: httpx.AsyncClient, recurso: str) -> list[int]:
+    """ Ids de todas as páginas do recurso (sem contagem: só `has_next`). """
+    ids, pagina = [], 1
+    while True:
+        resposta = await cliente.get(f"/{recurso}/", params={"page": pagina, "size": TAMANHO_PAGINA, "count": "none"})
+        corpo = resposta.json()
+        ids += [item["id"] for item in corpo.get("items", [])]
+        if not corpo.get("has_next"):
+            return ids
+        pagina += 1
+
+
+async def clear_data(cliente: httpx.AsyncClient, concorrencia: int, progress: Progress):
+    """
+    Remove cartões, carteiras e usuários existentes (todas as páginas), nessa ordem por causa das
+    chaves estrangeiras. Carteiras com transações não podem ser removidas e ficam no banco.
+    """
+    console.print("[bold yellow]🗑️ Limpando dados existentes...[/bold yellow]")
+    nao_removidos = 0
+    for recurso in ("cartoes", "carteiras", "usuarios"):
+        ids = await listar_ids(cliente, recurso)
+        respostas = await em_paralelo(
+            (cliente.delete(f"/{recurso}/{id}") for id in ids), concorrencia, progress, f"[yellow]Removendo {recurso}"
+        )
+        nao_removidos += sum(1 for r in respostas if r.status_code not in (204, 404))
+    if nao_removidos:
+        console.print(f"[yellow]⚠️ {nao_removidos} registros não puderam ser removidos (ex.: carteiras com transações).[/yellow]")
+    else:
         console.print("[green]✔️ Dados limpos com sucesso![/green]")
-    except Exception as e:
-        console.print(f"[bold red]❌ Erro ao limpar dados: {e}[/bold red]")
-
-def create_user(session, progress, task_id):
-    """Cria um usuário com dados do Faker."""
-    user_data = {"nome": fake.name(), "cpf": fake.cpf().replace('.', '').replace('-', ''), "email": fake.email()}
-    response = session.post(f"{BASE_URL}/usuarios/", json=user_data)
-    progress.advance(task_id)
-    if response.status_code == 201: return response.json()
-    return None
 
-def create_wallet(session, user_id, progress, task_id):
-    """Cria uma carteira com moeda e saldo aleatórios."""
-    moeda = random.choice(["BRL", "USD", "EUR"])
-    saldo = round(random.uniform(50.0, 5000.0), 2)
-    carteira_data = {"usuario_id": user_id, "moeda": moeda, "saldo_atual": str(saldo)}
-    response = session.post(f"{BASE_URL}/carteiras/", json=carteira_data)
-    progress.advance(task_id)
-    if response.status_code == 201: return response.json()
-    return None
 
-def create_card(session, carteira_id, progress, task_id):
-    """Cria um cartão com limite aleatório."""
-    limite = round(random.uniform(500.0, 10000.0), 2)
-    cartao_data = {"carteira_id": carteira_id, "numero": fake.credit_card_number(card_type="mastercard"), "validade": fake.credit_card_expire(), "limite": str(limite)}
-    response = session.post(f"{BASE_URL}/cartoes/", json=cartao_data)
-    progress.advance(task_id)
-    if response.status_code == 201: return response.json()
+# --- POVOAMENTO ---
+
+async def create_user(cliente, medicoes):
+    """ Cria um usuário com dados do Faker (CPF/email únicos: tenta de novo em conflito). """
+    for _ in range(5):
+        user_data = {"nome": fake.name(), "cpf": fake.cpf().replace('.', '').replace('-', ''), "email": fake.unique.email()}
+        resposta = await requisitar(cliente, medicoes, "POST /usuarios/", "POST", "/usuarios/", json=user_data)
+        if resposta is not None and resposta.status_code == 201:
+            return resposta.json()
+        if resposta is None or resposta.status_code != 409:
+            return None
     return None
 
-def create_transaction(session, origem, destino, progress, task_id): # <-- MUDANÇA: Recebe origem e destino
-    """Cria uma transação entre duas carteiras específicas."""
-    valor_max = float(origem["saldo_atual"]) * 0.5
-    if valor_max < 1.0:
-        console.print(f"[yellow]Skipping transaction: Saldo insuficiente na carteira de origem {origem['id']}[/yellow]")
-        progress.advance(task_id)
-        return
 
-    valor = round(random.uniform(1.0, valor_max), 2)
-    
-    transacao_data = {
-        "carteira_origem_id": origem["id"],
-        "carteira_destino_id": destino["id"],
-        "valor": str(valor)
+async def create_wallet(cliente, medicoes, usuario_id: int, moeda: str):
+    """ Cria uma carteira com saldo alto o bastante para a fase de carga. """
+    carteira_data = {"usuario_id": usuario_id, "moeda": moeda, "saldo_atual": f"{random.uniform(1000.0, 5000.0):.2f}"}
+    resposta = await requisitar(cliente, medicoes, "POST /carteiras/", "POST", "/carteiras/", json=carteira_data)
+    return resposta.json() if resposta is not None and resposta.status_code == 201 else None
+
+
+async def create_card(cliente, medicoes, carteira_id: int):
+    """ Cria um cartão com limite aleatório. """
+    cartao_data = {
+        "carteira_id": carteira_id,
+        "numero": fake.unique.credit_card_number(card_type="mastercard"),
+        "validade": fake.credit_card_expire(),
+        "limite": f"{random.uniform(500.0, 10000.0):.2f}",
     }
-    response = session.post(f"{BASE_URL}/transacoes/", json=transacao_data)
-    if response.status_code == 200:
-        console.print(f"  [green]✓[/green] Transação de {valor} {origem['moeda']} de C:{origem['id']} para C:{destino['id']} bem-sucedida.")
-    else:
-        console.print(f"  [red]✗[/red] Falha na transação de C:{origem['id']} para C:{destino['id']}: {response.text}")
-    
-    progress.advance(task_id)
+    resposta = await requisitar(cliente, medicoes, "POST /cartoes/", "POST", "/cartoes/", json=cartao_data)
+    return resposta.json() if resposta is not None and resposta.status_code == 201 else None
 
-def seed_data():
-    """Função principal que orquestra o povoamento do banco."""
+
+async def povoar(cliente, medicoes, args, progress) -> list[dict]:
+    usuarios = await em_paralelo(
+        (create_user(cliente, medicoes) for _ in range(args.usuarios)), args.concorrencia, progress, "[cyan]Usuários"
+    )
+    usuarios = [u for u in usuarios if u]
+    moedas = args.moedas.split(",")
+    carteiras = await em_paralelo(
+        (
+            create_wallet(cliente, medicoes, usuario["id"], random.choice(moedas))
+            for usuario in usuarios
+            for _ in range(args.carteiras_por_usuario)
+        ),
+        args.concorrencia, progress, "[cyan]Carteiras",
+    )
+    carteiras = [c for c in carteiras if c]
+    await em_paralelo(
+        (create_card(cliente, medicoes, carteira["id"]) for carteira in carteiras for _ in range(args.cartoes_por_carteira)),
+        args.concorrencia, progress, "[cyan]Cartões",
+    )
+    return carteiras
+
+
+# --- CARGA ---
+
+def planejar(carteiras: list[dict], args) -> tuple[list[tuple], dict]:
+    """
+    Sorteia as operações da fase de carga. Transferências são sempre entre carteiras da mesma moeda;
+    com probabilidade `skew`, o destino é uma das `quentes` carteiras quentes da moeda.
+    Retorna o plano e as carteiras quentes por moeda.
+    """
+    random.seed(args.semente)
+    por_moeda = defaultdict(list)
+    for carteira in carteiras:
+        por_moeda[carteira["moeda"]].append(carteira["id"])
+    por_moeda = {moeda: ids for moeda, ids in por_moeda.items() if len(ids) >= 2}
+    quentes = {moeda: ids[:args.quentes] for moeda, ids in por_moeda.items()}
+    if not por_moeda:
+        return [], quentes
+    todas = [id for ids in por_moeda.values() for id in ids]
+
+    leituras = [
+        ("GET /carteiras/{id}", lambda: ("GET", f"/carteiras/{random.choice(todas)}", {})),
+        ("GET /carteiras/", lambda: ("GET", "/carteiras/", {"params": {"size": 20}})),
+        ("GET /transacoes/?carteira_id", lambda: ("GET", "/transacoes/", {"params": {"carteira_id": random.choice(todas), "size": 20, "count": "none"}})),
+        ("GET /carteiras/{id}/saldo", lambda: ("GET", f"/carteiras/{random.choice(todas)}/saldo", {})),
+        ("GET /carteiras/{id}/resumo", lambda: ("GET", f"/carteiras/{random.choice(todas)}/resumo", {})),
+    ]
+    rota_transferencia = "/transacoes/async" if args.assincronas else "/transacoes/"
+
+    plano = []
+    for _ in range(args.operacoes):
+        if random.random() < args.proporcao_leitura:
+            rotulo, montar = random.choice(leituras)
+            plano.append((rotulo, *montar()))
+            continue
+        moeda = random.choice(list(por_moeda))
+        if quentes[moeda] and random.random() < args.skew:
+            destino = random.choice(quentes[moeda])
+        else:
+            destino = random.choice(por_moeda[moeda])
+        origem = random.choice([id for id in por_moeda[moeda] if id != destino])
+        corpo = {"carteira_origem_id": origem, "carteira_destino_id": destino, "valor": f"{random.uniform(1.0, 10.0):.2f}"}
+        plano.append((f"POST {rota_transferencia}", "POST", rota_transferencia, {"json": corpo}))
+    return plano, quentes
+
+
+async def carregar(cliente, medicoes, plano, args, progress) -> float:
+    """ Executa o plano com `concorrencia` requisições em andamento; retorna a duração em segundos. """
+    inicio = time.perf_counter()
+    await em_paralelo(
+        (requisitar(cliente, medicoes, rotulo, metodo, url, **kwargs) for rotulo, metodo, url, kwargs in plano),
+        args.concorrencia, progress, "[magenta]Carga",
+    )
+    return time.perf_counter() - inicio
+
+
+# --- RELATÓRIO ---
+
+def resumir(medicoes: Medicoes, duracao: float) -> dict:
+    endpoints = {}
+    for rotulo in sorted(medicoes.latencias.keys() | medicoes.falhas.keys()):
+        latencias = sorted(medicoes.latencias.get(rotulo, []))
+        endpoints[rotulo] = {
+            "requisicoes": len(latencias),
+            "por_segundo": round(len(latencias) / duracao, 2) if duracao else None,
+            "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+            "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+            "max_ms": round(latencias[-1] * 1000, 2) if latencias else 0.0,
+            "status": {str(codigo): total for codigo, total in sorted(medicoes.status.get(rotulo, {}).items())},
+            "falhas_de_rede": medicoes.falhas.get(rotulo, 0),
+        }
+    total = sum(e["requisicoes"] for e in endpoints.values())
+    return {
+        "duracao_s": round(duracao, 3),
+        "requisicoes": total,
+        "por_segundo": round(total / duracao, 2) if duracao else None,
+        "endpoints": endpoints,
+    }
+
+
+def imprimir(titulo: str, resumo: dict) -> None:
+    tabela = Table(title=f"{titulo}: {resumo['requisicoes']} requisições em {resumo['duracao_s']}s ({resumo['por_segundo']}/s)")
+    for coluna in ("endpoint", "req", "req/s", "p50 ms", "p95 ms", "p99 ms", "status"):
+        tabela.add_column(coluna, justify="left" if coluna in ("endpoint", "status") else "right")
+    for rotulo, e in resumo["endpoints"].items():
+        status = " ".join(f"{codigo}:{total}" for codigo, total in e["status"].items())
+        if e["falhas_de_rede"]:
+            status += f" rede:{e['falhas_de_rede']}"
+        tabela.add_row(rotulo, str(e["requisicoes"]), str(e["por_segundo"]), str(e["p50_ms"]), str(e["p95_ms"]), str(e["p99_ms"]), status)
+    console.print(tabela)
+
+
+def commit_atual() -> Optional[str]:
+    """ Commit do código medido, para comparar execuções (None fora de um repositório git). """
     try:
-        with requests.Session() as session:
-            clear_data(session)
-            
-            total_steps = NUM_USUARIOS + (NUM_USUARIOS * MAX_CARTEIRAS_POR_USUARIO) + \
-                          (NUM_USUARIOS * MAX_CARTEIRAS_POR_USUARIO * MAX_CARTOES_POR_CARTEIRA) + NUM_TRANSACOES
-            
-            with Progress() as progress:
-                task_id = progress.add_task("[cyan]Populando banco de dados...", total=total_steps)
-                
-                usuarios, carteiras = [], []
-                for _ in range(NUM_USUARIOS):
-                    user = create_user(session, progress, task_id)
-                    if user:
-                        usuarios.append(user)
-                        for _ in range(random.randint(1, MAX_CARTEIRAS_POR_USUARIO)):
-                            wallet = create_wallet(session, user["id"], progress, task_id)
-                            if wallet:
-                                carteiras.append(wallet)
-                                for _ in range(random.randint(1, MAX_CARTOES_POR_CARTEIRA)):
-                                    create_card(session, wallet["id"], progress, task_id)
-                
-                # --- LÓGICA DE TRANSAÇÃO APRIMORADA ---
-                console.print("\n[bold cyan]🏦 Criando transações...[/bold cyan]")
-                wallets_by_currency = defaultdict(list)
-                for wallet in carteiras:
-                    wallets_by_currency[wallet['moeda']].append(wallet)
-
-                for _ in range(NUM_TRANSACOES):
-                    # Escolhe uma moeda que tenha pelo menos 2 carteiras
-                    possible_currencies = [c for c, w in wallets_by_currency.items() if len(w) >= 2]
-                    if not possible_currencies:
-                        console.print("[yellow]Não há carteiras suficientes para realizar mais transações.[/yellow]")
-                        progress.update(task_id, advance=NUM_TRANSACOES - _) # Avança o restante
-                        break
-                    
-                    currency = random.choice(possible_currencies)
-                    origem, destino = random.sample(wallets_by_currency[currency], 2)
-                    create_transaction(session, origem, destino, progress, task_id)
-
-            console.print(f"\n[bold green]✔️ Povoamento concluído![/bold green]")
-            console.print(f"   - [b]{len(usuarios)}[/b] usuários criados.")
-            console.print(f"   - [b]{len(carteiras)}[/b] carteiras criadas.")
-
-    except requests.exceptions.ConnectionError:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def executar(args) -> dict:
+    random.seed(args.semente)
+    Faker.seed(args.semente)
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limites, timeout=args.timeout) as cliente:
+        with Progress(console=console) as progress:
+            if args.limpar:
+                await clear_data(cliente, args.concorrencia, progress)
+
+            medicoes_povoamento = Medicoes()
+            inicio = time.perf_counter()
+            carteiras = await povoar(cliente, medicoes_povoamento, args, progress)
+            povoamento = resumir(medicoes_povoamento, time.perf_counter() - inicio)
+
+            plano, quentes = planejar(carteiras, args)
+            if args.fatias:
+                for id in (id for ids in quentes.values() for id in ids):
+                    await cliente.put(f"/carteiras/{id}", json={"fatias": args.fatias})
+
+            medicoes_carga = Medicoes()
+            carga = resumir(medicoes_carga, await carregar(cliente, medicoes_carga, plano, args, progress))
+
+    return {
+        "commit": commit_atual(),
+        "executado_em": datetime.now(timezone.utc).isoformat(),
+        "parametros": {chave: valor for chave, valor in vars(args).items() if chave != "json"},
+        "carteiras": len(carteiras),
+        "carteiras_quentes": quentes,
+        "povoamento": povoamento,
+        "carga": carga,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--usuarios", type=int, default=5)
+    parser.add_argument("--carteiras-por-usuario", type=int, default=2)
+    parser.add_argument("--cartoes-por-carteira", type=int, default=2)
+    parser.add_argument("--moedas", default="BRL", help="moedas das carteiras, separadas por vírgula (ex.: BRL,USD)")
+    parser.add_argument("--operacoes", type=int, default=1000, help="requisições da fase de carga")
+    parser.add_argument("--proporcao-leitura", type=float, default=0.8, help="fração de leituras na carga (0 a 1)")
+    parser.add_argument("--quentes", type=int, default=1, help="carteiras quentes por moeda")
+    parser.add_argument("--skew", type=float, default=0.5, help="probabilidade de uma transferência ir para uma carteira quente")
+    parser.add_argument("--fatias", type=int, default=0, help="liga o modo quente (N fatias) nas carteiras quentes")
+    parser.add_argument("--assincronas", action="store_true", help="transferências por POST /transacoes/async")
+    parser.add_argument("--concorrencia", type=int, default=16, help="requisições simultâneas")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--limpar", action="store_true", help="remove os dados existentes antes de povoar")
+    parser.add_argument("--json", help="grava o relatório em JSON neste arquivo ('-' para a saída padrão)")
+    args = parser.parse_args()
+
+    try:
+        relatorio = asyncio.run(executar(args))
+    except httpx.ConnectError:
         console.print("\n[bold red]❌ ERRO: Não foi possível conectar à API.[/bold red]")
-        console.print("   Por favor, verifique se o servidor Uvicorn está rodando em http://127.0.0.1:8000")
+        console.print(f"   Por favor, verifique se o servidor Uvicorn está rodando em {args.base_url}")
+        raise SystemExit(1)
+
+    if args.json == "-":
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+        return
+    imprimir("Povoamento", relatorio["povoamento"])
+    imprimir("Carga", relatorio["carga"])
+    console.print(f"\n[bold green]✔️ {relatorio['carteiras']} carteiras; quentes: {relatorio['carteiras_quentes']}[/bold green]")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        console.print(f"Relatório gravado em {args.json}")
+
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    main()
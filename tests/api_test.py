@@ -49,4 +49,56 @@ def test_read_usuarios_paginated(client: TestClient):
     assert "items" in data
     assert "total" in data
     assert "page" in data
-    assert "size" in data
\ No newline at end of file
+    assert "size" in data
+
+def _criar_usuario(client: TestClient, sufixo: int) -> dict:
+    """ Cria um usuário auxiliar para os testes de carteiras e transações. """
+    response = client.post(
+        "/api/v1/usuarios/",
+        json={"nome": f"Usuario {sufixo}", "cpf": f"{sufixo:011d}", "email": f"usuario{sufixo}@example.com"},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+def test_create_carteira_com_cartao(client: TestClient):
+    """ Teste do fluxo usuário -> carteira -> cartão, com os relacionamentos aninhados na leitura """
+    usuario = _criar_usuario(client, 1)
+    carteira = client.post(
+        "/api/v1/carteiras/",
+        json={"usuario_id": usuario["id"], "moeda": "BRL", "saldo_atual": "100.00"},
+    ).json()
+    response = client.post(
+        "/api/v1/cartoes/",
+        json={"carteira_id": carteira["id"], "numero": "5555444433332222", "validade": "12/30", "limite": "500.00"},
+    )
+    assert response.status_code == 201
+
+    data = client.get(f"/api/v1/carteiras/{carteira['id']}").json()
+    assert [c["numero"] for c in data["cartoes"]] == ["5555444433332222"]
+
+    data = client.get(f"/api/v1/usuarios/{usuario['id']}").json()
+    assert [c["id"] for c in data["carteiras"]] == [carteira["id"]]
+
+def test_realizar_transacao(client: TestClient):
+    """ Teste de transferência entre carteiras: débito, crédito e saldo insuficiente """
+    usuario = _criar_usuario(client, 2)
+    origem = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.00"}).json()
+    destino = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "0.00"}).json()
+
+    response = client.post(
+        "/api/v1/transacoes/",
+        json={"carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"], "valor": "40.00"},
+    )
+    assert response.status_code == 200
+    assert float(client.get(f"/api/v1/carteiras/{origem['id']}").json()["saldo_atual"]) == 60.0
+    assert float(client.get(f"/api/v1/carteiras/{destino['id']}").json()["saldo_atual"]) == 40.0
+
+    response = client.post(
+        "/api/v1/transacoes/",
+        json={"carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"], "valor": "1000.00"},
+    )
+    assert response.status_code == 400
+    assert "Saldo insuficiente" in response.json()["detail"]
+
+    data = client.get("/api/v1/transacoes/", params={"carteira_id": origem["id"]}).json()
+    assert data["total"] == 1
@@ -1,38 +1,51 @@
 import sys
 import os
+import asyncio
+import tempfile
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.main import app
 from app.database.base import Base
-from app.api.dependencies import get_db
+from app.api.dependencies import get_db, get_sessionmaker
+from app.core.cache import cache
+from app.core.instrumentacao import instrumentar_engine
 
-# Usa um banco de dados SQLite em memória para os testes
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Usa um banco de dados SQLite (via aiosqlite) em arquivo temporário para os testes.
+# NullPool abre uma conexão nova por sessão: nenhuma conexão é compartilhada entre
+# o event loop do TestClient e o loop usado para criar/dropar as tabelas.
+TEST_DB_PATH = os.path.join(tempfile.gettempdir(), "fintracker_test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DB_PATH}"
 
-engine = create_engine(
+engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    poolclass=NullPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrumentar_engine(engine)
+TestingSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
-def override_get_db():
+async def override_get_db():
     """Sobrescreve a dependência get_db para usar o banco de dados de teste."""
-    db = TestingSessionLocal()
-    try:
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Aplica a sobrescrita da dependência na aplicação
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_sessionmaker] = lambda: TestingSessionLocal
+
+async def _create_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def _drop_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
 
 @pytest.fixture(scope="function")
 def client():
@@ -43,7 +56,9 @@ def client():
     - Limpa (dropa) todas as tabelas depois de cada teste.
     Isso garante 100% de isolamento entre os testes.
     """
-    Base.metadata.create_all(bind=engine)
+    # Os ids se repetem entre testes: nenhuma leitura em cache pode sobreviver ao banco
+    cache.limpar()
+    asyncio.run(_create_tables())
     with TestClient(app) as c:
         yield c
-    Base.metadata.drop_all(bind=engine)
\ No newline at end of file
+    asyncio.run(_drop_tables())
@@ -0,0 +1,98 @@
+import asyncio
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import models
+from app.core.cache import cache, chave
+from app.services import autorizacoes
+from app.services.autorizacoes import AutorizacaoRecusada
+from tests.conftest import TestingSessionLocal
+
+
+def _cartao(client: TestClient, limite: str) -> dict:
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Compradora", "cpf": "14714714714", "email": "compras@example.com"}
+    ).json()
+    carteira = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "0.00"}).json()
+    return client.post(
+        "/api/v1/cartoes/",
+        json={"carteira_id": carteira["id"], "numero": "4111111111111111", "validade": "12/30", "limite": limite},
+    ).json()
+
+def test_autorizacao_captura_e_liberacao(client: TestClient):
+    """ Reservas consomem o limite; a captura parcial devolve o restante e a liberação, tudo """
+    cartao = _cartao(client, "100.00")
+    base = f"/api/v1/cartoes/{cartao['id']}/autorizacoes"
+
+    primeira = client.post(base, json={"valor": "60.00"})
+    assert primeira.status_code == 201
+    assert primeira.json()["estado"] == "reservada"
+    assert client.get(primeira.headers["Location"]).json()["id"] == primeira.json()["id"]
+
+    recusada = client.post(base, json={"valor": "50.00"})
+    assert recusada.status_code == 402
+
+    capturada = client.post(f"{base}/{primeira.json()['id']}/captura", json={"valor": "40.00"})
+    assert capturada.status_code == 200
+    assert capturada.json()["estado"] == "capturada"
+    assert Decimal(capturada.json()["capturado"]) == Decimal("40.00")
+    assert client.post(f"{base}/{primeira.json()['id']}/liberacao").status_code == 409
+
+    # Disponível: 100 - 40 utilizados
+    segunda = client.post(base, json={"valor": "60.00"})
+    assert segunda.status_code == 201
+    assert client.post(base, json={"valor": "0.01"}).status_code == 402
+    liberada = client.post(f"{base}/{segunda.json()['id']}/liberacao")
+    assert liberada.json()["estado"] == "liberada"
+    assert client.post(f"{base}/{segunda.json()['id']}/captura").status_code == 409
+
+    assert client.post(base, json={"valor": "60.00"}).status_code == 201
+    assert client.post(base, json={"valor": "1.001"}).status_code == 400
+    assert client.post("/api/v1/cartoes/999/autorizacoes", json={"valor": "1.00"}).status_code == 404
+
+
+async def _autorizar_em_paralelo(cartao_id: int, quantidade: int, valor: Decimal) -> int:
+    """ `quantidade` autorizações simultâneas, cada uma na sua sessão (e conexão). Retorna as aprovadas. """
+    async def uma():
+        async with TestingSessionLocal() as db:
+            try:
+                await autorizacoes.autorizar(db, cartao_id, valor)
+                return True
+            except AutorizacaoRecusada:
+                return False
+
+    return sum(await asyncio.gather(*(uma() for _ in range(quantidade))))
+
+async def _uso(cartao_id: int):
+    async with TestingSessionLocal() as db:
+        uso = await db.get(models.UsoCartao, cartao_id)
+        reservas = await db.scalar(
+            select(func.sum(models.Autorizacao.valor_unidades)).where(models.Autorizacao.cartao_id == cartao_id)
+        )
+        return uso.reservado_unidades, reservas
+
+def test_autorizacoes_simultaneas_nunca_excedem_o_limite(client: TestClient):
+    cartao = _cartao(client, "100.00")
+    # Cria a linha de uso (e a moeda em cache) antes da disputa
+    assert client.post(f"/api/v1/cartoes/{cartao['id']}/autorizacoes", json={"valor": "10.00"}).status_code == 201
+
+    aprovadas = asyncio.run(_autorizar_em_paralelo(cartao["id"], 40, Decimal("10.00")))
+
+    assert aprovadas == 9
+    assert asyncio.run(_uso(cartao["id"])) == (10000, 10000)
+
+def test_cartao_removido_com_a_carteira_nao_autoriza(client: TestClient):
+    """ A moeda do cartão sai do cache com a carteira (cascade): a autorização seguinte é 404, não recusa de limite """
+    cartao = _cartao(client, "100.00")
+    base = f"/api/v1/cartoes/{cartao['id']}/autorizacoes"
+    assert client.post(base, json={"valor": "10.00"}).status_code == 201
+
+    assert cache.backend.obter(chave("moeda_cartao", cartao["id"])) is not None
+    assert client.delete(f"/api/v1/carteiras/{cartao['carteira_id']}").status_code == 204
+    assert cache.backend.obter(chave("moeda_cartao", cartao["id"])) is None
+
+    resposta = client.post(base, json={"valor": "10.00"})
+    assert resposta.status_code == 404
+    assert resposta.json()["detail"] == "Cartão não encontrado"
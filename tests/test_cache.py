@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.cache import MemoriaLRU
+
+
+def _valor(resultado: str) -> float:
+    return REGISTRY.get_sample_value("cache_operacoes_total", {"resultado": resultado}) or 0.0
+
+def _criar_carteira(client: TestClient, saldo: str = "100.00") -> dict:
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Cache", "cpf": "12312312312", "email": "cache@example.com"}
+    ).json()
+    return client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": saldo}).json()
+
+def test_cache_hit_e_miss(client: TestClient):
+    """ A segunda leitura do mesmo id vem do cache; ids inexistentes não são guardados """
+    carteira = _criar_carteira(client)
+    hits, misses = _valor("hit"), _valor("miss")
+
+    assert client.get(f"/api/v1/carteiras/{carteira['id']}").json() == carteira
+    assert client.get(f"/api/v1/carteiras/{carteira['id']}").json() == carteira
+    assert client.get("/api/v1/carteiras/999").status_code == 404
+    assert client.get("/api/v1/carteiras/999").status_code == 404
+
+    assert _valor("hit") == hits + 1
+    assert _valor("miss") == misses + 3
+
+def test_cache_invalidado_por_escritas(client: TestClient):
+    """ PUT, criação de filhos e transferências invalidam as leituras em cache afetadas """
+    origem = _criar_carteira(client)
+    usuario_id = origem["usuario_id"]
+    destino = client.post("/api/v1/carteiras/", json={"usuario_id": usuario_id, "saldo_atual": "0.00"}).json()
+    client.get(f"/api/v1/carteiras/{origem['id']}")
+    client.get(f"/api/v1/usuarios/{usuario_id}")
+
+    client.put(f"/api/v1/carteiras/{origem['id']}", json={"saldo_atual": "80.00"})
+    assert client.get(f"/api/v1/carteiras/{origem['id']}").json()["saldo_atual"] == "80.00"
+
+    cartao = client.post(
+        "/api/v1/cartoes/", json={"carteira_id": origem["id"], "numero": "4111111111111111", "validade": "12/30", "limite": "500.00"}
+    ).json()
+    assert [c["id"] for c in client.get(f"/api/v1/carteiras/{origem['id']}").json()["cartoes"]] == [cartao["id"]]
+
+    response = client.post(
+        "/api/v1/transacoes/",
+        json={"valor": "30.00", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]},
+    )
+    assert response.status_code == 200
+    saldos = {c["id"]: c["saldo_atual"] for c in client.get(f"/api/v1/usuarios/{usuario_id}").json()["carteiras"]}
+    assert {id: float(saldo) for id, saldo in saldos.items()} == {origem["id"]: 50.0, destino["id"]: 30.0}
+    assert client.get(f"/api/v1/carteiras/{destino['id']}").json()["saldo_atual"] == "30.00"
+
+    client.delete(f"/api/v1/cartoes/{cartao['id']}")
+    assert client.get(f"/api/v1/cartoes/{cartao['id']}").status_code == 404
+    assert client.get(f"/api/v1/carteiras/{origem['id']}").json()["cartoes"] == []
+
+def test_memoria_lru_descarta_o_menos_usado():
+    """ Acima de max_itens, o item acessado há mais tempo é descartado e contado como eviction """
+    backend = MemoriaLRU(max_itens=2)
+    evictions = _valor("eviction")
+    backend.guardar("a", 1, ttl=60)
+    backend.guardar("b", 2, ttl=60)
+    backend.obter("a")
+    backend.guardar("c", 3, ttl=60)
+
+    assert backend.obter("b") is None
+    assert backend.obter("a") == 1 and backend.obter("c") == 3
+    assert _valor("eviction") == evictions + 1
+
+    backend.guardar("d", 4, ttl=0)
+    assert backend.obter("d") is None
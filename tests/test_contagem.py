@@ -0,0 +1,64 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app import models, schemas
+from app.api.serializacao import colunas
+from app.api.v1.endpoints.transacao import _ids_da_carteira
+
+
+def _usuario_com_carteiras(client: TestClient, quantidade: int) -> tuple[dict, list[dict]]:
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Contagem", "cpf": "45645645645", "email": "contagem@example.com"}
+    ).json()
+    carteiras = [
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "10.00"}).json()
+        for _ in range(quantidade)
+    ]
+    return usuario, carteiras
+
+def test_estrategias_de_contagem(client: TestClient):
+    """ exact traz o total; none só has_next; estimated sem estatísticas do planner (SQLite) cai no COUNT """
+    _usuario_com_carteiras(client, 3)
+
+    exata = client.get("/api/v1/carteiras/", params={"size": 2}).json()
+    assert (exata["total"], exata["pages"], exata["total_exact"], exata["has_next"]) == (3, 2, True, True)
+
+    sem_total = client.get("/api/v1/carteiras/", params={"size": 2, "count": "none"}).json()
+    assert (sem_total["total"], sem_total["pages"], sem_total["total_exact"], sem_total["has_next"]) == (None, None, False, True)
+    assert len(sem_total["items"]) == 2
+
+    estimada = client.get("/api/v1/carteiras/", params={"size": 2, "count": "estimated"}).json()
+    assert (estimada["total"], estimada["total_exact"]) == (3, True)
+
+    # Última página: total conhecido sem COUNT, qualquer que seja a estratégia
+    ultima = client.get("/api/v1/carteiras/", params={"size": 2, "page": 2, "count": "none"}).json()
+    assert (ultima["total"], ultima["total_exact"], ultima["has_next"]) == (3, True, False)
+
+    assert client.get("/api/v1/carteiras/", params={"count": "aproximado"}).status_code == 422
+
+def test_contagem_em_cache_invalidada_por_insercoes_e_remocoes(client: TestClient):
+    """ O total em cache por filtro acompanha criações, transferências e remoções """
+    usuario, (origem, destino) = _usuario_com_carteiras(client, 2)
+
+    def total(url, **params):
+        return client.get(url, params={"size": 1, **params}).json()["total"]
+
+    assert total("/api/v1/carteiras/", usuario_id=usuario["id"]) == 2
+    extra = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "0"}).json()
+    assert total("/api/v1/carteiras/", usuario_id=usuario["id"]) == 3
+    client.delete(f"/api/v1/carteiras/{extra['id']}")
+    assert total("/api/v1/carteiras/", usuario_id=usuario["id"]) == 2
+
+    transferencia = {"valor": "1.00", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]}
+    for _ in range(2):
+        client.post("/api/v1/transacoes/", json=transferencia)
+    assert total("/api/v1/transacoes/", carteira_id=destino["id"]) == 2
+    client.post("/api/v1/transacoes/batch", json=[transferencia])
+    assert total("/api/v1/transacoes/", carteira_id=destino["id"]) == 3
+    assert total("/api/v1/transacoes/") == 3
+
+def test_consulta_da_estimativa_compila_para_o_postgresql():
+    """ O EXPLAIN da estimativa recebe a consulta com os parâmetros embutidos """
+    query = colunas(models.Transacao, schemas.TransacaoRead).where(models.Transacao.id.in_(_ids_da_carteira(7)))
+    sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "carteira_origem_id = 7" in sql and "carteira_destino_id = 7" in sql
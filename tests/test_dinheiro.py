@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import dinheiro
+
+
+def test_conversao_por_expoente_da_moeda():
+    """ Cada moeda usa o seu número de casas; nada é arredondado silenciosamente """
+    assert dinheiro.para_unidades(Decimal("100.5"), "BRL") == 10050
+    assert dinheiro.para_unidades(Decimal("1500"), "JPY") == 1500
+    assert dinheiro.para_unidades(Decimal("1.234"), "KWD") == 1234
+    assert str(dinheiro.para_decimal(10050, "BRL")) == "100.50"
+    assert str(dinheiro.para_decimal(0, "BRL")) == "0.00"
+    assert str(dinheiro.para_decimal(1500, "JPY")) == "1500"
+
+    for valor, moeda in [("0.001", "BRL"), ("10.5", "JPY"), ("1e20", "BRL")]:
+        with pytest.raises(ValueError):
+            dinheiro.para_unidades(Decimal(valor), moeda)
+
+def test_api_mantem_o_formato_decimal(client: TestClient):
+    """ A API continua em decimais; saldos acima do antigo teto de Numeric(10, 2) são aceitos """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Lojista", "cpf": "78978978978", "email": "lojista@example.com"}
+    ).json()
+    grande, pequena = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": saldo}).json()
+        for saldo in ("150000000.10", "0")
+    )
+    assert grande["saldo_atual"] == "150000000.10"
+    assert pequena["saldo_atual"] == "0.00"
+
+    response = client.post(
+        "/api/v1/transacoes/",
+        json={"valor": "99999999.99", "carteira_origem_id": grande["id"], "carteira_destino_id": pequena["id"]},
+    )
+    assert response.status_code == 200
+    assert response.json()["valor"] == "99999999.99"
+    assert client.get(f"/api/v1/carteiras/{grande['id']}").json()["saldo_atual"] == "50000000.11"
+    assert client.get("/api/v1/transacoes/").json()["items"][0]["valor"] == "99999999.99"
+
+    # Mais casas decimais do que a moeda permite: recusado em vez de arredondado
+    response = client.post(
+        "/api/v1/transacoes/",
+        json={"valor": "0.001", "carteira_origem_id": grande["id"], "carteira_destino_id": pequena["id"]},
+    )
+    assert response.status_code == 400
+    assert client.put(f"/api/v1/carteiras/{grande['id']}", json={"saldo_atual": "1.999"}).status_code == 422
+
+    iene = client.post(
+        "/api/v1/carteiras/", json={"usuario_id": usuario["id"], "moeda": "JPY", "saldo_atual": "5000"}
+    ).json()
+    assert iene["saldo_atual"] == "5000"
+    cartao = client.post(
+        "/api/v1/cartoes/",
+        json={"carteira_id": iene["id"], "numero": "3530111333300000", "validade": "02/30", "limite": "300000"},
+    )
+    assert cartao.json()["limite"] == "300000"
+    assert client.post(
+        "/api/v1/carteiras/", json={"usuario_id": usuario["id"], "moeda": "JPY", "saldo_atual": "10.5"}
+    ).status_code == 422
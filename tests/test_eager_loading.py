@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from tests.conftest import engine
+
+
+@contextmanager
+def contar_statements():
+    """ Conta quantos statements SQL foram enviados ao banco dentro do bloco. """
+    statements = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", registrar)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", registrar)
+
+def _popular(client: TestClient, num_usuarios: int):
+    """ Cria usuários, cada um com duas carteiras, e cada carteira com um cartão. """
+    for i in range(num_usuarios):
+        usuario = client.post(
+            "/api/v1/usuarios/",
+            json={"nome": f"Usuario {i}", "cpf": f"{i:011d}", "email": f"eager{i}@example.com"},
+        ).json()
+        for j in range(2):
+            carteira = client.post(
+                "/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "10.00"}
+            ).json()
+            client.post(
+                "/api/v1/cartoes/",
+                json={"carteira_id": carteira["id"], "numero": f"{i:08d}{j:08d}", "validade": "01/30", "limite": "1.00"},
+            )
+
+def test_listagens_com_numero_constante_de_consultas(client: TestClient):
+    """ O número de consultas por listagem não pode crescer com o tamanho da página (sem N+1) """
+    _popular(client, 6)
+
+    for url in ("/api/v1/usuarios/", "/api/v1/carteiras/"):
+        contagens = []
+        for size in (1, 3, 12):
+            with contar_statements() as statements:
+                # Sem total: o COUNT (e o seu cache) não entram na conta
+                response = client.get(url, params={"size": size, "count": "none"})
+            assert response.status_code == 200
+            assert len(response.json()["items"]) == min(size, 6 if "usuarios" in url else 12)
+            contagens.append(len(statements))
+        assert len(set(contagens)) == 1, (url, contagens)
+
+def test_delete_usuario_carrega_cascade_em_lote(client: TestClient):
+    """ Remover um usuário não pode disparar uma consulta de cartões por carteira """
+    _popular(client, 1)
+    with contar_statements() as statements:
+        response = client.delete("/api/v1/usuarios/1")
+    assert response.status_code == 204
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 3
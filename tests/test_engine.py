@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool, StaticPool
+
+from app.core.config import settings
+from app.database.session import criar_engine, opcoes_do_engine
+
+URL_ASYNCPG = "postgresql+asyncpg://u:p@localhost/db"
+
+
+def test_pool_proprio_e_statement_timeout_da_sessao(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", False)
+    opcoes = opcoes_do_engine(URL_ASYNCPG, 5000)
+    assert opcoes["pool_size"] == settings.DB_POOL_TAMANHO
+    assert opcoes["pool_pre_ping"] == settings.DB_POOL_PRE_PING
+    assert opcoes["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+
+
+def test_pgbouncer_sem_pool_nem_prepared_statements_nomeados(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    opcoes = opcoes_do_engine(URL_ASYNCPG, 5000)
+    assert opcoes["poolclass"] is NullPool
+    connect_args = opcoes["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert connect_args["prepared_statement_name_func"]() != connect_args["prepared_statement_name_func"]()
+    # PgBouncer recusa parâmetros de sessão na conexão: o limite fica do lado do driver
+    assert "server_settings" not in connect_args
+    assert connect_args["command_timeout"] == 5.0
+
+
+def test_sqlite_sem_argumentos_de_conexao(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", False)
+    assert "connect_args" not in opcoes_do_engine("sqlite+aiosqlite:///teste.db", 5000)
+
+
+def test_engine_sqlite_em_memoria_e_em_arquivo(monkeypatch, tmp_path):
+    """ O StaticPool do SQLite em memória não aceita as opções de tamanho do pool """
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", False)
+    em_memoria = criar_engine("sqlite+aiosqlite:///:memory:")
+    assert isinstance(em_memoria.pool, StaticPool)
+    em_arquivo = criar_engine(f"sqlite+aiosqlite:///{tmp_path / 'teste.db'}")
+    assert em_arquivo.pool.size() == settings.DB_POOL_TAMANHO
+
+    async def consultar():
+        for engine in (em_memoria, em_arquivo):
+            async with engine.connect() as conn:
+                assert await conn.scalar(text("SELECT 1")) == 1
+            await engine.dispose()
+
+    asyncio.run(consultar())
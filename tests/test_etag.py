@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+
+
+def _criar_carteiras(client: TestClient) -> tuple[dict, dict]:
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Etag", "cpf": "98798798798", "email": "etag@example.com"}
+    ).json()
+    origem, destino = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.00"}).json()
+        for _ in range(2)
+    )
+    return origem, destino
+
+def test_if_none_match_responde_304_ate_a_proxima_escrita(client: TestClient):
+    """ O ETag se mantém entre leituras, gera 304 e muda quando uma transferência altera o saldo """
+    origem, destino = _criar_carteiras(client)
+    url_carteira = f"/api/v1/carteiras/{origem['id']}"
+    url_usuario = f"/api/v1/usuarios/{origem['usuario_id']}"
+
+    etag = client.get(url_carteira).headers["etag"]
+    etag_usuario = client.get(url_usuario).headers["etag"]
+    assert etag.startswith('"') and etag == client.get(url_carteira).headers["etag"]
+
+    response = client.get(url_carteira, headers={"If-None-Match": f'"outro", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(url_usuario, headers={"If-None-Match": etag_usuario}).status_code == 304
+
+    client.post(
+        "/api/v1/transacoes/",
+        json={"valor": "10.00", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]},
+    )
+    response = client.get(url_carteira, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["saldo_atual"] == "90.00"
+    assert response.headers["etag"] != etag
+    # A carteira embutida mudou, então a representação do usuário também
+    assert client.get(url_usuario, headers={"If-None-Match": etag_usuario}).status_code == 200
+
+def test_if_match_recusa_atualizacao_com_versao_antiga(client: TestClient):
+    """ Um PUT com If-Match desatualizado recebe 412 em vez de sobrescrever; com o ETag atual, passa """
+    origem, _ = _criar_carteiras(client)
+    url = f"/api/v1/carteiras/{origem['id']}"
+    etag = client.get(url).headers["etag"]
+
+    response = client.put(url, json={"saldo_atual": "50.00"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    novo_etag = response.headers["etag"]
+    assert novo_etag != etag and client.get(url).headers["etag"] == novo_etag
+
+    response = client.put(url, json={"saldo_atual": "0.00"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(url).json()["saldo_atual"] == "50.00"
+
+    url_usuario = f"/api/v1/usuarios/{origem['usuario_id']}"
+    response = client.put(url_usuario, json={"nome": "Outro"}, headers={"If-Match": '"desatualizado"'})
+    assert response.status_code == 412
+    assert client.put(url_usuario, json={"nome": "Outro"}, headers={"If-Match": "*"}).status_code == 200
@@ -0,0 +1,61 @@
+import asyncio
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import models
+from app.services import fatias
+from tests.conftest import TestingSessionLocal
+
+
+async def _saldo_nas_fatias(carteira_id: int) -> int:
+    async with TestingSessionLocal() as db:
+        statement = select(func.coalesce(func.sum(models.SaldoFatia.saldo_unidades), 0)).where(
+            models.SaldoFatia.carteira_id == carteira_id
+        )
+        return await db.scalar(statement)
+
+def test_carteira_quente_credita_em_fatias(client: TestClient):
+    """ Créditos vão para as fatias sem perder o saldo único da carteira; débitos e o recolhimento as devolvem à linha principal """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Quente", "cpf": "36936936936", "email": "quente@example.com"}
+    ).json()
+    pagadora = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.00"}).json()
+    quente = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "1.00"}).json()
+
+    assert client.put(f"/api/v1/carteiras/{quente['id']}", json={"fatias": 999}).status_code == 422
+    resposta = client.put(f"/api/v1/carteiras/{quente['id']}", json={"fatias": 4})
+    assert resposta.status_code == 200 and resposta.json()["fatias"] == 4
+
+    etag = client.get(f"/api/v1/carteiras/{quente['id']}").headers["ETag"]
+    for _ in range(5):
+        transferencia = {"valor": "2.00", "carteira_origem_id": pagadora["id"], "carteira_destino_id": quente["id"]}
+        assert client.post("/api/v1/transacoes/", json=transferencia).status_code == 200
+    assert asyncio.run(_saldo_nas_fatias(quente["id"])) == 1000
+
+    # Leitura com o saldo inteiro e ETag novo, embora a versão da linha não mude com os créditos
+    lida = client.get(f"/api/v1/carteiras/{quente['id']}")
+    assert Decimal(lida.json()["saldo_atual"]) == Decimal("11.00")
+    assert lida.headers["ETag"] != etag
+    resumo = client.get(f"/api/v1/carteiras/{quente['id']}/resumo").json()["periodos"]
+    assert (Decimal(resumo[0]["entradas"]), resumo[0]["quantidade"]) == (Decimal("10.00"), 5)
+
+    # A linha principal tem 1.00: o débito recolhe as fatias antes de recusar
+    transferencia = {"valor": "6.00", "carteira_origem_id": quente["id"], "carteira_destino_id": pagadora["id"]}
+    assert client.post("/api/v1/transacoes/", json=transferencia).status_code == 200
+    assert asyncio.run(_saldo_nas_fatias(quente["id"])) == 0
+    transferencia["valor"] = "5.01"
+    assert client.post("/api/v1/transacoes/", json=transferencia).json()["detail"] == "Saldo insuficiente na carteira de origem."
+
+    # O recolhimento periódico deixa o saldo total igual
+    client.post("/api/v1/transacoes/", json={"valor": "3.00", "carteira_origem_id": pagadora["id"], "carteira_destino_id": quente["id"]})
+    assert asyncio.run(fatias.recolher_pendentes(TestingSessionLocal)) == 1
+    assert asyncio.run(_saldo_nas_fatias(quente["id"])) == 0
+    assert Decimal(client.get(f"/api/v1/carteiras/{quente['id']}").json()["saldo_atual"]) == Decimal("8.00")
+    assert Decimal(client.get(f"/api/v1/carteiras/{pagadora['id']}").json()["saldo_atual"]) == Decimal("93.00")
+
+    # Saldo passado continua exato a partir da foto gravada na mudança de modo
+    assert Decimal(client.get(f"/api/v1/carteiras/{quente['id']}/saldo").json()["saldo"]) == Decimal("8.00")
+
+    assert client.put(f"/api/v1/carteiras/{quente['id']}", json={"fatias": 0}).json()["fatias"] == 0
@@ -0,0 +1,46 @@
+import time
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+
+def _aguardar(client: TestClient, url: str) -> dict:
+    """ Consulta a situação até o worker da fila processar a transferência. """
+    for _ in range(100):
+        situacao = client.get(url).json()
+        if situacao["estado"] != "pendente":
+            return situacao
+        time.sleep(0.05)
+    raise AssertionError(f"Transferência ainda pendente: {url}")
+
+def test_transferencias_assincronas(client: TestClient):
+    """ POST /transacoes/async responde 202 e o worker efetiva ou recusa cada transferência """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Fila", "cpf": "14714714714", "email": "fila@example.com"}
+    ).json()
+    a, b = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "10.00"}).json()
+        for _ in range(2)
+    )
+
+    respostas = [
+        client.post(
+            "/api/v1/transacoes/async",
+            json={"valor": valor, "carteira_origem_id": a["id"], "carteira_destino_id": b["id"]},
+        )
+        for valor in ("4.00", "4.00", "4.00")
+    ]
+    assert [r.status_code for r in respostas] == [202, 202, 202]
+    assert respostas[0].headers["Location"] == respostas[0].json()["status_url"]
+
+    situacoes = [_aguardar(client, r.headers["Location"]) for r in respostas]
+    assert [s["estado"] for s in situacoes] == ["efetivada", "efetivada", "recusada"]
+    assert Decimal(situacoes[0]["transacao"]["valor"]) == Decimal("4.00")
+    assert situacoes[2]["motivo"] == "saldo_insuficiente" and situacoes[2]["transacao"] is None
+    assert Decimal(client.get(f"/api/v1/carteiras/{a['id']}").json()["saldo_atual"]) == Decimal("2.00")
+    assert Decimal(client.get(f"/api/v1/carteiras/{b['id']}").json()["saldo_atual"]) == Decimal("18.00")
+
+    # Recusas que não dependem de saldo não entram na fila
+    mesma = {"valor": "1.00", "carteira_origem_id": a["id"], "carteira_destino_id": a["id"]}
+    assert client.post("/api/v1/transacoes/async", json=mesma).status_code == 400
+    assert client.get("/api/v1/transacoes/async/999").status_code == 404
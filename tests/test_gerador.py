@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import models
+from app.database.gerador import Plano, gerar, gerar_cadastros, gerar_transacoes
+from app.services import saldos
+from tests.conftest import TestingSessionLocal, engine
+
+FIM = datetime(2026, 10, 1)
+PLANO = Plano(
+    semente=7,
+    usuarios=30,
+    carteiras_por_usuario=2,
+    cartoes_por_carteira=1,
+    transacoes=500,
+    moedas=("BRL", "JPY"),
+    inicio=FIM - timedelta(days=60),
+    fim=FIM,
+    bloco=64,
+)
+
+async def _conferir() -> list:
+    """ Por carteira: (saldo gravado, foto do saldo inicial + histórico, transações com moeda divergente) """
+    async with TestingSessionLocal() as db:
+        carteiras = (await db.execute(select(models.Carteira.id, models.Carteira.saldo_unidades))).all()
+        divergentes = await db.scalar(
+            select(func.count()).select_from(models.Transacao)
+            .join(models.Carteira, models.Carteira.id == models.Transacao.carteira_destino_id)
+            .where(models.Carteira.moeda != models.Transacao.moeda)
+        )
+        return [
+            (saldo, (await saldos.saldo_em(db, carteira_id, FIM + timedelta(days=1))).saldo_unidades, divergentes)
+            for carteira_id, saldo in carteiras
+        ]
+
+def test_gerador_de_massa(client: TestClient):
+    """ Os blocos são determinísticos e os dados gravados têm relações e saldos consistentes """
+    assert gerar_transacoes(PLANO, (0, 64)) == gerar_transacoes(PLANO, (0, 64))
+    assert gerar_cadastros(PLANO, (0, 10)) == gerar_cadastros(PLANO, (0, 10))
+
+    resultado = asyncio.run(gerar(engine, PLANO, processos=2, progresso=lambda _: None))
+    assert (resultado["carteiras"], resultado["transacoes"]) == (60, 500)
+
+    conferencia = asyncio.run(_conferir())
+    assert len(conferencia) == 60
+    assert all(saldo == historico >= 0 for saldo, historico, _ in conferencia)
+    assert conferencia[0][2] == 0
+
+    pagina = client.get("/api/v1/transacoes/", params={"size": 5}).json()
+    assert pagina["total"] == 500 and len(pagina["items"]) == 5
+    carteira = client.get(f"/api/v1/carteiras/{resultado['plano'].carteira_id}").json()
+    assert carteira["usuario_id"] == 1 and len(carteira["cartoes"]) == 1
+    mes = client.get(f"/api/v1/carteiras/{carteira['id']}/resumo", params={"granularity": "month"}).json()["periodos"]
+    assert sum(periodo["quantidade"] for periodo in mes) == asyncio.run(_movimentos(carteira["id"]))
+
+async def _movimentos(carteira_id: int) -> int:
+    async with TestingSessionLocal() as db:
+        return await db.scalar(select(models.Carteira.movimentos).where(models.Carteira.id == carteira_id))
@@ -3,4 +3,9 @@ from fastapi.testclient import TestClient
 def test_health_check(client: TestClient):
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
\ No newline at end of file
+    assert response.json() == {"status": "ok"}
+
+def test_readiness_depois_do_aquecimento(client: TestClient):
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+
+def _criar_carteiras(client: TestClient) -> tuple[dict, dict]:
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Idempotencia", "cpf": "45645645645", "email": "idem@example.com"}
+    ).json()
+    origem, destino = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.00"}).json()
+        for _ in range(2)
+    )
+    return origem, destino
+
+def _saldo(client: TestClient, carteira: dict) -> str:
+    return client.get(f"/api/v1/carteiras/{carteira['id']}").json()["saldo_atual"]
+
+def test_repeticao_devolve_a_resposta_original(client: TestClient):
+    """ A mesma chave com o mesmo corpo não transfere de novo; com outro corpo é recusada """
+    origem, destino = _criar_carteiras(client)
+    pedido = {"valor": "30.00", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]}
+    headers = {"Idempotency-Key": "pedido-1"}
+
+    primeira = client.post("/api/v1/transacoes/", json=pedido, headers=headers)
+    repetida = client.post("/api/v1/transacoes/", json=pedido, headers=headers)
+    assert primeira.status_code == repetida.status_code == 200
+    assert repetida.json() == primeira.json()
+    assert "idempotent-replayed" not in primeira.headers
+    assert repetida.headers["idempotent-replayed"] == "true"
+    assert _saldo(client, origem) == "70.00"
+    assert len(client.get("/api/v1/transacoes/").json()["items"]) == 1
+
+    outra = client.post("/api/v1/transacoes/", json={**pedido, "valor": "5.00"}, headers=headers)
+    assert outra.status_code == 422
+    assert _saldo(client, origem) == "70.00"
+
+    # Sem a chave, cada requisição é uma nova transferência
+    client.post("/api/v1/transacoes/", json=pedido)
+    assert _saldo(client, origem) == "40.00"
+
+def test_chave_expirada_permite_nova_transferencia(client: TestClient, monkeypatch):
+    """ Depois da validade, a chave é descartada e a requisição é processada de novo """
+    origem, destino = _criar_carteiras(client)
+    pedido = {"valor": "10.00", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]}
+    monkeypatch.setattr(settings, "IDEMPOTENCIA_TTL_HORAS", -1.0)
+
+    primeira = client.post("/api/v1/transacoes/", json=pedido, headers={"Idempotency-Key": "expira"})
+    segunda = client.post("/api/v1/transacoes/", json=pedido, headers={"Idempotency-Key": "expira"})
+    assert segunda.json()["id"] != primeira.json()["id"]
+    assert _saldo(client, origem) == "80.00"
+
+def test_requisicoes_simultaneas_com_a_mesma_chave(client: TestClient):
+    """ Pedidos repetidos em paralelo (hedging) efetivam uma única transferência """
+    origem, destino = _criar_carteiras(client)
+    pedido = {"valor": "10.00", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]}
+
+    async def disparar():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(
+                ac.post("/api/v1/transacoes/", json=pedido, headers={"Idempotency-Key": "hedge"}) for _ in range(8)
+            ))
+
+    respostas = asyncio.run(disparar())
+    assert {r.status_code for r in respostas} == {200}
+    assert len({r.json()["id"] for r in respostas}) == 1
+    assert _saldo(client, origem) == "90.00"
@@ -0,0 +1,87 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def _ndjson(registros: list) -> str:
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in registros) + "\n"
+
+def test_importar_usuarios_ndjson_com_conflitos(client: TestClient, monkeypatch):
+    """ Conflitos com o banco, duplicatas no arquivo e linhas inválidas são reportados por linha """
+    monkeypatch.setattr(settings, "IMPORTACAO_TAMANHO_LOTE", 2)
+    client.post("/api/v1/usuarios/", json={"nome": "Existente", "cpf": "00000000001", "email": "existente@example.com"})
+
+    corpo = _ndjson([
+        {"nome": "A", "cpf": "10000000001", "email": "a@example.com"},
+        {"nome": "B", "cpf": "00000000001", "email": "b@example.com"},  # CPF já no banco
+        {"nome": "C", "cpf": "10000000003", "email": "existente@example.com"},  # email já no banco
+        {"nome": "D", "cpf": "10000000001", "email": "d@example.com"},  # CPF repetido no arquivo
+        {"nome": "E", "cpf": "10000000005", "email": "nao-e-email"},
+        "{quebrado",
+        {"nome": "G", "cpf": "10000000007", "email": "g@example.com"},
+    ])
+    response = client.post(
+        "/api/v1/usuarios/bulk", content=corpo, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["inseridos"], data["rejeitados"]) == (2, 5)
+    assert [c["linha"] for c in data["criados"]] == [1, 7]
+    assert [(e["linha"], e["motivo"]) for e in data["erros"]] == [
+        (2, "conflito"), (3, "conflito"), (4, "conflito"), (5, "invalido"), (6, "invalido"),
+    ]
+
+    usuario = client.get(f"/api/v1/usuarios/{data['criados'][1]['id']}").json()
+    assert usuario["email"] == "g@example.com"
+
+def test_importar_carteiras_e_cartoes_csv(client: TestClient):
+    """ CSV com referências: linhas que apontam para registros inexistentes são rejeitadas """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Dono", "cpf": "20000000001", "email": "dono@example.com"}
+    ).json()
+
+    corpo = f"usuario_id,moeda,saldo_atual\n{usuario['id']},USD,10.50\n999999,BRL,1.00\n{usuario['id']},,0\n"
+    data = client.post("/api/v1/carteiras/bulk", content=corpo, headers={"Content-Type": "text/csv"}).json()
+    assert (data["inseridos"], data["rejeitados"]) == (2, 1)
+    assert data["erros"][0]["linha"] == 3 and data["erros"][0]["motivo"] == "referencia_inexistente"
+    carteira_usd, carteira_brl = (
+        client.get(f"/api/v1/carteiras/{c['id']}").json() for c in data["criados"]
+    )
+    assert (carteira_usd["moeda"], carteira_usd["saldo_atual"]) == ("USD", "10.50")
+    assert carteira_brl["moeda"] == "BRL"
+
+    corpo = (
+        "carteira_id,numero,validade,limite\n"
+        f"{carteira_usd['id']},1111222233334444,01/30,100\n"
+        f"{carteira_usd['id']},1111222233334444,01/30,100\n"
+        f"{carteira_brl['id']},5555666677778888,13/30,100\n"
+    )
+    data = client.post("/api/v1/cartoes/bulk", content=corpo, headers={"Content-Type": "text/csv"}).json()
+    assert (data["inseridos"], data["rejeitados"]) == (1, 2)
+    assert [(e["linha"], e["motivo"]) for e in data["erros"]] == [(3, "conflito"), (4, "invalido")]
+
+    response = client.post("/api/v1/cartoes/bulk", content="x", headers={"Content-Type": "application/xml"})
+    assert response.status_code == 415
+
+def test_importar_csv_com_quebra_de_linha_entre_aspas_e_bytes_invalidos(client: TestClient):
+    """ Campos entre aspas podem conter quebras de linha; linhas fora do UTF-8 são rejeitadas, sem erro 500 """
+    corpo = (
+        'nome,cpf,email\n'
+        '"Ana\nMaria",30000000001,ana@example.com\n'
+        'Bruno,30000000002,bruno@example.com\n'
+    ).encode() + b'Jo\xe3o,30000000003,joao@example.com\n' + 'Clara,30000000004,clara@example.com\n'.encode()
+    response = client.post("/api/v1/usuarios/bulk", content=corpo, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [c["linha"] for c in data["criados"]] == [2, 4, 6]
+    assert [(e["linha"], e["motivo"]) for e in data["erros"]] == [(5, "invalido")]
+    assert "UTF-8" in data["erros"][0]["detail"]
+    assert client.get(f"/api/v1/usuarios/{data['criados'][0]['id']}").json()["nome"] == "Ana\nMaria"
+
+    corpo = b'{"nome": "Jo\xe3o", "cpf": "30000000005", "email": "joao@example.com"}\n'
+    data = client.post(
+        "/api/v1/usuarios/bulk", content=corpo, headers={"Content-Type": "application/x-ndjson"}
+    ).json()
+    assert [(e["linha"], e["motivo"]) for e in data["erros"]] == [(1, "invalido")]
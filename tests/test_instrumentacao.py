@@ -0,0 +1,44 @@
+import json
+import logging
+import re
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def _server_timing(response) -> dict:
+    """ Converte o header Server-Timing em {métrica: (duração, descrição)}. """
+    metricas = {}
+    for parte in response.headers["server-timing"].split(","):
+        nome, *params = [p.strip() for p in parte.split(";")]
+        attrs = dict(p.split("=", 1) for p in params)
+        metricas[nome] = (float(attrs["dur"]), attrs.get("desc", "").strip('"'))
+    return metricas
+
+def test_server_timing_conta_consultas(client: TestClient):
+    """ Cada resposta traz o número de consultas e o tempo de banco da requisição """
+    metricas = _server_timing(client.get("/health"))
+    assert metricas["db"][1] == "0 queries"
+
+    metricas = _server_timing(client.get("/api/v1/usuarios/"))
+    # Só a página: na última página o total sai sem COUNT(*)
+    assert metricas["db"][1] == "1 queries"
+    assert metricas["db"][0] >= metricas["db-slowest"][0] >= 0
+    assert metricas["app"][0] >= metricas["db"][0]
+
+def test_log_estruturado_e_consulta_lenta(client: TestClient, monkeypatch, caplog):
+    """ Com o log ligado, cada requisição gera uma linha JSON; consultas acima do limite são marcadas como lentas """
+    monkeypatch.setattr(settings, "SQL_LOG_REQUESTS", True)
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0.0)
+
+    with caplog.at_level(logging.INFO, logger="fintracker.sql"):
+        client.get("/api/v1/usuarios/999")
+
+    eventos = [json.loads(r.getMessage()) for r in caplog.records if r.name == "fintracker.sql"]
+    requisicao = next(e for e in eventos if e["evento"] == "requisicao")
+    assert requisicao["path"] == "/api/v1/usuarios/999"
+    assert requisicao["status"] == 404
+    assert requisicao["statements"] == 1
+    assert re.match(r"\s*SELECT", requisicao["sql_mais_lenta"])
+    assert any(e["evento"] == "consulta_lenta" for e in eventos)
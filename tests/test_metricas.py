@@ -0,0 +1,105 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+
+from app.api.dependencies import get_db
+from app.database import session
+from app.database.session import criar_engine
+from app.main import app
+from tests.conftest import TestingSessionLocal, engine
+
+
+def _valor(nome: str, **labels) -> float:
+    return REGISTRY.get_sample_value(nome, labels) or 0.0
+
+def test_metricas_por_rota_template(client: TestClient):
+    """ As métricas HTTP usam o template da rota (não o path bruto) e o /metrics expõe tudo em texto """
+    rota = "/api/v1/usuarios/{usuario_id}"
+    antes = _valor("http_requests_total", method="GET", route=rota, status="404")
+
+    client.get("/api/v1/usuarios/123")
+    client.get("/api/v1/usuarios/456")
+    client.get("/nao/existe")
+
+    assert _valor("http_requests_total", method="GET", route=rota, status="404") == antes + 2
+    assert _valor("http_request_duration_seconds_count", method="GET", route=rota) >= 2
+    assert _valor("http_requests_total", method="GET", route="<desconhecida>", status="404") >= 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/v1/usuarios/{usuario_id}"' in response.text
+    assert "/api/v1/usuarios/123" not in response.text
+    assert "http_requests_in_progress" in response.text
+    assert "db_pool_checked_out_connections" in response.text
+
+def test_metricas_de_transferencias(client: TestClient):
+    """ Transferências efetivadas e recusadas são contadas por motivo """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Metricas", "cpf": "55566677788", "email": "metricas@example.com"}
+    ).json()
+    origem, destino = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "10.00"}).json()
+        for _ in range(2)
+    )
+    efetivadas = _valor("transferencias_total", resultado="efetivada", motivo="")
+    sem_saldo = _valor("transferencias_total", resultado="recusada", motivo="saldo_insuficiente")
+
+    for valor in ("5.00", "50.00"):
+        client.post(
+            "/api/v1/transacoes/",
+            json={"carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"], "valor": valor},
+        )
+
+    assert _valor("transferencias_total", resultado="efetivada", motivo="") == efetivadas + 1
+    assert _valor("transferencias_total", resultado="recusada", motivo="saldo_insuficiente") == sem_saldo + 1
+
+def test_metricas_separadas_por_pool(tmp_path):
+    """ Cada engine publica as conexões em uso no próprio rótulo `pool` """
+    primario = criar_engine(f"sqlite+aiosqlite:///{tmp_path / 'primario.db'}", pool="teste_primario")
+    replica = criar_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", pool="teste_replica_0")
+
+    async def conectar():
+        async with primario.connect(), primario.connect(), replica.connect():
+            em_uso = (
+                _valor("db_pool_checked_out_connections", pool="teste_primario"),
+                _valor("db_pool_checked_out_connections", pool="teste_replica_0"),
+            )
+        for engine in (primario, replica):
+            await engine.dispose()
+        # O pool novo criado pelo dispose continua medido
+        async with primario.connect():
+            pass
+        await primario.dispose()
+        return em_uso
+
+    assert asyncio.run(conectar()) == (2, 1)
+    assert _valor("db_pool_checked_out_connections", pool="teste_primario") == 0
+    assert REGISTRY.get_sample_value("db_pool_overflow_connections", {"pool": "teste_primario"}) == 0
+    assert _valor("db_pool_checkout_wait_seconds_count", pool="teste_primario") == 3
+    assert _valor("db_pool_checkout_wait_seconds_count", pool="teste_replica_0") == 1
+
+def test_leitura_em_cache_nao_retira_conexao(client: TestClient, monkeypatch):
+    """ A sessão de `get_db` é preguiçosa: respostas do cache e 304 não passam pelo pool """
+    monkeypatch.setattr(session, "SessionLocal", TestingSessionLocal)
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Pool", "cpf": "36936936936", "email": "pool@example.com"}
+    ).json()
+    carteira = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "1.00"}).json()
+    url = f"/api/v1/carteiras/{carteira['id']}"
+    etag = client.get(url).headers["ETag"]  # carrega o cache
+
+    retiradas = []
+    def _checkout(*args):
+        retiradas.append(args)
+    event.listen(engine.sync_engine, "checkout", _checkout)
+    try:
+        for _ in range(5):
+            assert client.get(url).status_code == 200
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    finally:
+        event.remove(engine.sync_engine, "checkout", _checkout)
+    assert retiradas == []
@@ -0,0 +1,41 @@
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.database.particoes import mes_seguinte, meses, nome_da_particao
+
+
+def test_meses_das_particoes():
+    """ Intervalos mensais atravessam a virada do ano e os nomes seguem transacoes_AAAA_MM """
+    assert mes_seguinte(date(2026, 12, 1)) == date(2027, 1, 1)
+    assert meses(date(2026, 11, 15), date(2027, 2, 1)) == [
+        date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1), date(2027, 2, 1)
+    ]
+    assert nome_da_particao(date(2027, 1, 1)) == "transacoes_2027_01"
+
+def test_listagem_filtra_por_periodo(client: TestClient):
+    """ from/to limitam a listagem (e o total) ao intervalo [from, to) de timestamp """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Periodo", "cpf": "78978978978", "email": "periodo@example.com"}
+    ).json()
+    origem, destino = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "10.00"}).json()
+        for _ in range(2)
+    )
+    transferencia = {"valor": "1.00", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]}
+    criadas = [client.post("/api/v1/transacoes/", json=transferencia).json() for _ in range(3)]
+
+    inicio = datetime.fromisoformat(criadas[1]["timestamp"])
+    fim = inicio + timedelta(days=1)
+    for params in ({}, {"carteira_id": destino["id"]}):
+        pagina = client.get(
+            "/api/v1/transacoes/", params={**params, "from": inicio.isoformat(), "to": fim.isoformat(), "size": 1}
+        ).json()
+        assert pagina["total"] == 2
+        assert pagina["items"][0]["id"] == criadas[2]["id"]
+
+    passado = client.get("/api/v1/transacoes/", params={"to": inicio.isoformat()}).json()
+    assert [t["id"] for t in passado["items"]] == [criadas[0]["id"]]
+
+    cursor = client.get("/api/v1/transacoes/cursor", params={"from": inicio.isoformat()}).json()
+    assert [t["id"] for t in cursor["items"]] == [criadas[2]["id"], criadas[1]["id"]]
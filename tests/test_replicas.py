@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.database import replicas
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+
+def _replica(url):
+    """ "Réplica" de teste: outro engine (e outro pool) e um contador das conexões abertas nele. """
+    engine = create_async_engine(url, connect_args={"check_same_thread": False}, poolclass=NullPool)
+    conexoes = []
+    event.listen(engine.sync_engine, "connect", lambda *args: conexoes.append(1))
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False), conexoes
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    fabrica, conexoes = _replica(SQLALCHEMY_DATABASE_URL)
+    monkeypatch.setattr(replicas, "fabricas", [fabrica])
+    monkeypatch.setattr(replicas, "_pausada_ate", {})
+    return conexoes
+
+
+def test_leituras_na_replica_e_escrita_fixa_o_cliente_no_primario(client, replica):
+    """ Sem escrita recente, a listagem lê da réplica; depois de uma escrita, do primário até o cookie expirar. """
+    assert client.get("/api/v1/usuarios/").status_code == 200
+    assert len(replica) == 1
+
+    response = client.post("/api/v1/usuarios/", json={"nome": "Ana", "cpf": "11122233344", "email": "ana@example.com"})
+    assert response.status_code == 201
+    # SQLite não tem LSN: o cookie fixa o cliente no primário pela janela configurada
+    assert response.cookies.get(replicas.COOKIE_LSN) == replicas.SEM_LSN
+    assert replicas.HEADER_LSN not in response.headers
+
+    response = client.get("/api/v1/usuarios/")
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert len(replica) == 1
+
+    client.cookies.clear()
+    assert client.get("/api/v1/usuarios/").status_code == 200
+    assert len(replica) == 2
+
+
+def test_replica_indisponivel_cai_no_primario(client, monkeypatch):
+    """ Falha ao conectar na réplica: a leitura é atendida pelo primário e a réplica sai do rodízio. """
+    caminho = os.path.join(tempfile.gettempdir(), "fintracker_inexistente", "replica.db")
+    fabrica, conexoes = _replica(f"sqlite+aiosqlite:///{caminho}")
+    monkeypatch.setattr(replicas, "fabricas", [fabrica])
+    monkeypatch.setattr(replicas, "_pausada_ate", {})
+
+    client.post("/api/v1/usuarios/", json={"nome": "Ana", "cpf": "11122233344", "email": "ana@example.com"})
+    client.cookies.clear()
+
+    response = client.get("/api/v1/usuarios/")
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert 0 in replicas._pausada_ate
+    assert replicas.proxima_replica() is None
+
+
+def test_verificacao_do_lsn_tem_metrica_propria(client, replica):
+    """ A consulta do LSN na réplica é medida à parte, não como espera pelo pool. """
+    def verificacoes():
+        return REGISTRY.get_sample_value("db_replica_lsn_check_seconds_count", {"pool": "replica_0"}) or 0
+
+    antes = verificacoes()
+    response = client.get("/api/v1/usuarios/", headers={replicas.HEADER_MIN_LSN: "0/16B3748"})
+    assert response.status_code == 200
+    # SQLite não confirma o LSN: a réplica foi consultada, mas a leitura foi ao primário
+    assert len(replica) == 1
+    assert verificacoes() == antes + 1
@@ -0,0 +1,50 @@
+import asyncio
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from app.services import resumos
+from tests.conftest import TestingSessionLocal
+
+
+async def _reconstruir():
+    async with TestingSessionLocal() as db:
+        await resumos.reconstruir(db)
+
+def test_resumos_incrementais_e_reconstrucao(client: TestClient):
+    """ Os resumos mantidos pelas transferências (unitárias e em lote) coincidem com a reconstrução a partir do histórico """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Resumo", "cpf": "25825825825", "email": "resumo@example.com"}
+    ).json()
+    a, b = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.00"}).json()
+        for _ in range(2)
+    )
+    client.post("/api/v1/transacoes/", json={"valor": "10.00", "carteira_origem_id": a["id"], "carteira_destino_id": b["id"]})
+    client.post(
+        "/api/v1/transacoes/batch",
+        json=[
+            {"valor": "2.50", "carteira_origem_id": b["id"], "carteira_destino_id": a["id"]},
+            {"valor": "1.00", "carteira_origem_id": a["id"], "carteira_destino_id": b["id"]},
+        ],
+    )
+
+    def resumo(carteira, granularidade):
+        return client.get(f"/api/v1/carteiras/{carteira['id']}/resumo", params={"granularity": granularidade}).json()
+
+    incrementais = [resumo(c, g) for c in (a, b) for g in ("day", "month")]
+    dia = incrementais[0]["periodos"]
+    assert len(dia) == 1
+    assert (Decimal(dia[0]["entradas"]), Decimal(dia[0]["saidas"]), dia[0]["quantidade"]) == (
+        Decimal("2.50"), Decimal("11.00"), 3
+    )
+    assert incrementais[2]["periodos"][0]["entradas"] == dia[0]["saidas"]
+    assert incrementais[1]["periodos"][0]["periodo"].endswith("-01")
+
+    asyncio.run(_reconstruir())
+    assert [resumo(c, g) for c in (a, b) for g in ("day", "month")] == incrementais
+
+    assert client.get(f"/api/v1/carteiras/{a['id']}/resumo", params={"granularity": "year"}).status_code == 422
+    assert resumo(a, "day")["periodos"] and not client.get(
+        f"/api/v1/carteiras/{a['id']}/resumo", params={"from": "2999-01-01"}
+    ).json()["periodos"]
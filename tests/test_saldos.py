@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.core.config import settings
+from app.services.saldos import instante
+from tests.conftest import TestingSessionLocal
+
+
+def _depois(transacao: dict) -> str:
+    return (datetime.fromisoformat(transacao["timestamp"]) + timedelta(microseconds=1)).isoformat()
+
+def test_saldo_passado_e_extrato(client: TestClient, monkeypatch):
+    """ Saldos passados (foto + transações seguintes) batem com o histórico, inclusive após fotos e ajustes diretos """
+    monkeypatch.setattr(settings, "SALDO_FOTO_A_CADA", 2)
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Historico", "cpf": "14714714714", "email": "historico@example.com"}
+    ).json()
+    a = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.00"}).json()
+    b = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "0"}).json()
+
+    def transferir(valor, origem, destino):
+        return client.post(
+            "/api/v1/transacoes/", json={"valor": valor, "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]}
+        ).json()
+
+    def saldo(carteira, at):
+        return client.get(f"/api/v1/carteiras/{carteira['id']}/saldo", params={"at": at}).json()
+
+    t1 = transferir("10.00", a, b)
+    t2 = transferir("5.00", a, b)  # segundo movimento de cada carteira: foto
+    client.put(f"/api/v1/carteiras/{b['id']}", json={"saldo_atual": "50.00"})
+    lote = client.post(
+        "/api/v1/transacoes/batch",
+        json=[
+            {"valor": "1.00", "carteira_origem_id": a["id"], "carteira_destino_id": b["id"]},
+            {"valor": "2.00", "carteira_origem_id": b["id"], "carteira_destino_id": a["id"]},
+        ],
+    ).json()
+    t4 = lote["resultados"][1]["transacao"]
+
+    assert Decimal(saldo(a, t1["timestamp"])["saldo"]) == Decimal("100.00")
+    assert Decimal(saldo(a, _depois(t1))["saldo"]) == Decimal("90.00")
+    assert Decimal(saldo(b, _depois(t2))["saldo"]) == Decimal("15.00")
+    assert saldo(b, _depois(t2))["transacoes_apos_foto"] == 0
+    assert Decimal(saldo(b, _depois(t4))["saldo"]) == Decimal("49.00")
+    atual = client.get(f"/api/v1/carteiras/{a['id']}/saldo").json()
+    assert Decimal(atual["saldo"]) == Decimal(client.get(f"/api/v1/carteiras/{a['id']}").json()["saldo_atual"]) == Decimal("86.00")
+
+    assert client.get(f"/api/v1/carteiras/{a['id']}/saldo", params={"at": "2000-01-01T00:00:00"}).status_code == 404
+    assert client.get("/api/v1/carteiras/999/saldo").status_code == 404
+
+    extrato = client.get(f"/api/v1/carteiras/{a['id']}/extrato", params={"from": t1["timestamp"], "size": 3}).json()
+    assert Decimal(extrato["saldo_inicial"]) == Decimal("100.00")
+    assert [(Decimal(l["valor"]), Decimal(l["saldo"])) for l in extrato["lancamentos"]] == [
+        (Decimal("-10.00"), Decimal("90.00")),
+        (Decimal("-5.00"), Decimal("85.00")),
+        (Decimal("-1.00"), Decimal("84.00")),
+    ]
+    seguinte = client.get(
+        f"/api/v1/carteiras/{a['id']}/extrato",
+        params={"from": t1["timestamp"], "size": 3, "apos_id": extrato["proximo_apos_id"]},
+    ).json()
+    assert [(Decimal(l["valor"]), Decimal(l["saldo"])) for l in seguinte["lancamentos"]] == [(Decimal("2.00"), Decimal("86.00"))]
+    assert seguinte["proximo_apos_id"] is None
+
+async def _gravar(*transacoes: models.Transacao) -> list[int]:
+    async with TestingSessionLocal() as db:
+        db.add_all(transacoes)
+        await db.commit()
+        return [transacao.id for transacao in transacoes]
+
+def test_extrato_na_ordem_de_timestamp_como_o_saldo(client: TestClient):
+    """ Uma transação de id maior e timestamp menor entra antes no extrato, como em /saldo """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Ordem", "cpf": "25825825825", "email": "ordem@example.com"}
+    ).json()
+    a = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.00"}).json()
+    b = client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "0"}).json()
+    agora = instante(None)
+    tardia, cedo = asyncio.run(_gravar(
+        models.Transacao(valor_unidades=1000, carteira_origem_id=a["id"], carteira_destino_id=b["id"],
+                         timestamp=agora + timedelta(hours=2)),
+        models.Transacao(valor_unidades=300, carteira_origem_id=b["id"], carteira_destino_id=a["id"],
+                         timestamp=agora + timedelta(hours=1)),
+    ))
+    assert tardia < cedo
+
+    base = f"/api/v1/carteiras/{a['id']}/extrato"
+    inicio, fim = (agora + timedelta(minutes=30)).isoformat(), (agora + timedelta(hours=3)).isoformat()
+    extrato = client.get(base, params={"from": inicio, "to": fim}).json()
+    assert [(l["transacao_id"], Decimal(l["saldo"])) for l in extrato["lancamentos"]] == [
+        (cedo, Decimal("103.00")), (tardia, Decimal("93.00")),
+    ]
+    depois_de_cedo = (agora + timedelta(hours=1, microseconds=1)).isoformat()
+    saldo = client.get(f"/api/v1/carteiras/{a['id']}/saldo", params={"at": depois_de_cedo}).json()
+    assert Decimal(saldo["saldo"]) == Decimal("103.00")
+
+    pagina = client.get(base, params={"from": inicio, "to": fim, "size": 1}).json()
+    assert [l["transacao_id"] for l in pagina["lancamentos"]] == [cedo]
+    seguinte = client.get(base, params={"from": inicio, "to": fim, "size": 1, "apos_id": pagina["proximo_apos_id"]}).json()
+    assert [(l["transacao_id"], Decimal(l["saldo"])) for l in seguinte["lancamentos"]] == [(tardia, Decimal("93.00"))]
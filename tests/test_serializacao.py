@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_caminho_rapido_preserva_o_json_das_listagens(client: TestClient, monkeypatch):
+    """ Páginas serializadas pelo TypeAdapter (a partir de linhas) são idênticas às do fluxo padrão """
+    usuario = client.post(
+        "/api/v1/usuarios/", json={"nome": "Serializacao", "cpf": "32132132132", "email": "serial@example.com"}
+    ).json()
+    origem, destino = (
+        client.post("/api/v1/carteiras/", json={"usuario_id": usuario["id"], "saldo_atual": "100.50"}).json()
+        for _ in range(2)
+    )
+    client.post(
+        "/api/v1/cartoes/",
+        json={"carteira_id": origem["id"], "numero": "5555444433332222", "validade": "01/31", "limite": "1500.00"},
+    )
+    client.post(
+        "/api/v1/transacoes/",
+        json={"valor": "0.50", "carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"]},
+    )
+
+    urls = [
+        "/api/v1/usuarios/",
+        "/api/v1/carteiras/",
+        "/api/v1/cartoes/",
+        "/api/v1/transacoes/",
+        f"/api/v1/transacoes/?carteira_id={destino['id']}&size=1",
+    ]
+    rapidas = [client.get(url) for url in urls]
+    monkeypatch.setattr(settings, "SERIALIZACAO_RAPIDA", False)
+    padrao = [client.get(url) for url in urls]
+
+    for rapida, normal in zip(rapidas, padrao):
+        assert rapida.status_code == normal.status_code == 200
+        assert rapida.headers["content-type"] == "application/json"
+        assert rapida.json() == normal.json()
+    assert rapidas[3].json()["items"][0]["valor"] == "0.50"
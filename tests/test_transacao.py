@@ -0,0 +1,177 @@
+import asyncio
+import csv
+import io
+import json
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def _criar_carteiras(client: TestClient, saldos: list[str], moeda: str = "BRL") -> list[dict]:
+    """ Cria um usuário e uma carteira para cada saldo informado. """
+    usuario = client.post(
+        "/api/v1/usuarios/",
+        json={"nome": "Usuario Transacao", "cpf": "11122233344", "email": "transacao@example.com"},
+    ).json()
+    return [
+        client.post(
+            "/api/v1/carteiras/",
+            json={"usuario_id": usuario["id"], "moeda": moeda, "saldo_atual": saldo},
+        ).json()
+        for saldo in saldos
+    ]
+
+def test_transacao_recusas(client: TestClient):
+    """ Teste dos motivos de recusa: mesma carteira, carteira inexistente e moedas diferentes """
+    brl, = _criar_carteiras(client, ["100.00"])
+    usd = client.post(
+        "/api/v1/carteiras/",
+        json={"usuario_id": brl["usuario_id"], "moeda": "USD", "saldo_atual": "100.00"},
+    ).json()
+
+    casos = [
+        ({"carteira_origem_id": brl["id"], "carteira_destino_id": brl["id"]}, 400, "mesma"),
+        ({"carteira_origem_id": brl["id"], "carteira_destino_id": 999999}, 404, "não foram encontradas"),
+        ({"carteira_origem_id": 999999, "carteira_destino_id": brl["id"]}, 404, "não foram encontradas"),
+        ({"carteira_origem_id": brl["id"], "carteira_destino_id": usd["id"]}, 400, "mesma moeda"),
+        ({"carteira_origem_id": usd["id"], "carteira_destino_id": brl["id"]}, 400, "mesma moeda"),
+    ]
+    for payload, status_code, mensagem in casos:
+        response = client.post("/api/v1/transacoes/", json={**payload, "valor": "10.00"})
+        assert response.status_code == status_code
+        assert mensagem in response.json()["detail"]
+
+    # Nenhuma recusa pode ter alterado saldos
+    assert Decimal(client.get(f"/api/v1/carteiras/{brl['id']}").json()["saldo_atual"]) == Decimal("100.00")
+    assert Decimal(client.get(f"/api/v1/carteiras/{usd['id']}").json()["saldo_atual"]) == Decimal("100.00")
+
+def test_transacoes_concorrentes_sem_divergencia_de_saldo(client: TestClient):
+    """
+    Teste de estresse: dispara transferências concorrentes (inclusive cruzadas A->B / B->A)
+    entre poucas carteiras "quentes" e verifica que nenhum saldo fica negativo, que o total
+    é conservado e que cada saldo final bate com as transações efetivadas.
+    """
+    saldo_inicial = Decimal("100")
+    carteiras = _criar_carteiras(client, [str(saldo_inicial)] * 3)
+    ids = [c["id"] for c in carteiras]
+    rng = random.Random(42)
+    pedidos = []
+    for _ in range(80):
+        origem, destino = rng.sample(ids, 2)
+        pedidos.append({"carteira_origem_id": origem, "carteira_destino_id": destino, "valor": str(rng.choice([10, 25, 60]))})
+
+    async def disparar():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/api/v1/transacoes/", json=p) for p in pedidos))
+
+    respostas = asyncio.run(disparar())
+    assert {r.status_code for r in respostas} <= {200, 400}
+    assert any(r.status_code == 200 for r in respostas)
+
+    esperado = defaultdict(lambda: saldo_inicial)
+    for r in respostas:
+        if r.status_code == 200:
+            t = r.json()
+            esperado[t["carteira_origem_id"]] -= Decimal(t["valor"])
+            esperado[t["carteira_destino_id"]] += Decimal(t["valor"])
+
+    saldos = {i: Decimal(client.get(f"/api/v1/carteiras/{i}").json()["saldo_atual"]) for i in ids}
+    assert all(saldo >= 0 for saldo in saldos.values())
+    assert sum(saldos.values()) == saldo_inicial * len(ids)
+    assert saldos == {i: esperado[i] for i in ids}
+
+def test_transacoes_em_lote(client: TestClient):
+    """ Teste do lote: compensação de saldos, modo por item e modo tudo-ou-nada """
+    a, b, c = _criar_carteiras(client, ["100.00", "0.00", "0.00"])
+    lote = [
+        {"carteira_origem_id": a["id"], "carteira_destino_id": b["id"], "valor": "70.00"},
+        # Só é válido porque o item anterior já creditou B
+        {"carteira_origem_id": b["id"], "carteira_destino_id": c["id"], "valor": "50.00"},
+        {"carteira_origem_id": a["id"], "carteira_destino_id": c["id"], "valor": "40.00"},  # saldo insuficiente
+        {"carteira_origem_id": a["id"], "carteira_destino_id": 999999, "valor": "1.00"},
+    ]
+
+    response = client.post("/api/v1/transacoes/batch", json=lote)
+    assert response.status_code == 400
+    recusados = response.json()["detail"]["recusados"]
+    assert [(r["indice"], r["motivo"]) for r in recusados] == [(2, "saldo_insuficiente"), (3, "carteira_nao_encontrada")]
+    assert Decimal(client.get(f"/api/v1/carteiras/{a['id']}").json()["saldo_atual"]) == Decimal("100.00")
+
+    response = client.post("/api/v1/transacoes/batch", params={"atomico": False}, json=lote)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["efetivadas"], data["recusadas"]) == (2, 2)
+    assert [r["transacao"] is not None for r in data["resultados"]] == [True, True, False, False]
+
+    saldos = [Decimal(client.get(f"/api/v1/carteiras/{w['id']}").json()["saldo_atual"]) for w in (a, b, c)]
+    assert saldos == [Decimal("30.00"), Decimal("20.00"), Decimal("50.00")]
+    assert client.get("/api/v1/transacoes/").json()["total"] == 2
+
+def test_listar_transacoes_por_cursor(client: TestClient):
+    """ Teste da paginação por cursor: percorre todas as páginas sem repetir nem pular transações """
+    a, b, c = _criar_carteiras(client, ["1000.00", "1000.00", "1000.00"])
+    pares = [(a, b), (b, a), (a, c), (c, b), (c, a), (a, b), (b, a)]
+    for origem, destino in pares:
+        response = client.post(
+            "/api/v1/transacoes/",
+            json={"carteira_origem_id": origem["id"], "carteira_destino_id": destino["id"], "valor": "1.00"},
+        )
+        assert response.status_code == 200
+
+    def percorrer(params: dict) -> list[int]:
+        ids, cursor = [], None
+        while True:
+            data = client.get("/api/v1/transacoes/cursor", params={**params, "size": 2, "cursor": cursor}).json()
+            assert len(data["items"]) <= 2
+            ids += [t["id"] for t in data["items"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return ids
+
+    todas = percorrer({})
+    assert todas == sorted(todas, reverse=True) and len(todas) == len(pares)
+
+    da_carteira_a = percorrer({"carteira_id": a["id"]})
+    esperado = [
+        t["id"] for t in client.get("/api/v1/transacoes/", params={"carteira_id": a["id"]}).json()["items"]
+    ]
+    assert da_carteira_a == sorted(esperado, reverse=True) and len(da_carteira_a) == 6
+
+    response = client.get("/api/v1/transacoes/cursor", params={"cursor": "nao-e-um-cursor"})
+    assert response.status_code == 400
+
+def test_exportar_transacoes(client: TestClient):
+    """ Teste da exportação em streaming: NDJSON, CSV e filtros por carteira e período """
+    a, b, c = _criar_carteiras(client, ["100.00", "100.00", "100.00"])
+    criadas = [
+        client.post(
+            "/api/v1/transacoes/",
+            json={"carteira_origem_id": o["id"], "carteira_destino_id": d["id"], "valor": "1.50"},
+        ).json()
+        for o, d in [(a, b), (b, c), (c, a), (b, a)]
+    ]
+
+    response = client.get("/api/v1/transacoes/export", params={"carteira_id": a["id"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    linhas = [json.loads(linha) for linha in response.text.splitlines()]
+    assert [t["id"] for t in linhas] == [criadas[0]["id"], criadas[2]["id"], criadas[3]["id"]]
+    assert linhas[0] == criadas[0]
+
+    response = client.get("/api/v1/transacoes/export", params={"format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    registros = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(r["id"]) for r in registros] == [t["id"] for t in criadas]
+    assert registros[0]["valor"] == "1.50"
+
+    corte = criadas[2]["timestamp"]
+    response = client.get("/api/v1/transacoes/export", params={"from": corte})
+    assert [json.loads(linha)["id"] for linha in response.text.splitlines()] == [criadas[2]["id"], criadas[3]["id"]]
+    response = client.get("/api/v1/transacoes/export", params={"to": corte})
+    assert [json.loads(linha)["id"] for linha in response.text.splitlines()] == [criadas[0]["id"], criadas[1]["id"]]